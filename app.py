@@ -4,6 +4,20 @@ citeflex/app.py
 Flask application for CiteFlex Unified.
 
 Version History:
+    2026-10-16: Added /api/jobs/<job_id>/events: server-sent progress plus each note
+                (or author-date citation) as soon as it is finished; streams are
+                capped per worker and end after JOB_EVENT_STREAM_SECONDS
+    2026-10-16: /api/process and /api/process-author-date run as background jobs
+                (job_queue.py) and return a job ID; added /api/jobs/<job_id>
+                for progress and results (wait=true keeps the old behaviour)
+    2026-10-16: /api/update applies edits to an open NoteEditSession and stores only
+                the edited notes; the document is rebuilt on download
+    2026-10-16: Sessions shared by all gunicorn workers (SQLite session backend);
+                removed the /api/update not-found retry loop
+    2026-10-16: SessionManager moved to session_store.py (documents stored once as
+                content-addressed blobs, per-session locks); /api/process and
+                /api/update save all fields with one write
+    2026-10-16: /health reports per-upstream circuit breaker state
     2025-12-11: Fixed Author-Date UX to match Endnote UX:
                 - Added 'recommendation' field (AI's best guess)
                 - Original text now appears as first option (id=0)
@@ -33,19 +47,19 @@ FIXES APPLIED:
 """
 
 import os
-import uuid
-import time
+import json
 import threading
-import pickle
-from pathlib import Path
-from datetime import datetime, timedelta
 from functools import wraps
 
-from flask import Flask, request, jsonify, render_template, send_file
+from flask import Flask, Response, request, jsonify, render_template, send_file
 from werkzeug.utils import secure_filename
 
 from unified_router import get_citation, get_multiple_citations, get_parenthetical_options
-from document_processor import process_document
+from document_processor import process_document, get_edit_session
+from engines import rate_limit
+from session_store import SessionManager
+from job_queue import JobQueue
+from config import JOB_EVENT_STREAMS, JOB_EVENT_STREAM_SECONDS
 
 # =============================================================================
 # APP CONFIGURATION
@@ -61,239 +75,15 @@ ALLOWED_EXTENSIONS = {'docx'}
 # FIX: PERSISTENT SESSION MANAGEMENT
 # =============================================================================
 
-# Session storage directory - use Railway Volume mount point for persistence
-SESSIONS_DIR = Path(os.environ.get('SESSIONS_DIR', '/data/sessions'))
-
-class SessionManager:
-    """
-    Thread-safe session manager with file-based persistence.
-    
-    Features:
-    1. Thread-safe with threading.Lock()
-    2. Sessions expire after 4 hours
-    3. Persists to disk - survives server restarts/deployments
-    4. Requires Railway Volume mounted at /data for full persistence
-    
-    Setup for Railway:
-    1. Go to your service in Railway
-    2. Add a Volume: Settings â†’ Volumes â†’ Add Volume
-    3. Mount path: /data
-    4. Sessions will now survive deployments
-    """
-    
-    SESSION_EXPIRY_HOURS = 4
-    CLEANUP_INTERVAL_MINUTES = 15
-    
-    def __init__(self, storage_dir: Path = SESSIONS_DIR):
-        self._sessions = {}
-        self._lock = threading.Lock()
-        self._last_cleanup = time.time()
-        self._storage_dir = storage_dir
-        self._persistence_available = False
-        
-        # Try to set up persistent storage
-        self._init_storage()
-        
-        # Load existing sessions from disk
-        self._load_sessions()
-    
-    def _init_storage(self):
-        """Initialize storage directory if possible."""
-        try:
-            self._storage_dir.mkdir(parents=True, exist_ok=True)
-            # Test write access
-            test_file = self._storage_dir / '.test'
-            test_file.write_text('test')
-            test_file.unlink()
-            self._persistence_available = True
-            print(f"[SessionManager] Persistent storage enabled at {self._storage_dir}")
-        except Exception as e:
-            self._persistence_available = False
-            print(f"[SessionManager] Persistent storage unavailable ({e}). Using in-memory only.")
-            print("[SessionManager] To enable persistence, add a Railway Volume mounted at /data")
-    
-    def _get_session_file(self, session_id: str) -> Path:
-        """Get the file path for a session."""
-        return self._storage_dir / f"{session_id}.pkl"
-    
-    def _save_session(self, session_id: str):
-        """Save a single session to disk with file locking."""
-        if not self._persistence_available:
-            return
-        try:
-            import fcntl
-            session = self._sessions.get(session_id)
-            if session:
-                session_file = self._get_session_file(session_id)
-                # Write to temp file first, then rename (atomic on POSIX)
-                temp_file = session_file.with_suffix('.tmp')
-                with open(temp_file, 'wb') as f:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)  # Exclusive lock
-                    pickle.dump(session, f)
-                    f.flush()
-                    os.fsync(f.fileno())  # Force write to disk
-                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)  # Unlock
-                # Atomic rename
-                temp_file.rename(session_file)
-        except Exception as e:
-            print(f"[SessionManager] Failed to save session {session_id[:8]}: {e}")
-    
-    def _delete_session_file(self, session_id: str):
-        """Delete session file from disk."""
-        if not self._persistence_available:
-            return
-        try:
-            session_file = self._get_session_file(session_id)
-            if session_file.exists():
-                session_file.unlink()
-        except Exception as e:
-            print(f"[SessionManager] Failed to delete session file {session_id[:8]}: {e}")
-    
-    def _load_sessions(self):
-        """Load all sessions from disk on startup."""
-        if not self._persistence_available:
-            return
-        
-        loaded = 0
-        expired = 0
-        current_time = datetime.now()
-        
-        try:
-            for session_file in self._storage_dir.glob("*.pkl"):
-                try:
-                    with open(session_file, 'rb') as f:
-                        session = pickle.load(f)
-                    
-                    # Check if expired
-                    if current_time > session.get('expires_at', current_time):
-                        session_file.unlink()
-                        expired += 1
-                        continue
-                    
-                    session_id = session_file.stem
-                    self._sessions[session_id] = session
-                    loaded += 1
-                except Exception as e:
-                    print(f"[SessionManager] Failed to load {session_file.name}: {e}")
-                    # Remove corrupted file
-                    try:
-                        session_file.unlink()
-                    except:
-                        pass
-            
-            if loaded > 0 or expired > 0:
-                print(f"[SessionManager] Loaded {loaded} sessions, cleaned {expired} expired")
-        except Exception as e:
-            print(f"[SessionManager] Failed to load sessions: {e}")
-    
-    def create(self) -> str:
-        """Create a new session with expiration."""
-        session_id = str(uuid.uuid4())
-        
-        with self._lock:
-            self._sessions[session_id] = {
-                'created_at': datetime.now(),
-                'expires_at': datetime.now() + timedelta(hours=self.SESSION_EXPIRY_HOURS),
-                'data': {}
-            }
-            self._save_session(session_id)
-            self._maybe_cleanup()
-        
-        return session_id
-    
-    def get(self, session_id: str) -> dict:
-        """Get session data (thread-safe). Falls back to disk if not in memory."""
-        with self._lock:
-            session = self._sessions.get(session_id)
-            
-            # Fallback: try loading from disk if not in memory
-            if not session and self._persistence_available:
-                session_file = self._get_session_file(session_id)
-                if session_file.exists():
-                    try:
-                        with open(session_file, 'rb') as f:
-                            session = pickle.load(f)
-                        self._sessions[session_id] = session
-                        print(f"[SessionManager] Recovered session {session_id[:8]} from disk")
-                    except Exception as e:
-                        print(f"[SessionManager] Failed to recover session {session_id[:8]}: {e}")
-            
-            if not session:
-                return None
-            
-            # Check expiration
-            if datetime.now() > session['expires_at']:
-                del self._sessions[session_id]
-                self._delete_session_file(session_id)
-                return None
-            
-            return session['data']
-    
-    def set(self, session_id: str, key: str, value) -> bool:
-        """Set session data (thread-safe). Falls back to disk if not in memory."""
-        with self._lock:
-            session = self._sessions.get(session_id)
-            
-            # Fallback: try loading from disk if not in memory
-            if not session and self._persistence_available:
-                session_file = self._get_session_file(session_id)
-                if session_file.exists():
-                    try:
-                        with open(session_file, 'rb') as f:
-                            session = pickle.load(f)
-                        self._sessions[session_id] = session
-                        print(f"[SessionManager] Recovered session {session_id[:8]} from disk for set()")
-                    except Exception as e:
-                        print(f"[SessionManager] Failed to recover session {session_id[:8]}: {e}")
-            
-            if not session:
-                return False
-            
-            if datetime.now() > session['expires_at']:
-                del self._sessions[session_id]
-                self._delete_session_file(session_id)
-                return False
-            
-            session['data'][key] = value
-            self._save_session(session_id)
-            return True
-    
-    def delete(self, session_id: str) -> bool:
-        """Delete a session (thread-safe)."""
-        with self._lock:
-            if session_id in self._sessions:
-                del self._sessions[session_id]
-                self._delete_session_file(session_id)
-                return True
-            return False
-    
-    def _maybe_cleanup(self) -> None:
-        """
-        Clean up expired sessions periodically.
-        Called within lock, so no additional locking needed.
-        """
-        now = time.time()
-        if now - self._last_cleanup < self.CLEANUP_INTERVAL_MINUTES * 60:
-            return
-        
-        self._last_cleanup = now
-        current_time = datetime.now()
-        
-        expired = [
-            sid for sid, session in self._sessions.items()
-            if current_time > session['expires_at']
-        ]
-        
-        for sid in expired:
-            del self._sessions[sid]
-            self._delete_session_file(sid)
-        
-        if expired:
-            print(f"[SessionManager] Cleaned up {len(expired)} expired sessions")
+# Global session manager instance (see session_store.py)
+sessions = SessionManager()
 
+# Background document processing (see job_queue.py); handlers are
+# registered below, next to their endpoints
+jobs = JobQueue()
 
-# Global session manager instance
-sessions = SessionManager()
+# Open /api/jobs/<id>/events streams in this worker (each holds a request thread)
+event_streams = threading.BoundedSemaphore(JOB_EVENT_STREAMS)
 
 
 # =============================================================================
@@ -304,6 +94,39 @@ def allowed_file(filename: str) -> bool:
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def wants_inline() -> bool:
+    """Whether the client asked to get the result in this request (wait=true)."""
+    return request.values.get('wait', 'false').lower() == 'true'
+
+
+def submit_job(kind: str, file_bytes: bytes, params: dict):
+    """Queue a document job and return the 202 response pointing at its status."""
+    job_id = jobs.submit(kind, file_bytes, params)
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': f'/api/jobs/{job_id}',
+        'events_url': f'/api/jobs/{job_id}/events'
+    }), 202
+
+
+def note_summary(idx: int, r) -> dict:
+    """Workbench entry for one processed note (idx starts at 1)."""
+    note_type = 'unknown'
+    if hasattr(r, 'citation_type') and r.citation_type:
+        note_type = r.citation_type.name.lower()
+    
+    return {
+        'id': idx,
+        'text': r.original,
+        'formatted': r.formatted if r.success else r.original,
+        'type': note_type,
+        'success': r.success,
+        'form': r.citation_form
+    }
+
+
 # =============================================================================
 # ROUTES
 # =============================================================================
@@ -549,6 +372,78 @@ def cite_parenthetical():
         }), 500
 
 
+def run_process_job(file_bytes: bytes, params: dict, progress_callback=None) -> dict:
+    """
+    Process an uploaded document in endnote/footnote mode (job 'process').
+    
+    Args:
+        file_bytes: The uploaded .docx
+        params: {'style', 'add_links', 'filename'}
+        progress_callback: Optional callback(status, current, total)
+    
+    Returns:
+        The /api/process response (session ID, notes and stats)
+    """
+    # Stream each note to /api/jobs/<job_id>/events as it is finished
+    publish = getattr(progress_callback, 'publish', None)
+    
+    # Process document
+    processed_bytes, results = process_document(
+        file_bytes,
+        style=params['style'],
+        add_links=params['add_links'],
+        progress_callback=progress_callback,
+        note_callback=(lambda idx, r: publish('note', note_summary(idx, r))) if publish else None
+    )
+    
+    # Create session to store results (one write for all fields)
+    session_id = sessions.create({
+        'processed_doc': processed_bytes,
+        'original_bytes': file_bytes,  # Store original for re-processing
+        'style': params['style'],
+        'results': [
+            {
+                'id': idx + 1,
+                'original': r.original,
+                'formatted': r.formatted,
+                'success': r.success,
+                'error': r.error,
+                'form': r.citation_form,
+                'type': r.citation_type.name.lower() if hasattr(r, 'citation_type') and r.citation_type else 'unknown'
+            }
+            for idx, r in enumerate(results)
+        ],
+        'filename': params['filename'],
+    })
+    print(f"[API] Created session {session_id[:8]}... for document {params['filename']}")
+    
+    print(f"[API] Session {session_id[:8]} initialized with {len(results)} notes, doc size={len(processed_bytes)}")
+    print(f"[API] Total active sessions: {len(sessions)}")
+    
+    # Build notes list for UI
+    notes = [note_summary(idx + 1, r) for idx, r in enumerate(results)]
+    
+    # Return summary with notes for workbench UI
+    success_count = sum(1 for r in results if r.success)
+    
+    return {
+        'success': True,
+        'session_id': session_id,
+        'notes': notes,  # For workbench UI
+        'stats': {
+            'total': len(results),
+            'success': success_count,
+            'failed': len(results) - success_count,
+            'ibid': sum(1 for r in results if r.citation_form == 'ibid'),
+            'short': sum(1 for r in results if r.citation_form == 'short'),
+            'full': sum(1 for r in results if r.citation_form == 'full'),
+        }
+    }
+
+
+jobs.register('process', run_process_job)
+
+
 @app.route('/api/process', methods=['POST'])
 def process_doc():
     """
@@ -558,8 +453,11 @@ def process_doc():
     - file: .docx document
     - style: citation style (optional)
     - add_links: whether to make URLs clickable (optional)
+    - wait: 'true' to process within this request (optional)
     
-    Returns processed document as download.
+    Returns 202 with a job ID right away; poll /api/jobs/<job_id> for
+    progress and the result (session ID, notes and stats). With wait=true
+    the result is returned directly.
     """
     try:
         if 'file' not in request.files:
@@ -585,81 +483,123 @@ def process_doc():
         style = request.form.get('style', 'Chicago Manual of Style')
         add_links = request.form.get('add_links', 'true').lower() == 'true'
         
-        # Read file bytes
+        params = {
+            'style': style,
+            'add_links': add_links,
+            'filename': secure_filename(file.filename),
+        }
         file_bytes = file.read()
         
-        # Process document
-        processed_bytes, results = process_document(
-            file_bytes,
-            style=style,
-            add_links=add_links
-        )
-        
-        # Create session to store results
-        session_id = sessions.create()
-        print(f"[API] Created session {session_id[:8]}... for document {file.filename}")
+        if wants_inline():
+            return jsonify(run_process_job(file_bytes, params))
+        return submit_job('process', file_bytes, params)
         
-        sessions.set(session_id, 'processed_doc', processed_bytes)
-        sessions.set(session_id, 'original_bytes', file_bytes)  # Store original for re-processing
-        sessions.set(session_id, 'style', style)
-        sessions.set(session_id, 'results', [
-            {
-                'id': idx + 1,
-                'original': r.original,
-                'formatted': r.formatted,
-                'success': r.success,
-                'error': r.error,
-                'form': r.citation_form,
-                'type': r.citation_type.name.lower() if hasattr(r, 'citation_type') and r.citation_type else 'unknown'
-            }
-            for idx, r in enumerate(results)
-        ])
-        sessions.set(session_id, 'filename', secure_filename(file.filename))
-        
-        print(f"[API] Session {session_id[:8]} initialized with {len(results)} notes, doc size={len(processed_bytes)}")
-        print(f"[API] Total active sessions: {len(sessions._sessions)}")
-        
-        # Build notes list for UI
-        notes = []
-        for idx, r in enumerate(results):
-            note_type = 'unknown'
-            if hasattr(r, 'citation_type') and r.citation_type:
-                note_type = r.citation_type.name.lower()
-            
-            notes.append({
-                'id': idx + 1,
-                'text': r.original,
-                'formatted': r.formatted if r.success else r.original,
-                'type': note_type,
-                'success': r.success,
-                'form': r.citation_form
-            })
+    except Exception as e:
+        print(f"[API] Error in /api/process: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id: str):
+    """
+    Progress and result of a document job.
+    
+    Response:
+    {
+        "success": true,
+        "job_id": "uuid",
+        "status": "queued" | "running" | "done" | "failed",
+        "stage": "Found 12/40 sources",
+        "percent": 31,
+        "result": {...},    # when done: the /api/process(-author-date) response
+        "error": "..."      # when failed
+    }
+    """
+    try:
+        info = jobs.status(job_id)
         
-        # Return summary with notes for workbench UI
-        success_count = sum(1 for r in results if r.success)
+        if info is None:
+            return jsonify({
+                'success': False,
+                'error': 'Job not found or expired'
+            }), 404
         
-        return jsonify({
-            'success': True,
-            'session_id': session_id,
-            'notes': notes,  # For workbench UI
-            'stats': {
-                'total': len(results),
-                'success': success_count,
-                'failed': len(results) - success_count,
-                'ibid': sum(1 for r in results if r.citation_form == 'ibid'),
-                'short': sum(1 for r in results if r.citation_form == 'short'),
-                'full': sum(1 for r in results if r.citation_form == 'full'),
-            }
-        })
+        return jsonify({'success': True, **info})
         
     except Exception as e:
-        print(f"[API] Error in /api/process: {e}")
+        print(f"[API] Error in /api/jobs: {e}")
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
 
+@app.route('/api/jobs/<job_id>/events')
+def job_events(job_id: str):
+    """
+    Server-sent events for a document job.
+    
+    Events:
+        progress  {"status", "stage", "current", "total", "percent"}
+        note      one finished note (same fields as /api/process "notes"
+                  entries), in note order
+        citation  one finished author-date citation (as in "citations")
+        done      the full /api/process(-author-date) response; stream ends
+        failed    {"error": "..."}; stream ends
+    
+        reconnect {"after": id}; the stream ends after JOB_EVENT_STREAM_SECONDS,
+                  open it again with ?after=id to continue
+    
+    Note/citation events carry an id, so a reconnecting EventSource resumes
+    after the last one it received (Last-Event-ID or ?after=).
+    
+    Each stream holds a request thread, so only JOB_EVENT_STREAMS are open
+    per worker; beyond that the response is a 503 and the client should
+    poll /api/jobs/<job_id> instead.
+    """
+    if jobs.status(job_id) is None:
+        return jsonify({
+            'success': False,
+            'error': 'Job not found or expired'
+        }), 404
+    
+    try:
+        after = max(int(request.headers.get('Last-Event-ID', 0)), int(request.args.get('after', 0)))
+    except ValueError:
+        after = 0
+    
+    if not event_streams.acquire(blocking=False):
+        response = jsonify({
+            'success': False,
+            'error': 'Too many open event streams; poll status_url instead',
+            'status_url': f'/api/jobs/{job_id}'
+        })
+        response.headers['Retry-After'] = str(JOB_EVENT_STREAM_SECONDS)
+        return response, 503
+    
+    def stream():
+        try:
+            for event, data, event_id in jobs.events(job_id, after, timeout=JOB_EVENT_STREAM_SECONDS):
+                if event == 'keepalive':
+                    yield ': keepalive\n\n'
+                    continue
+                message = f"event: {event}\ndata: {json.dumps(data)}\n\n"
+                yield f"id: {event_id}\n{message}" if event_id is not None else message
+        except Exception as e:
+            print(f"[API] Error in /api/jobs events stream: {e}")
+            yield f"event: failed\ndata: {json.dumps({'error': str(e)})}\n\n"
+    
+    response = Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',  # don't let a proxy hold events back
+    })
+    response.call_on_close(event_streams.release)
+    return response
+
+
 @app.route('/api/download/<session_id>')
 def download(session_id: str):
     """Download processed document."""
@@ -682,6 +622,11 @@ def download(session_id: str):
                 'error': 'Processed document not found'
             }), 404
         
+        # Workbench edits are kept as note patches; build the document now
+        note_edits = session_data.get('note_edits')
+        if note_edits:
+            processed_doc = get_edit_session(session_id, processed_doc, note_edits).to_bytes()
+        
         from io import BytesIO
         buffer = BytesIO(processed_doc)
         buffer.seek(0)
@@ -745,7 +690,9 @@ def update_note():
         "html": "formatted citation text"
     }
     
-    This re-processes the document with the updated note.
+    The edit is applied to the session's open NoteEditSession (only the
+    edited note is rewritten) and saved as a note patch; the .docx is
+    rebuilt when it is downloaded.
     Updated: 2025-12-06 - Added retry logic and file locking
     """
     try:
@@ -767,17 +714,12 @@ def update_note():
                 'error': 'Missing session_id or note_id'
             }), 400
         
-        # Retry logic - wait for any concurrent writes to complete
-        session_data = None
-        for attempt in range(3):
-            session_data = sessions.get(session_id)
-            if session_data:
-                break
-            print(f"[API] Session {session_id[:8]} not found, attempt {attempt+1}/3, waiting...")
-            time.sleep(0.2)  # Wait 200ms between retries
+        # The session backend is shared by all workers, so whichever worker
+        # serves this request sees the latest state - no need to wait and retry
+        session_data = sessions.get(session_id)
         
         if not session_data:
-            print(f"[API] Session {session_id[:8]} NOT FOUND after 3 attempts")
+            print(f"[API] Session {session_id[:8]} not found")
             return jsonify({
                 'success': False,
                 'error': 'Session not found or expired'
@@ -801,17 +743,14 @@ def update_note():
                 'error': f'Note {note_id} not found'
             }), 404
         
-        # Update the document - this is the critical part
-        from document_processor import update_document_note
+        # Apply the edit to the open document - no package rebuild here
+        note_edits = dict(session_data.get('note_edits') or {})
+        note_edits[str(note_id)] = new_html
         try:
-            updated_doc = update_document_note(processed_doc, note_id, new_html)
+            editor = get_edit_session(session_id, processed_doc, note_edits)
             
-            # Verify the update actually changed something
-            if updated_doc == processed_doc:
-                print(f"[API] Warning: update_document_note returned unchanged document for note {note_id}")
-            
-            # Save updated document to session
-            sessions.set(session_id, 'processed_doc', updated_doc)
+            if not editor.has_note(note_id):
+                print(f"[API] Warning: note {note_id} not found in document, only results updated")
             
         except Exception as update_err:
             print(f"[API] Document update failed for note {note_id}: {update_err}")
@@ -820,10 +759,10 @@ def update_note():
                 'error': f'Failed to update document: {str(update_err)}'
             }), 500
         
-        # Update results array
+        # Update results array and save it with the note patches
         results[note_idx]['formatted'] = new_html
         results[note_idx]['success'] = True
-        sessions.set(session_id, 'results', results)
+        sessions.update(session_id, {'note_edits': note_edits, 'results': results})
         
         print(f"[API] Successfully updated note {note_id}")
         
@@ -841,6 +780,153 @@ def update_note():
         }), 500
 
 
+def run_author_date_job(file_bytes: bytes, params: dict, progress_callback=None) -> dict:
+    """
+    Process an uploaded document in author-date mode (job 'process-author-date').
+    
+    Args:
+        file_bytes: The uploaded .docx
+        params: {'style', 'filename'}
+        progress_callback: Optional callback(status, current, total)
+    
+    Returns:
+        The /api/process-author-date response (session ID, citations with
+        options, and stats)
+    """
+    # Extract author-date citations from document BODY TEXT
+    from processors.author_year_extractor import AuthorDateExtractor
+    
+    style = params['style']
+    publish = getattr(progress_callback, 'publish', None)
+    if progress_callback:
+        progress_callback("Extracting citations...", 0, 100)
+    
+    extractor = AuthorDateExtractor()
+    extracted_citations = extractor.extract_citations_from_docx(file_bytes)
+    unique_citations = extractor.get_unique_citations(extracted_citations)
+    
+    print(f"[API] Extracted {len(extracted_citations)} citations, {len(unique_citations)} unique")
+    
+    # Process citations in PARALLEL for speed
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    
+    def process_single_citation(idx, cite):
+        """Process one citation - called in parallel."""
+        if cite.is_et_al:
+            original_text = f"({cite.author} et al., {cite.year})"
+        elif cite.second_author:
+            original_text = f"({cite.author} & {cite.second_author}, {cite.year})"
+        else:
+            original_text = f"({cite.author}, {cite.year})"
+        
+        note_id = idx + 1
+        
+        try:
+            options = get_parenthetical_options(original_text, style, limit=4)
+            
+            formatted_options = [{
+                'id': 0,
+                'title': '[Keep Original]',
+                'formatted': original_text,
+                'authors': [],
+                'year': '',
+                'journal': '',
+                'publisher': '',
+                'doi': '',
+                'source': 'original',
+                'is_original': True
+            }]
+            
+            for opt_idx, (meta, formatted) in enumerate(options):
+                formatted_options.append({
+                    'id': opt_idx + 1,
+                    'title': meta.title if meta else '',
+                    'formatted': formatted,
+                    'authors': meta.authors if meta else [],
+                    'year': meta.year if meta else '',
+                    'journal': getattr(meta, 'journal', '') or '',
+                    'publisher': getattr(meta, 'publisher', '') or '',
+                    'doi': getattr(meta, 'doi', '') or '',
+                    'source': getattr(meta, 'source_engine', 'Unknown'),
+                    'is_original': False
+                })
+            
+            recommendation = formatted_options[1]['formatted'] if len(formatted_options) > 1 else original_text
+            
+            return {
+                'id': idx + 1,
+                'note_id': note_id,
+                'original': original_text,
+                'recommendation': recommendation,
+                'options': formatted_options
+            }
+            
+        except Exception as e:
+            print(f"[API] Error processing '{original_text[:40]}': {e}")
+            return {
+                'id': idx + 1,
+                'note_id': note_id,
+                'original': original_text,
+                'recommendation': original_text,
+                'options': [{
+                    'id': 0,
+                    'title': '[Keep Original]',
+                    'formatted': original_text,
+                    'authors': [],
+                    'year': '',
+                    'journal': '',
+                    'publisher': '',
+                    'doi': '',
+                    'source': 'original',
+                    'is_original': True
+                }],
+                'error': str(e)
+            }
+    
+    # Run lookups in parallel (up to 5 concurrent)
+    if progress_callback:
+        progress_callback("Looking up citations...", 10, 100)
+    citations = [None] * len(unique_citations)
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        futures = {
+            executor.submit(process_single_citation, idx, cite): idx 
+            for idx, cite in enumerate(unique_citations)
+        }
+        for completed, future in enumerate(as_completed(futures), 1):
+            idx = futures[future]
+            citations[idx] = future.result()
+            print(f"[API] Completed citation {idx + 1}/{len(unique_citations)}")
+            if progress_callback:
+                pct = 10 + int((completed / len(unique_citations)) * 85)  # 10-95%
+                progress_callback(f"Found {completed}/{len(unique_citations)} references", pct, 100)
+            if publish:
+                publish('citation', citations[idx])
+    
+    # Create session to store results (one write for all fields)
+    session_id = sessions.create({
+        'original_bytes': file_bytes,
+        'style': style,
+        'mode': 'author-date',
+        'citations': citations,
+        'filename': params['filename'],
+    })
+    print(f"[API] Created author-date session {session_id[:8]}... for document {params['filename']}")
+    
+    return {
+        'success': True,
+        'session_id': session_id,
+        'citations': citations,
+        'stats': {
+            'total': len(citations),
+            'with_options': sum(1 for c in citations if len(c.get('options', [])) > 1),
+            'no_options': sum(1 for c in citations if len(c.get('options', [])) <= 1)
+        }
+    }
+
+
+jobs.register('process-author-date', run_author_date_job)
+
+
 @app.route('/api/process-author-date', methods=['POST'])
 def process_author_date():
     """
@@ -852,8 +938,10 @@ def process_author_date():
     Request: multipart/form-data with 'file' field
     Optional form fields:
         - style: Citation style (default: 'apa')
+        - wait: 'true' to process within this request
     
-    Response:
+    Returns 202 with {"job_id": ..., "status_url": "/api/jobs/<job_id>"};
+    the finished job's result (or the response with wait=true) is:
     {
         "success": true,
         "session_id": "uuid",
@@ -897,128 +985,15 @@ def process_author_date():
                 'error': 'Only .docx files are supported'
             }), 400
         
-        style = request.form.get('style', 'apa')  # Default to APA for author-date
-        
-        # Read file bytes
+        params = {
+            'style': request.form.get('style', 'apa'),  # Default to APA for author-date
+            'filename': secure_filename(file.filename),
+        }
         file_bytes = file.read()
         
-        # Extract author-date citations from document BODY TEXT
-        from processors.author_year_extractor import AuthorDateExtractor
-        
-        extractor = AuthorDateExtractor()
-        extracted_citations = extractor.extract_citations_from_docx(file_bytes)
-        unique_citations = extractor.get_unique_citations(extracted_citations)
-        
-        print(f"[API] Extracted {len(extracted_citations)} citations, {len(unique_citations)} unique")
-        
-        # Process citations in PARALLEL for speed
-        from concurrent.futures import ThreadPoolExecutor, as_completed
-        
-        def process_single_citation(idx, cite):
-            """Process one citation - called in parallel."""
-            if cite.is_et_al:
-                original_text = f"({cite.author} et al., {cite.year})"
-            elif cite.second_author:
-                original_text = f"({cite.author} & {cite.second_author}, {cite.year})"
-            else:
-                original_text = f"({cite.author}, {cite.year})"
-            
-            note_id = idx + 1
-            
-            try:
-                options = get_parenthetical_options(original_text, style, limit=4)
-                
-                formatted_options = [{
-                    'id': 0,
-                    'title': '[Keep Original]',
-                    'formatted': original_text,
-                    'authors': [],
-                    'year': '',
-                    'journal': '',
-                    'publisher': '',
-                    'doi': '',
-                    'source': 'original',
-                    'is_original': True
-                }]
-                
-                for opt_idx, (meta, formatted) in enumerate(options):
-                    formatted_options.append({
-                        'id': opt_idx + 1,
-                        'title': meta.title if meta else '',
-                        'formatted': formatted,
-                        'authors': meta.authors if meta else [],
-                        'year': meta.year if meta else '',
-                        'journal': getattr(meta, 'journal', '') or '',
-                        'publisher': getattr(meta, 'publisher', '') or '',
-                        'doi': getattr(meta, 'doi', '') or '',
-                        'source': getattr(meta, 'source_engine', 'Unknown'),
-                        'is_original': False
-                    })
-                
-                recommendation = formatted_options[1]['formatted'] if len(formatted_options) > 1 else original_text
-                
-                return {
-                    'id': idx + 1,
-                    'note_id': note_id,
-                    'original': original_text,
-                    'recommendation': recommendation,
-                    'options': formatted_options
-                }
-                
-            except Exception as e:
-                print(f"[API] Error processing '{original_text[:40]}': {e}")
-                return {
-                    'id': idx + 1,
-                    'note_id': note_id,
-                    'original': original_text,
-                    'recommendation': original_text,
-                    'options': [{
-                        'id': 0,
-                        'title': '[Keep Original]',
-                        'formatted': original_text,
-                        'authors': [],
-                        'year': '',
-                        'journal': '',
-                        'publisher': '',
-                        'doi': '',
-                        'source': 'original',
-                        'is_original': True
-                    }],
-                    'error': str(e)
-                }
-        
-        # Run lookups in parallel (up to 5 concurrent)
-        citations = [None] * len(unique_citations)
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            futures = {
-                executor.submit(process_single_citation, idx, cite): idx 
-                for idx, cite in enumerate(unique_citations)
-            }
-            for future in as_completed(futures):
-                idx = futures[future]
-                citations[idx] = future.result()
-                print(f"[API] Completed citation {idx + 1}/{len(unique_citations)}")
-        
-        # Create session to store results
-        session_id = sessions.create()
-        print(f"[API] Created author-date session {session_id[:8]}... for document {file.filename}")
-        
-        sessions.set(session_id, 'original_bytes', file_bytes)
-        sessions.set(session_id, 'style', style)
-        sessions.set(session_id, 'mode', 'author-date')
-        sessions.set(session_id, 'citations', citations)
-        sessions.set(session_id, 'filename', secure_filename(file.filename))
-        
-        return jsonify({
-            'success': True,
-            'session_id': session_id,
-            'citations': citations,
-            'stats': {
-                'total': len(citations),
-                'with_options': sum(1 for c in citations if len(c.get('options', [])) > 1),
-                'no_options': sum(1 for c in citations if len(c.get('options', [])) <= 1)
-            }
-        })
+        if wants_inline():
+            return jsonify(run_author_date_job(file_bytes, params))
+        return submit_job('process-author-date', file_bytes, params)
         
     except Exception as e:
         print(f"[API] Error in /api/process-author-date: {e}")
@@ -1166,14 +1141,16 @@ def finalize_author_date():
         processor = WordDocumentProcessor(BytesIO(original_bytes))
         
         # Update each note with its selected citation
+        note_contents = {}
         for citation in citations:
             note_id = citation.get('note_id')
             formatted = citation.get('formatted') or citation.get('original')
             
             if note_id and formatted:
-                # Try endnote first, then footnote
-                if not processor.write_endnote(note_id, formatted):
-                    processor.write_footnote(note_id, formatted)
+                note_contents[note_id] = formatted
+        
+        # Write all notes in one batch (tries endnote first, then footnote)
+        processor.write_notes(note_contents)
         
         # Save to buffer
         doc_buffer = processor.save_to_buffer()
@@ -1181,7 +1158,7 @@ def finalize_author_date():
         
         # Store processed document
         processed_bytes = doc_buffer.read()
-        sessions.set(session_id, 'processed_doc', processed_bytes)
+        sessions.update(session_id, {'processed_doc': processed_bytes, 'note_edits': {}})
         
         return jsonify({
             'success': True,
@@ -1203,8 +1180,10 @@ def health():
     return jsonify({
         'status': 'healthy',
         'version': '2.1.0',  # Updated version for author-date support
-        'sessions_count': len(sessions._sessions),
-        'persistence': sessions._persistence_available
+        'sessions_count': len(sessions),
+        'persistence': sessions.persistence_available,
+        'jobs': jobs.stats(),
+        'upstreams': rate_limit.status()
     })
 
 
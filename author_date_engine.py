@@ -13,15 +13,81 @@ Integrates with existing CiteFlex engines:
 - Google Scholar via SERPAPI (fallback)
 
 Created: 2025-12-10
+
+Version History:
+    2026-10-16: search() fans out through engines.orchestrator (shared I/O pool,
+                stragglers cancelled at the deadline instead of raising)
+    2026-10-16: Dropped the fixed 0.5s sleep in search_multiple(); upstreams are
+                throttled by engines/rate_limit.py
+    2026-10-16: Added search_batch(): a document's citations are resolved with a few
+                multi-author OpenAlex/Crossref requests, per-citation search() only
+                for what those miss; search_multiple() uses it
+    2026-10-16: search_batch() sends its low-confidence citations to GPT-4o and then
+                Claude in batched prompts (AI_BATCH_SIZE per call) instead of one
+                call per citation; all AI guesses are verified by _ai_result()
+                (every stage, AI tiers included, fits in search_batch's timeout)
 """
 
 import re
+import copy
 import time
+import asyncio
+import threading
 from typing import Optional, List, Tuple, Dict, Any
 from dataclasses import dataclass
-from concurrent.futures import ThreadPoolExecutor, as_completed
-
 from models import CitationMetadata, CitationType
+from engines.orchestrator import run_blocking, run_stage, fan_out, run_sync
+
+
+# Batched lookup (search_batch)
+BATCH_OPENALEX_SIZE = 25       # citations per OpenAlex OR-filter request
+BATCH_OPENALEX_ROWS = 200      # OpenAlex's per-page maximum
+BATCH_CROSSREF_AUTHORS = 10    # surnames per Crossref request (one year per request)
+BATCH_CROSSREF_ROWS_PER_AUTHOR = 20
+BATCH_MIN_CONFIDENCE = 0.5     # same bar search() uses before trying AI
+BATCH_FALLBACK_WORKERS = 4     # concurrent per-citation searches for leftovers
+BATCH_REQUEST_TIMEOUT = 15.0   # per batch stage (OpenAlex, Crossref)
+
+CROSSREF_SELECT = (
+    'DOI,title,author,published-print,published-online,created,container-title,'
+    'volume,issue,page,type,publisher'
+)
+
+# A document citation: (author, year, second_author, third_author); 3-tuples accepted
+CitationTuple = Tuple[Any, ...]
+
+# Batched AI fallback (search_batch): citations per GPT-4o / Claude prompt
+AI_BATCH_SIZE = 40
+AI_BATCH_TIMEOUT = 90.0        # per AI tier, capped by what's left of search_batch's deadline
+AI_BATCH_RESERVE = 0.35        # share of the time left after stage 2 kept for the AI tiers
+AI_MIN_TIME = 2.0              # don't start an AI tier with less time than this
+
+AI_TYPE_MAP = {
+    'journal': CitationType.JOURNAL,
+    'book': CitationType.BOOK,
+    'newspaper': CitationType.NEWSPAPER,
+    'medical': CitationType.MEDICAL,
+}
+
+AI_BATCH_PROMPT = """Identify each numbered academic citation reference below.
+
+Return a JSON array with one object per reference:
+- index: the reference number (1-based)
+- title: full title of the work
+- authors: array of author names (full names, not just surnames)
+- year: publication year
+- type: "journal", "book", or "newspaper"
+- journal: journal name (if journal article)
+- volume: volume number (if applicable)
+- issue: issue number (if applicable)
+- pages: page range (if applicable)
+- publisher: publisher name (if book)
+- doi: DOI if you know it
+- confidence: your confidence 0.0 to 1.0
+
+If you don't recognize a reference, give only its index and confidence 0.0.
+Never invent works - only identify works you believe actually exist.
+Only respond with the JSON array, no other text."""
 
 
 @dataclass
@@ -122,52 +188,7 @@ class AuthorDateEngine:
             # Can't search without a year effectively
             return None
         
-        results: List[SearchResult] = []
-        
-        # Build search queries - use all available authors for better disambiguation
-        authors_list = [author]
-        if second_author:
-            authors_list.append(second_author)
-        if third_author:
-            authors_list.append(third_author)
-        
-        query_simple = f"{author} {year}"
-        query_with_authors = f"{' '.join(authors_list)} {year}"
-        
-        # Run searches in parallel (free/cheap engines only)
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            futures = {}
-            
-            # Crossref (free)
-            cr = self._get_crossref()
-            if cr:
-                futures[executor.submit(
-                    self._search_crossref, author, year, second_author, third_author
-                )] = "crossref"
-            
-            # OpenAlex (free)
-            oa = self._get_openalex()
-            if oa:
-                futures[executor.submit(
-                    self._search_openalex, author, year, second_author, third_author
-                )] = "openalex"
-            
-            # Google Scholar via SerpAPI (paid but cheaper than Claude)
-            gs = self._get_google_scholar()
-            if gs:
-                futures[executor.submit(
-                    self._search_google_scholar, author, year, second_author, third_author
-                )] = "google_scholar"
-            
-            # Collect results
-            for future in as_completed(futures, timeout=timeout):
-                try:
-                    result = future.result()
-                    if result:
-                        results.extend(result)
-                except Exception as e:
-                    source = futures.get(future, "unknown")
-                    print(f"[AuthorDateEngine] {source} error: {e}")
+        results = self._search_free(author, year, second_author, third_author, timeout)
         
         # Check if we have a good result
         if results:
@@ -185,7 +206,7 @@ class AuthorDateEngine:
             print(f"[AuthorDateEngine] No results for {author} ({year}), trying AI fallback...")
         
         # TIER 2 FALLBACK: GPT-4o (~7x cheaper than Claude Opus)
-        gpt_results = self._search_gpt4o(author, year, second_author, context)
+        gpt_results = self._search_gpt4o(author, year, second_author, third_author, context=context)
         if gpt_results:
             # Check if GPT-4o found something good
             gpt_results.sort(reverse=True)
@@ -200,7 +221,7 @@ class AuthorDateEngine:
         # TIER 3 FALLBACK: Claude Opus (expensive, last resort)
         # Only call Claude if GPT-4o didn't produce good results
         if not gpt_results or (gpt_results and gpt_results[0].confidence < 0.5):
-            claude_results = self._search_claude(author, year, second_author, context)
+            claude_results = self._search_claude(author, year, second_author, third_author, context=context)
             if claude_results:
                 results.extend(claude_results)
         
@@ -220,6 +241,45 @@ class AuthorDateEngine:
         
         return best.metadata
     
+    def _search_free(
+        self,
+        author: str,
+        year: str,
+        second_author: Optional[str],
+        third_author: Optional[str] = None,
+        timeout: float = 8.0
+    ) -> List[SearchResult]:
+        """Query the free/cheap engines concurrently; every candidate they return."""
+        results: List[SearchResult] = []
+        
+        # Run searches in parallel (free/cheap engines only) on the shared
+        # engine I/O pool; anything still running at the deadline is dropped
+        lookups = []
+        
+        # Crossref (free)
+        if self._get_crossref():
+            lookups.append(("crossref", run_blocking(
+                self._search_crossref, author, year, second_author, third_author
+            )))
+        
+        # OpenAlex (free)
+        if self._get_openalex():
+            lookups.append(("openalex", run_blocking(
+                self._search_openalex, author, year, second_author, third_author
+            )))
+        
+        # Google Scholar via SerpAPI (paid but cheaper than Claude)
+        if self._get_google_scholar():
+            lookups.append(("google_scholar", run_blocking(
+                self._search_google_scholar, author, year, second_author, third_author
+            )))
+        
+        # Collect results
+        for source, result in run_sync(fan_out(lookups, timeout=timeout)).items():
+            if result:
+                results.extend(result)
+        return results
+    
     def _search_semantic_scholar(
         self,
         author: str,
@@ -402,49 +462,12 @@ class AuthorDateEngine:
             
             guess = guess_citation(query)
             
-            if guess.get('confidence', 0) < 0.5:
-                print(f"[AuthorDateEngine] Claude low confidence: {guess.get('confidence', 0)}")
-                return results
-            
-            # Build CitationMetadata from Claude's guess
-            from models import CitationType
-            
-            type_map = {
-                'journal': CitationType.JOURNAL,
-                'book': CitationType.BOOK,
-                'newspaper': CitationType.NEWSPAPER,
-                'medical': CitationType.MEDICAL,
-            }
-            
-            metadata = CitationMetadata(
-                citation_type=type_map.get(guess.get('type', 'journal'), CitationType.JOURNAL),
-                title=guess.get('title', ''),
-                authors=guess.get('authors', []),
-                year=guess.get('year', year),
-                journal=guess.get('journal', ''),
-                volume=guess.get('volume', ''),
-                issue=guess.get('issue', ''),
-                pages=guess.get('pages', ''),
-                publisher=guess.get('publisher', ''),
-                doi=guess.get('doi', ''),
-                source_engine="Claude AI"
+            result = self._ai_result(
+                guess, author, year, second_author, third_author,
+                "Claude", "Claude AI", "Claude AI contextual match"
             )
-            
-            # Verify author name appears in result
-            author_lower = author.lower()
-            authors_match = any(author_lower in a.lower() for a in metadata.authors) if metadata.authors else False
-            
-            if metadata.title and authors_match:
-                confidence = guess.get('confidence', 0.7)
-                # Claude results get a small boost since they're contextual
-                results.append(SearchResult(
-                    metadata=metadata,
-                    confidence=min(0.95, confidence + 0.1),
-                    match_reason="Claude AI contextual match"
-                ))
-                print(f"[AuthorDateEngine] Claude found: {metadata.title[:50]}...")
-            else:
-                print(f"[AuthorDateEngine] Claude result didn't match author: {metadata.authors}")
+            if result:
+                results.append(result)
                 
         except ImportError:
             print("[AuthorDateEngine] Claude router not available")
@@ -478,7 +501,7 @@ class AuthorDateEngine:
             return results
         
         try:
-            import requests
+            from engines.http_client import http_post
             
             # Build query with all available authors
             authors_str = author
@@ -511,7 +534,7 @@ Only respond with valid JSON, no other text."""
 
             print(f"[AuthorDateEngine] Trying GPT-4o for: {authors_str} ({year})")
             
-            response = requests.post(
+            response = http_post(
                 "https://api.openai.com/v1/chat/completions",
                 headers={
                     "Authorization": f"Bearer {api_key}",
@@ -550,48 +573,12 @@ Only respond with valid JSON, no other text."""
             
             guess = json.loads(content)
             
-            if guess.get('confidence', 0) < 0.5:
-                print(f"[AuthorDateEngine] GPT-4o low confidence: {guess.get('confidence', 0)}")
-                return results
-            
-            # Build CitationMetadata from GPT-4o's guess
-            from models import CitationType
-            
-            type_map = {
-                'journal': CitationType.JOURNAL,
-                'book': CitationType.BOOK,
-                'newspaper': CitationType.NEWSPAPER,
-                'medical': CitationType.MEDICAL,
-            }
-            
-            metadata = CitationMetadata(
-                citation_type=type_map.get(guess.get('type', 'journal'), CitationType.JOURNAL),
-                title=guess.get('title', ''),
-                authors=guess.get('authors', []),
-                year=guess.get('year', year),
-                journal=guess.get('journal', ''),
-                volume=guess.get('volume', ''),
-                issue=guess.get('issue', ''),
-                pages=guess.get('pages', ''),
-                publisher=guess.get('publisher', ''),
-                doi=guess.get('doi', ''),
-                source_engine="GPT-4o"
+            result = self._ai_result(
+                guess, author, year, second_author, third_author,
+                "GPT-4o", "GPT-4o", "GPT-4o contextual match"
             )
-            
-            # Verify author name appears in result
-            author_lower = author.lower()
-            authors_match = any(author_lower in a.lower() for a in metadata.authors) if metadata.authors else False
-            
-            if metadata.title and authors_match:
-                confidence = guess.get('confidence', 0.7)
-                results.append(SearchResult(
-                    metadata=metadata,
-                    confidence=min(0.95, confidence + 0.1),
-                    match_reason="GPT-4o contextual match"
-                ))
-                print(f"[AuthorDateEngine] GPT-4o found: {metadata.title[:50]}...")
-            else:
-                print(f"[AuthorDateEngine] GPT-4o result didn't match author: {metadata.authors}")
+            if result:
+                results.append(result)
                 
         except ImportError as e:
             print(f"[AuthorDateEngine] GPT-4o import error: {e}")
@@ -602,6 +589,74 @@ Only respond with valid JSON, no other text."""
         
         return results
     
+    def _ai_result(
+        self,
+        guess: dict,
+        author: str,
+        year: str,
+        second_author: Optional[str],
+        third_author: Optional[str],
+        label: str,
+        source_engine: str,
+        match_reason: str
+    ) -> Optional[SearchResult]:
+        """
+        Turn a model's guess into a SearchResult, or None if it doesn't verify.
+        
+        The guess must be confident (>= 0.5), name the cited author, and pass
+        _calculate_confidence() against the citation like an engine result.
+        Single and batched GPT-4o/Claude lookups all go through here.
+        """
+        if not isinstance(guess, dict):
+            return None
+        try:
+            confidence = float(guess.get('confidence', 0) or 0)
+        except (TypeError, ValueError):
+            confidence = 0.0
+        if confidence < 0.5:
+            print(f"[AuthorDateEngine] {label} low confidence for {author} ({year}): {confidence}")
+            return None
+        
+        authors = guess.get('authors') or []
+        if isinstance(authors, str):
+            authors = [authors]
+        
+        metadata = CitationMetadata(
+            citation_type=AI_TYPE_MAP.get(guess.get('type', 'journal'), CitationType.JOURNAL),
+            title=guess.get('title', '') or '',
+            authors=[str(a) for a in authors],
+            year=str(guess.get('year') or year),
+            journal=guess.get('journal', '') or '',
+            volume=str(guess.get('volume', '') or ''),
+            issue=str(guess.get('issue', '') or ''),
+            pages=str(guess.get('pages', '') or ''),
+            publisher=guess.get('publisher', '') or '',
+            doi=guess.get('doi', '') or '',
+            source_engine=source_engine
+        )
+        
+        # Verify author name appears in result
+        author_lower = author.lower()
+        if not metadata.title or not any(author_lower in a.lower() for a in metadata.authors):
+            print(f"[AuthorDateEngine] {label} result didn't match author: {metadata.authors}")
+            return None
+        
+        score = self._calculate_confidence(
+            metadata, author, _numeric_year(year) or year, second_author, third_author
+        )
+        if score < BATCH_MIN_CONFIDENCE:
+            print(f"[AuthorDateEngine] {label} result for {author} ({year}) failed verification "
+                  f"(score {score:.2f}): {metadata.title[:50]}")
+            return None
+        
+        print(f"[AuthorDateEngine] {label} found: {metadata.title[:50]}...")
+        # AI results get a small boost since they're contextual
+        return SearchResult(
+            metadata=metadata,
+            confidence=min(0.95, confidence + 0.1),
+            match_reason=match_reason
+        )
+    
     def _calculate_confidence(
         self,
         metadata: CitationMetadata,
@@ -683,7 +738,7 @@ Only respond with valid JSON, no other text."""
         progress_callback=None
     ) -> Dict[Tuple[str, str], Optional[CitationMetadata]]:
         """
-        Search for multiple citations.
+        Search for multiple citations (see search_batch).
         
         Args:
             citations: List of (author, year, second_author, third_author) tuples
@@ -692,34 +747,458 @@ Only respond with valid JSON, no other text."""
         Returns:
             Dict mapping (author, year) to CitationMetadata (or None if not found)
         """
-        results = {}
-        total = len(citations)
+        return self.search_batch(citations, progress_callback=progress_callback)
+    
+    # -------------------------------------------------------------------------
+    # Batched lookup
+    # -------------------------------------------------------------------------
+    
+    def search_batch(
+        self,
+        citations: List[CitationTuple],
+        context: Optional[str] = None,
+        timeout: float = 90.0,
+        progress_callback=None
+    ) -> Dict[Tuple[str, str], Optional[CitationMetadata]]:
+        """
+        Resolve all of a document's citations with as few requests as possible.
         
-        for i, citation_tuple in enumerate(citations):
-            if progress_callback:
-                progress_callback(i + 1, total)
-            
-            # Handle both 3-tuple and 4-tuple formats for backward compatibility
-            if len(citation_tuple) == 4:
-                author, year, second_author, third_author = citation_tuple
-            else:
-                author, year, second_author = citation_tuple
-                third_author = None
+        1. OpenAlex: one request per BATCH_OPENALEX_SIZE citations, filtering
+           on all their years and surnames at once (OR-filters)
+        2. Crossref: for citations still open, one request per year with up
+           to BATCH_CROSSREF_AUTHORS surnames
+        3. The free engines per citation (as in search()) for the rest
+        4. Citations still below BATCH_MIN_CONFIDENCE: one GPT-4o prompt per
+           AI_BATCH_SIZE citations, then one Claude prompt for whatever
+           GPT-4o couldn't identify
+        
+        Works returned by the batch requests are matched back to citations
+        with _calculate_confidence(); a match needs BATCH_MIN_CONFIDENCE,
+        the same bar search() applies. AI guesses are verified by
+        _ai_result() exactly as in search().
+        
+        All four stages share one deadline: stage 3 stops early enough to
+        leave AI_BATCH_RESERVE of the remaining time for stage 4, and each
+        AI tier gets at most what is left.
+        
+        Args:
+            citations: (author, year, second_author[, third_author]) tuples
+            context: Optional document field (e.g. "psychology") for the AI prompts
+            timeout: Deadline in seconds for the whole lookup
+            progress_callback: Optional callback(current, total) as citations resolve
             
-            key = (author.lower(), year)
+        Returns:
+            Dict mapping (author.lower(), year) (stripped) to CitationMetadata (or None)
+        """
+        deadline = time.monotonic() + timeout
+        pending: Dict[Tuple[str, str], Tuple[str, str, Optional[str], Optional[str]]] = {}
+        for citation in citations:
+            author, year, second_author = citation[:3]
+            third_author = citation[3] if len(citation) > 3 else None
+            pending.setdefault((author.lower().strip(), year.strip()), (author, year, second_author, third_author))
+        
+        results: Dict[Tuple[str, str], Optional[CitationMetadata]] = {key: None for key in pending}
+        total = len(results)
+        
+        def report():
+            if progress_callback:
+                progress_callback(sum(1 for m in results.values() if m), total)
+        
+        # Only citations with a numeric year can go into a year filter
+        batchable = {key: c for key, c in pending.items() if _numeric_year(c[1])}
+        
+        for stage in (self._batch_openalex, self._batch_crossref):
+            if not batchable:
+                break
+            for key, metadata in stage(batchable, _time_left(deadline)).items():
+                results[key] = metadata
+                del batchable[key]
+                del pending[key]
+            report()
+        
+        found = total - len(pending)
+        print(f"[AuthorDateEngine] Batch resolved {found}/{total} citations; "
+              f"{len(pending)} left for individual search")
+        
+        if not pending:
+            return results
+        
+        results_lock = threading.Lock()
+        
+        def accept(key, best: Optional[SearchResult]):
+            """Stage 3 result (called from the lookup threads as they finish)."""
+            if best and best.confidence >= BATCH_MIN_CONFIDENCE:
+                author, year = pending[key][:2]
+                print(f"[AuthorDateEngine] Found {author} ({year}): {best.metadata.title[:50]}... "
+                      f"(confidence: {best.confidence:.2f})")
+                best.metadata.raw_source = f"({author}, {year})"
+                with results_lock:
+                    results[key] = best.metadata
+                    report()
+        
+        candidates = self._search_each(pending, _time_left(deadline) * (1 - AI_BATCH_RESERVE), on_result=accept)
+        low_confidence = {
+            key: citation for key, citation in pending.items()
+            if not results[key] and citation[1] != "n.d."
+        }
+        
+        if low_confidence:
+            ai_results = self._search_ai_batch(low_confidence, context, deadline)
+            for key, (author, year, _, _) in low_confidence.items():
+                options = ai_results.get(key, []) + ([candidates[key]] if candidates.get(key) else [])
+                if not options:
+                    print(f"[AuthorDateEngine] No results found for {author} ({year})")
+                    continue
+                # Same pick as search(): best of the AI results and the low-confidence free result
+                best = max(options)
+                print(f"[AuthorDateEngine] Best match for {author} ({year}): {best.metadata.title[:50]}... "
+                      f"(confidence: {best.confidence:.2f}, source: {best.match_reason})")
+                best.metadata.raw_source = f"({author}, {year})"
+                results[key] = best.metadata
+            report()
+        return results
+    
+    def _batch_openalex(
+        self,
+        citations: Dict[Tuple[str, str], tuple],
+        timeout: float
+    ) -> Dict[Tuple[str, str], CitationMetadata]:
+        """Stage 1: OpenAlex OR-filter requests over years x surnames."""
+        oa = self._get_openalex()
+        if not oa:
+            return {}
+        
+        keys = list(citations)
+        groups = [keys[i:i + BATCH_OPENALEX_SIZE] for i in range(0, len(keys), BATCH_OPENALEX_SIZE)]
+        
+        def fetch(group: List[Tuple[str, str]]) -> List[CitationMetadata]:
+            years = sorted({_numeric_year(citations[key][1]) for key in group})
+            surnames = sorted({_filter_value(citations[key][0]) for key in group} - {''})
+            params = {
+                'filter': f"publication_year:{'|'.join(years)},raw_author_name.search:{'|'.join(surnames)}",
+                'per-page': BATCH_OPENALEX_ROWS,
+                'sort': 'cited_by_count:desc',
+            }
+            response = oa._make_request(oa.base_url, params=params)
+            if not response:
+                return []
+            try:
+                return [oa._normalize(item, 'author-year batch') for item in response.json().get('results', [])]
+            except Exception as e:
+                print(f"[AuthorDateEngine] OpenAlex batch parse error: {e}")
+                return []
+        
+        works = self._fetch_groups('openalex', fetch, groups, timeout)
+        return self._match_works(citations, works, "OpenAlex batch author+year match")
+    
+    def _batch_crossref(
+        self,
+        citations: Dict[Tuple[str, str], tuple],
+        timeout: float
+    ) -> Dict[Tuple[str, str], CitationMetadata]:
+        """Stage 2: Crossref author queries, one year per request."""
+        cr = self._get_crossref()
+        if not cr:
+            return {}
+        
+        by_year: Dict[str, List[Tuple[str, str]]] = {}
+        for key, citation in citations.items():
+            by_year.setdefault(_numeric_year(citation[1]), []).append(key)
+        groups = [
+            (year, keys[i:i + BATCH_CROSSREF_AUTHORS])
+            for year, keys in sorted(by_year.items())
+            for i in range(0, len(keys), BATCH_CROSSREF_AUTHORS)
+        ]
+        
+        def fetch(group: Tuple[str, List[Tuple[str, str]]]) -> List[CitationMetadata]:
+            year, keys = group
+            surnames = sorted({_filter_value(citations[key][0]) for key in keys} - {''})
+            params = {
+                'query.author': ' '.join(surnames),
+                'filter': f"from-pub-date:{year},until-pub-date:{year}",
+                'rows': BATCH_CROSSREF_ROWS_PER_AUTHOR * len(surnames),
+                'select': CROSSREF_SELECT,
+            }
+            response = cr._make_request(cr.base_url, params=params)
+            if not response:
+                return []
+            try:
+                items = response.json().get('message', {}).get('items', [])
+                return [cr._normalize(item, 'author-year batch') for item in items]
+            except Exception as e:
+                print(f"[AuthorDateEngine] Crossref batch parse error: {e}")
+                return []
+        
+        works = self._fetch_groups('crossref', fetch, groups, timeout)
+        # Same DOI boost as _search_crossref()
+        return self._match_works(citations, works, "Crossref batch author+year match", doi_boost=0.1)
+    
+    def _fetch_groups(self, label: str, fetch, groups: list, timeout: float) -> List[CitationMetadata]:
+        """Run one batch request per group concurrently; returns every work received."""
+        if not groups or timeout <= 0:
+            return []
+        lookups = [(f"{label}-batch-{i}", run_blocking(fetch, group)) for i, group in enumerate(groups)]
+        works: List[CitationMetadata] = []
+        for result in run_sync(fan_out(lookups, timeout=min(BATCH_REQUEST_TIMEOUT, timeout))).values():
+            works.extend(result or [])
+        print(f"[AuthorDateEngine] {label} batch: {len(groups)} requests, {len(works)} works")
+        return works
+    
+    def _match_works(
+        self,
+        citations: Dict[Tuple[str, str], tuple],
+        works: List[CitationMetadata],
+        match_reason: str,
+        doi_boost: float = 0.0
+    ) -> Dict[Tuple[str, str], CitationMetadata]:
+        """
+        Pick the best work for each citation from a batch response.
+        
+        Candidates must be from the citation's year and list its first author
+        as a whole word; ties keep response order (OpenAlex: most cited first).
+        Citations that differ only by year suffix ("Smith 2020a", "Smith
+        2020b") never get the same work: they are matched in suffix order and
+        each skips works already given to another. Every citation gets its
+        own copy of the work.
+        """
+        by_year: Dict[str, List[CitationMetadata]] = {}
+        for work in works:
+            if work and work.title and work.year:
+                by_year.setdefault(work.year, []).append(work)
+        
+        matched = {}
+        claimed: Dict[Tuple[str, str], set] = {}  # (author, numeric year) -> ids of works already matched
+        for key, (author, year, second_author, third_author) in sorted(citations.items()):
+            surname = re.compile(rf"\b{re.escape(author.lower())}\b")
+            taken = claimed.setdefault((author.lower().strip(), _numeric_year(year)), set())
+            best, best_confidence = None, BATCH_MIN_CONFIDENCE
+            for work in by_year.get(_numeric_year(year), []):
+                if id(work) in taken or not any(surname.search(a.lower()) for a in work.authors or []):
+                    continue
+                confidence = self._calculate_confidence(work, author, _numeric_year(year), second_author, third_author)
+                if work.doi:
+                    confidence = min(1.0, confidence + doi_boost)
+                if confidence > best_confidence or (best is None and confidence == best_confidence):
+                    best, best_confidence = work, confidence
             
+            if best is not None:
+                print(f"[AuthorDateEngine] Found {author} ({year}): {best.title[:50]}... "
+                      f"(confidence: {best_confidence:.2f}, source: {match_reason})")
+                taken.add(id(best))
+                matched[key] = copy.copy(best)
+                matched[key].raw_source = f"({author}, {year})"
+        return matched
+    
+    def _search_each(
+        self,
+        citations: Dict[Tuple[str, str], tuple],
+        timeout: float,
+        on_result=None
+    ) -> Dict[Tuple[str, str], Optional[SearchResult]]:
+        """
+        Stage 3: best free-engine result per citation, BATCH_FALLBACK_WORKERS at a time.
+        
+        on_result(key, best) is called from the lookup thread as each one
+        finishes. Lookups still running at the deadline are ignored when
+        they finish: the returned dict is a snapshot taken at the deadline.
+        """
+        results: Dict[Tuple[str, str], Optional[SearchResult]] = {key: None for key in citations}
+        lock = threading.Lock()
+        closed = False
+        
+        def search_one(key, author, year, second_author, third_author):
+            if year == "n.d.":
+                return None
             try:
-                metadata = self.search(author, year, second_author, third_author)
-                results[key] = metadata
+                found = self._search_free(author, year, second_author, third_author)
             except Exception as e:
                 print(f"[AuthorDateEngine] Error searching {author}, {year}: {e}")
-                results[key] = None
+                return None
+            best = max(found) if found else None
+            with lock:
+                if closed:
+                    return None
+                results[key] = best
+                if on_result:
+                    on_result(key, best)
+            return best
+        
+        async def run_all():
+            limit = asyncio.Semaphore(BATCH_FALLBACK_WORKERS)
+            
+            async def limited(key, citation):
+                async with limit:
+                    return await run_stage(search_one, key, *citation)
             
-            # Small delay to avoid rate limiting
-            if i < total - 1:
-                time.sleep(0.5)
+            return await fan_out(
+                [(f"{key[0]} {key[1]}", limited(key, citation)) for key, citation in citations.items()],
+                timeout=timeout
+            )
         
+        run_sync(run_all())
+        with lock:
+            closed = True
+            return dict(results)
+    
+    # -------------------------------------------------------------------------
+    # Batched AI fallback
+    # -------------------------------------------------------------------------
+    
+    def _search_ai_batch(
+        self,
+        citations: Dict[Tuple[str, str], tuple],
+        context: Optional[str],
+        deadline: float
+    ) -> Dict[Tuple[str, str], List[SearchResult]]:
+        """
+        Stage 4: GPT-4o for all low-confidence citations, Claude for the rest.
+        
+        Mirrors the per-citation tiers in search(), with one prompt per
+        AI_BATCH_SIZE citations instead of one per citation. GPT-4o gets at
+        most half of the time left before `deadline` (time.monotonic()),
+        Claude whatever remains; a tier is skipped with less than AI_MIN_TIME.
+        """
+        references = {key: _reference_text(*citation) for key, citation in citations.items()}
+        print(f"[AuthorDateEngine] Batched AI fallback for {len(references)} citations"
+              + (f" ({context})" if context else ""))
+        
+        results: Dict[Tuple[str, str], List[SearchResult]] = {}
+        
+        # TIER 2: GPT-4o (~7x cheaper than Claude Opus)
+        timeout = min(AI_BATCH_TIMEOUT, _time_left(deadline) / 2)
+        guesses = self._gpt4o_batch(list(references.values()), context, timeout) if timeout >= AI_MIN_TIME else {}
+        for key, reference in references.items():
+            result = self._ai_result(
+                guesses.get(reference), *citations[key],
+                "GPT-4o", "GPT-4o", "GPT-4o contextual match"
+            ) if reference in guesses else None
+            if result:
+                results[key] = [result]
+        
+        # TIER 3: Claude Opus, only for what GPT-4o couldn't identify
+        remaining = {key: reference for key, reference in references.items() if key not in results}
+        timeout = min(AI_BATCH_TIMEOUT, _time_left(deadline))
+        if remaining and timeout < AI_MIN_TIME:
+            print(f"[AuthorDateEngine] No time left for Claude ({len(remaining)} citations unidentified)")
+        elif remaining:
+            try:
+                from claude_router import batch_guess_citations
+                guesses = batch_guess_citations(
+                    list(remaining.values()),
+                    batch_size=AI_BATCH_SIZE,
+                    timeout=timeout,
+                    system=AI_BATCH_PROMPT,
+                    context=context
+                )
+            except ImportError:
+                print("[AuthorDateEngine] Claude router not available")
+                guesses = {}
+            for key, reference in remaining.items():
+                result = self._ai_result(
+                    guesses.get(reference), *citations[key],
+                    "Claude", "Claude AI", "Claude AI contextual match"
+                ) if reference in guesses else None
+                if result:
+                    results[key] = [result]
+        
+        print(f"[AuthorDateEngine] Batched AI fallback identified {len(results)}/{len(references)} citations")
         return results
+    
+    def _gpt4o_batch(self, references: List[str], context: Optional[str], timeout: float) -> Dict[str, dict]:
+        """GPT-4o guesses for many references, AI_BATCH_SIZE per call (calls run concurrently, within timeout)."""
+        import os
+        
+        api_key = os.environ.get('OPENAI_API_KEY')
+        if not api_key:
+            print("[AuthorDateEngine] GPT-4o: No OPENAI_API_KEY set")
+            return {}
+        
+        batches = [references[i:i + AI_BATCH_SIZE] for i in range(0, len(references), AI_BATCH_SIZE)]
+        
+        def ask(batch: List[str]) -> Dict[str, dict]:
+            from engines.http_client import http_post
+            
+            numbered = "\n".join(f"{i + 1}. {reference}" for i, reference in enumerate(batch))
+            context_hint = f"\n\nThese citations appear in a document about {context}." if context else ""
+            try:
+                response = http_post(
+                    "https://api.openai.com/v1/chat/completions",
+                    headers={
+                        "Authorization": f"Bearer {api_key}",
+                        "Content-Type": "application/json"
+                    },
+                    json={
+                        "model": "gpt-4o",
+                        "messages": [
+                            {"role": "system", "content": "You are a scholarly citation expert. Always respond with valid JSON only."},
+                            {"role": "user", "content": f"{AI_BATCH_PROMPT}{context_hint}\n\n{numbered}"}
+                        ],
+                        "temperature": 0.3,
+                        "max_tokens": 250 * len(batch) + 500
+                    },
+                    timeout=timeout
+                )
+                if response.status_code != 200:
+                    print(f"[AuthorDateEngine] GPT-4o batch API error: {response.status_code}")
+                    return {}
+                content = response.json().get('choices', [{}])[0].get('message', {}).get('content', '')
+                return _indexed_guesses(content, batch)
+            except Exception as e:
+                print(f"[AuthorDateEngine] GPT-4o batch error: {e}")
+                return {}
+        
+        print(f"[AuthorDateEngine] Trying GPT-4o for {len(references)} citations in {len(batches)} calls")
+        guesses: Dict[str, dict] = {}
+        lookups = [(f"gpt4o-batch-{n}", run_blocking(ask, batch)) for n, batch in enumerate(batches, 1)]
+        for result in run_sync(fan_out(lookups, timeout=timeout)).values():
+            guesses.update(result or {})
+        return guesses
+
+
+def _time_left(deadline: float) -> float:
+    """Seconds until a time.monotonic() deadline (never negative)."""
+    return max(deadline - time.monotonic(), 0.0)
+
+
+def _reference_text(author: str, year: str, second_author: Optional[str], third_author: Optional[str]) -> str:
+    """The "Author, Second, & Third (Year)" form the AI prompts use."""
+    authors_str = author
+    if second_author:
+        authors_str += f", {second_author}"
+    if third_author:
+        authors_str += f", & {third_author}"
+    return f"{authors_str} ({year})"
+
+
+def _indexed_guesses(content: str, batch: List[str]) -> Dict[str, dict]:
+    """Parse a JSON array of {"index": n, ...} guesses into reference -> guess."""
+    json_match = re.search(r'\[[\s\S]*\]', content or '')
+    if not json_match:
+        return {}
+    
+    import json
+    guesses = {}
+    for guess in json.loads(json_match.group()):
+        if not isinstance(guess, dict):
+            continue
+        try:
+            idx = int(guess.pop('index', 0)) - 1
+        except (TypeError, ValueError):
+            continue
+        if 0 <= idx < len(batch):
+            guesses[batch[idx]] = guess
+    return guesses
+
+
+def _numeric_year(year: str) -> str:
+    """The four-digit part of a citation year ("2020a" -> "2020"; "n.d." -> "")."""
+    match = re.match(r'\d{4}', (year or '').strip())
+    return match.group(0) if match else ''
+
+
+def _filter_value(surname: str) -> str:
+    """A surname made safe for API filter syntax (no separators)."""
+    return re.sub(r'[|,:+"]', ' ', surname or '').strip()
 
 
 # =============================================================================
@@ -14,12 +14,60 @@ Extracts in-text citations like:
 Returns unique (author, year) pairs for lookup.
 
 Created: 2025-12-10
+
+Version History:
+    2026-10-16: extract_from_text tracks matched spans in a sorted DisjointSpans
+                list (bisect) instead of scanning every earlier span per candidate;
+                scripts/bench_author_date_extractor.py times it by document size
+    2026-10-16: Added iter_body_paragraphs() - a single iterparse pass over
+                document.xml yielding paragraph text with offsets; the parsed tree
+                stays cached in the DocxPackage for later edits
 """
 
 import re
-from typing import List, Tuple, Set, Optional, NamedTuple
+import bisect
+import xml.etree.ElementTree as ET
+from typing import Iterator, List, Tuple, Set, Optional, NamedTuple
 from dataclasses import dataclass
 
+from docx_package import DocxPackage
+
+
+class DisjointSpans:
+    """
+    Non-overlapping (start, end) character spans, kept sorted by start.
+    
+    Because the spans never overlap, their ends are sorted too: a new span
+    can only collide with the last span starting before its end, so the
+    overlap check is one bisect instead of a scan of every span so far.
+    """
+    
+    def __init__(self):
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+    
+    def __len__(self) -> int:
+        return len(self._starts)
+    
+    def overlaps(self, start: int, end: int) -> bool:
+        """Whether [start, end) overlaps any span in the set."""
+        i = bisect.bisect_left(self._starts, end) - 1
+        return i >= 0 and self._ends[i] > start
+    
+    def add(self, start: int, end: int) -> bool:
+        """
+        Add [start, end) unless it overlaps an existing span.
+        
+        Returns:
+            True if the span was added
+        """
+        if self.overlaps(start, end):
+            return False
+        i = bisect.bisect_left(self._starts, start)
+        self._starts.insert(i, start)
+        self._ends.insert(i, end)
+        return True
+
 
 @dataclass
 class AuthorYearCitation:
@@ -180,7 +228,7 @@ class AuthorDateExtractor:
             return []
         
         citations = []
-        found_spans = set()  # Track character spans to avoid duplicates
+        found_spans = DisjointSpans()  # Track character spans to avoid duplicates
         found_keys = set()   # Track (author, year) to avoid dupes in multi-citations
         
         def add_if_new(citation, start, end, use_span=True):
@@ -188,12 +236,9 @@ class AuthorDateExtractor:
             key = (citation.author.lower(), citation.year)
             
             if use_span:
-                span_key = (start, end)
-                # Check for overlapping spans
-                for existing_start, existing_end in found_spans:
-                    if start < existing_end and end > existing_start:
-                        return False  # Overlapping
-                found_spans.add(span_key)
+                # Reject spans overlapping an earlier (higher-priority) match
+                if not found_spans.add(start, end):
+                    return False  # Overlapping
             else:
                 # For multi-citations, just check the key
                 if key in found_keys:
@@ -210,7 +255,8 @@ class AuthorDateExtractor:
             # Check if it actually contains multiple citations (has semicolon)
             if ';' in inner:
                 # Mark this span as used to prevent single-citation patterns from re-matching
-                found_spans.add((match.start(), match.end()))
+                # (finditer matches never overlap each other, so this always succeeds)
+                found_spans.add(match.start(), match.end())
                 
                 # Split by semicolon and process each citation segment
                 segments = inner.split(';')
@@ -594,6 +640,67 @@ def extract_author_date_citations(text: str) -> List[AuthorYearCitation]:
 # WORD DOCUMENT EXTRACTION
 # =============================================================================
 
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+DOCUMENT_PART = 'word/document.xml'
+
+_W_BODY = f'{{{W_NS}}}body'
+_W_P = f'{{{W_NS}}}p'
+_W_T = f'{{{W_NS}}}t'
+
+
+class BodyParagraph(NamedTuple):
+    """A non-empty paragraph of document.xml, as streamed by iter_body_paragraphs()."""
+    text: str            # Text of all w:t runs in the paragraph
+    offset: int          # Where the paragraph starts in the '\n'-joined body text
+    element: ET.Element  # The w:p element (part of the package's cached tree)
+    top_level: bool      # Direct child of w:body (not inside a table, text box...)
+
+
+def iter_body_paragraphs(package: DocxPackage, part: str = DOCUMENT_PART) -> Iterator[BodyParagraph]:
+    """
+    Stream the non-empty paragraphs of a document part in one iterparse pass.
+    
+    Paragraphs come in document order (a text-box paragraph after the
+    paragraph that anchors it), and joining their texts with '\n' gives
+    exactly extract_body_text_from_docx()'s result. The tree is left in
+    the package once the stream is exhausted, so editing the part
+    afterwards doesn't parse it again.
+    
+    Args:
+        package: The document package
+        part: Part to read (default: the main document)
+    """
+    offset = 0
+    open_tags: List[str] = []
+    
+    # For each open w:p: whether it's top-level, and the finished paragraphs
+    # nested inside it, which must follow it in document order
+    open_paras: List[Tuple[bool, list]] = []
+    
+    for event, element in package.iterparse(part, events=('start', 'end')):
+        if event == 'start':
+            if element.tag == _W_P:
+                open_paras.append((bool(open_tags) and open_tags[-1] == _W_BODY, []))
+            open_tags.append(element.tag)
+            continue
+        
+        open_tags.pop()
+        if element.tag != _W_P:
+            continue
+        
+        top_level, nested = open_paras.pop()
+        text = ''.join(t.text for t in element.iter(_W_T) if t.text)
+        ready = ([(text, element, top_level)] if text else []) + nested
+        
+        if open_paras:
+            open_paras[-1][1].extend(ready)
+            continue
+        
+        for text, element, top_level in ready:
+            yield BodyParagraph(text, offset, element, top_level)
+            offset += len(text) + 1
+
+
 def extract_body_text_from_docx(file_bytes: bytes) -> str:
     """
     Extract main body text from a Word document (excluding footnotes/endnotes).
@@ -602,35 +709,11 @@ def extract_body_text_from_docx(file_bytes: bytes) -> str:
         file_bytes: The .docx file as bytes
         
     Returns:
-        Plain text content of document body
+        Plain text content of document body, one line per paragraph
     """
-    import zipfile
-    import xml.etree.ElementTree as ET
-    from io import BytesIO
-    
-    NS = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
-    
     try:
-        with zipfile.ZipFile(BytesIO(file_bytes), 'r') as zf:
-            # Read main document
-            if 'word/document.xml' not in zf.namelist():
-                return ""
-            
-            with zf.open('word/document.xml') as f:
-                tree = ET.parse(f)
-                root = tree.getroot()
-            
-            # Extract all text from paragraphs
-            text_parts = []
-            for para in root.findall('.//w:p', NS):
-                para_text = []
-                for t in para.findall('.//w:t', NS):
-                    if t.text:
-                        para_text.append(t.text)
-                if para_text:
-                    text_parts.append(''.join(para_text))
-            
-            return '\n'.join(text_parts)
+        package = DocxPackage(file_bytes)
+        return '\n'.join(paragraph.text for paragraph in iter_body_paragraphs(package))
     
     except Exception as e:
         print(f"[extract_body_text_from_docx] Error: {e}")
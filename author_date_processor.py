@@ -19,28 +19,229 @@ Supports styles:
 - Turabian Author-Date
 
 Created: 2025-12-10
+
+Version History:
+    2026-10-16: _update_document_references edits document.xml through the in-memory
+                DocxPackage; other members are copied without recompression
+    2026-10-16: Citations are looked up with AuthorDateEngine.search_batch() instead
+                of one search() per citation
+    2026-10-16: _detect_document_field scores all fields in one pass (FieldDetector,
+                keyword table in FIELD_KEYWORDS) instead of one str.count per keyword
+    2026-10-16: process_document reads document.xml once (_scan_document: streamed
+                paragraphs feed citation text, field detection and the References
+                heading); _update_document_references reuses that parsed tree
 """
 
-import os
 import re
-import zipfile
-import tempfile
-import shutil
 import xml.etree.ElementTree as ET
+from collections import Counter
 from typing import List, Dict, Optional, Tuple, Any
 from dataclasses import dataclass, field
-from io import BytesIO
 
 from models import CitationMetadata, CitationType
+from docx_package import DocxPackage
 from author_date_extractor import (
     AuthorDateExtractor,
     AuthorYearCitation,
     extract_body_text_from_docx,
-    extract_references_section
+    extract_references_section,
+    iter_body_paragraphs
 )
 from author_date_engine import AuthorDateEngine, get_engine
 
 
+# =============================================================================
+# DOCUMENT FIELD DETECTION
+# =============================================================================
+
+# Field -> keywords counted in the document body (substring occurrences, as
+# str.count would). All fields are scored in a single pass over the text, so
+# adding a field or keyword doesn't add a scan.
+FIELD_KEYWORDS: Dict[str, List[str]] = {
+    'psychology': [
+        'psychology', 'psychological', 'cognitive', 'behavioral', 'behaviour',
+        'mental', 'perception', 'memory', 'learning', 'emotion', 'personality',
+        'psychologist', 'therapy', 'clinical', 'experimental', 'social psychology',
+        'developmental', 'neuroscience', 'brain', 'participants', 'subjects'
+    ],
+    'history': [
+        'history', 'historical', 'historian', 'century', 'era', 'period',
+        'war', 'revolution', 'empire', 'colonial', 'archive', 'manuscript',
+        'medieval', 'ancient', 'modern history', 'historiography'
+    ],
+    'economics': [
+        'economics', 'economic', 'economist', 'market', 'price', 'demand',
+        'supply', 'gdp', 'inflation', 'monetary', 'fiscal', 'trade',
+        'investment', 'capital', 'labor', 'wage', 'equilibrium'
+    ],
+    'sociology': [
+        'sociology', 'sociological', 'social', 'society', 'class', 'gender',
+        'race', 'inequality', 'institution', 'culture', 'community',
+        'demographic', 'population', 'urban', 'rural'
+    ],
+    'political science': [
+        'political', 'politics', 'government', 'democracy', 'election',
+        'voter', 'policy', 'legislature', 'congress', 'parliament',
+        'international relations', 'diplomacy', 'state'
+    ],
+    'medicine': [
+        'medical', 'patient', 'clinical', 'treatment', 'diagnosis',
+        'disease', 'symptom', 'therapy', 'hospital', 'physician',
+        'drug', 'pharmaceutical', 'trial', 'placebo'
+    ],
+    'biology': [
+        'biology', 'biological', 'cell', 'gene', 'dna', 'protein',
+        'organism', 'species', 'evolution', 'ecology', 'molecular'
+    ],
+    'literature': [
+        'literature', 'literary', 'novel', 'poetry', 'poem', 'fiction',
+        'narrative', 'author', 'text', 'reading', 'interpretation',
+        'criticism', 'modernism', 'postmodern'
+    ],
+    'philosophy': [
+        'philosophy', 'philosophical', 'ethics', 'moral', 'epistemology',
+        'metaphysics', 'logic', 'argument', 'reasoning', 'consciousness'
+    ]
+}
+
+# Hits the best field needs before it's reported
+MIN_FIELD_SCORE = 5
+
+
+def _trie_pattern(keywords: List[str]) -> str:
+    """
+    Regex matching any of the keywords, factored as a trie
+    ("econom(?:ic(?:s)?|ist)") so each position costs one branch per
+    character instead of one attempt per keyword.
+    """
+    trie: Dict[str, dict] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            # A keyword ends here; longer ones continue (regex is greedy)
+            return f"(?:{pattern})?"
+        return pattern
+    
+    return build(trie)
+
+
+class KeywordCounter:
+    """
+    Counts many keywords in one pass over a text.
+    
+    The keywords are compiled into a single trie-shaped regex inside a
+    lookahead, which finds the longest keyword starting at every position.
+    Shorter keywords that are prefixes of it start there too, so every
+    occurrence is seen. Counts equal text.count(keyword), except that a
+    keyword overlapping itself ("textext") counts twice where str.count
+    counts once.
+    """
+    
+    def __init__(self, keywords):
+        self.keywords = sorted({kw for kw in keywords if kw})
+        self._pattern = re.compile(f"(?=({_trie_pattern(self.keywords)}))")
+        self._prefixes = {
+            kw: [other for other in self.keywords if kw.startswith(other)]
+            for kw in self.keywords
+        }
+    
+    def count(self, text: str, counts: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+        """
+        Occurrences of each keyword in text (case-sensitive).
+        
+        Pass the counts from a previous call to keep a running total over a
+        text that arrives in pieces (e.g. paragraph by paragraph).
+        """
+        if counts is None:
+            counts = dict.fromkeys(self.keywords, 0)
+        for longest, hits in Counter(self._pattern.findall(text)).items():
+            for kw in self._prefixes[longest]:
+                counts[kw] += hits
+        return counts
+
+
+class FieldDetector:
+    """
+    Guesses a document's academic field from a keyword table.
+    
+    Args:
+        table: Field -> lowercase keywords (defaults to FIELD_KEYWORDS)
+        min_score: Hits the best field needs before it's reported
+    """
+    
+    def __init__(self, table: Optional[Dict[str, List[str]]] = None, min_score: int = MIN_FIELD_SCORE):
+        self.table = {field: list(keywords) for field, keywords in (table or FIELD_KEYWORDS).items()}
+        self.min_score = min_score
+        self.counter = KeywordCounter(kw for keywords in self.table.values() for kw in keywords)
+    
+    def scores(self, text: str) -> Dict[str, int]:
+        """Keyword hits per field (fields without hits are left out)."""
+        return self.field_scores(self.counter.count(text.lower()))
+    
+    def field_scores(self, counts: Dict[str, int]) -> Dict[str, int]:
+        """Keyword hits per field from KeywordCounter counts."""
+        field_scores = {}
+        for field, keywords in self.table.items():
+            score = sum(counts.get(kw, 0) for kw in keywords)
+            if score > 0:
+                field_scores[field] = score
+        return field_scores
+    
+    def detect(self, text: str) -> Optional[str]:
+        """The highest-scoring field, or None without a clear winner."""
+        if not text:
+            return None
+        
+        return self.best(self.scores(text))
+    
+    def best(self, field_scores: Dict[str, int]) -> Optional[str]:
+        """The top field of a scores() result, or None without a clear winner."""
+        if not field_scores:
+            return None
+        
+        # Only return if there's a clear winner (at least min_score hits)
+        best_field = max(field_scores, key=field_scores.get)
+        if field_scores[best_field] >= self.min_score:
+            return best_field
+        return None
+
+
+_field_detector: Optional[FieldDetector] = None
+
+
+def get_field_detector() -> FieldDetector:
+    """Return the shared detector for FIELD_KEYWORDS (compiled on first use)."""
+    global _field_detector
+    if _field_detector is None:
+        _field_detector = FieldDetector()
+    return _field_detector
+
+
+# Paragraph text of an existing references heading (matched after strip())
+REFERENCES_HEADING = re.compile(
+    r'^References?\s*$|^Bibliography\s*$|^References Cited\s*$',
+    re.IGNORECASE
+)
+
+
+@dataclass
+class DocumentScan:
+    """What the single pass over document.xml collects (see _scan_document)."""
+    package: DocxPackage           # Holds the parsed document.xml for the rewrite
+    body_text: str                 # Paragraph texts joined with '\n'
+    field: Optional[str]           # Detected academic field
+    references_heading: Optional[ET.Element] = None  # Existing References heading paragraph
+
+
 @dataclass
 class ReferenceEntry:
     """A single reference entry with metadata and formatting."""
@@ -95,6 +296,7 @@ class AuthorDateProcessor:
     def __init__(self):
         self.extractor = AuthorDateExtractor()
         self.engine = get_engine()
+        self.field_detector = get_field_detector()
         self._formatters = {}
     
     def _get_formatter(self, style: str):
@@ -130,79 +332,48 @@ class AuthorDateProcessor:
         providing context about what field the document is in.
         
         Returns field name like "psychology", "history", "economics", etc.
+        (one pass over the text for all fields; see FieldDetector)
         """
         if not body_text:
             return None
         
-        text_lower = body_text.lower()
-        
-        # Field detection based on keyword frequency
-        field_keywords = {
-            'psychology': [
-                'psychology', 'psychological', 'cognitive', 'behavioral', 'behaviour',
-                'mental', 'perception', 'memory', 'learning', 'emotion', 'personality',
-                'psychologist', 'therapy', 'clinical', 'experimental', 'social psychology',
-                'developmental', 'neuroscience', 'brain', 'participants', 'subjects'
-            ],
-            'history': [
-                'history', 'historical', 'historian', 'century', 'era', 'period',
-                'war', 'revolution', 'empire', 'colonial', 'archive', 'manuscript',
-                'medieval', 'ancient', 'modern history', 'historiography'
-            ],
-            'economics': [
-                'economics', 'economic', 'economist', 'market', 'price', 'demand',
-                'supply', 'gdp', 'inflation', 'monetary', 'fiscal', 'trade',
-                'investment', 'capital', 'labor', 'wage', 'equilibrium'
-            ],
-            'sociology': [
-                'sociology', 'sociological', 'social', 'society', 'class', 'gender',
-                'race', 'inequality', 'institution', 'culture', 'community',
-                'demographic', 'population', 'urban', 'rural'
-            ],
-            'political science': [
-                'political', 'politics', 'government', 'democracy', 'election',
-                'voter', 'policy', 'legislature', 'congress', 'parliament',
-                'international relations', 'diplomacy', 'state'
-            ],
-            'medicine': [
-                'medical', 'patient', 'clinical', 'treatment', 'diagnosis',
-                'disease', 'symptom', 'therapy', 'hospital', 'physician',
-                'drug', 'pharmaceutical', 'trial', 'placebo'
-            ],
-            'biology': [
-                'biology', 'biological', 'cell', 'gene', 'dna', 'protein',
-                'organism', 'species', 'evolution', 'ecology', 'molecular'
-            ],
-            'literature': [
-                'literature', 'literary', 'novel', 'poetry', 'poem', 'fiction',
-                'narrative', 'author', 'text', 'reading', 'interpretation',
-                'criticism', 'modernism', 'postmodern'
-            ],
-            'philosophy': [
-                'philosophy', 'philosophical', 'ethics', 'moral', 'epistemology',
-                'metaphysics', 'logic', 'argument', 'reasoning', 'consciousness'
-            ]
-        }
-        
-        # Count keyword hits for each field
-        field_scores = {}
-        for field, keywords in field_keywords.items():
-            score = sum(text_lower.count(kw) for kw in keywords)
-            if score > 0:
-                field_scores[field] = score
-        
-        if not field_scores:
-            return None
-        
-        # Return field with highest score (if significantly above others)
-        best_field = max(field_scores, key=field_scores.get)
-        best_score = field_scores[best_field]
-        
-        # Only return if there's a clear winner (at least 5 hits)
-        if best_score >= 5:
-            return best_field
+        return self.field_detector.detect(body_text)
+    
+    def _scan_document(self, file_bytes: bytes) -> DocumentScan:
+        """
+        Read the document body in one streaming pass over document.xml.
         
-        return None
+        As paragraphs arrive, their text is collected for citation extraction
+        (which runs on the joined text: its patterns may cross paragraph
+        breaks), keywords are counted for field detection, and the first
+        top-level References heading is located for the rewrite. The parsed
+        tree stays in the returned package.
+        """
+        package = DocxPackage(file_bytes)
+        texts = []
+        keyword_counts = None
+        references_heading = None
+        
+        for paragraph in iter_body_paragraphs(package):
+            texts.append(paragraph.text)
+            keyword_counts = self.field_detector.counter.count(paragraph.text.lower(), keyword_counts)
+            if (
+                references_heading is None
+                and paragraph.top_level
+                and REFERENCES_HEADING.match(paragraph.text.strip())
+            ):
+                references_heading = paragraph.element
+        
+        field = None
+        if keyword_counts:
+            field = self.field_detector.best(self.field_detector.field_scores(keyword_counts))
+        
+        return DocumentScan(
+            package=package,
+            body_text='\n'.join(texts),
+            field=field,
+            references_heading=references_heading
+        )
     
     def process_document(
         self,
@@ -223,11 +394,17 @@ class AuthorDateProcessor:
         """
         errors = []
         
-        # Step 1: Extract body text
+        # Step 1: Extract body text (one pass: text, field keywords, References heading)
         if progress_callback:
             progress_callback("Extracting text...", 0, 100)
         
-        body_text = extract_body_text_from_docx(file_bytes)
+        try:
+            scan = self._scan_document(file_bytes)
+        except Exception as e:
+            print(f"[AuthorDateProcessor] Error reading document: {e}")
+            scan = None
+        
+        body_text = scan.body_text if scan else ""
         if not body_text:
             errors.append("Could not extract text from document")
             return file_bytes, ProcessingResult(
@@ -259,8 +436,8 @@ class AuthorDateProcessor:
                 errors=errors
             )
         
-        # Step 3: Detect document context/field for smarter lookups
-        document_context = self._detect_document_field(body_text)
+        # Step 3: Document context/field for smarter lookups (scored during the scan)
+        document_context = scan.field
         if document_context:
             print(f"[AuthorDateProcessor] Detected document field: {document_context}")
         
@@ -272,50 +449,27 @@ class AuthorDateProcessor:
         if progress_callback:
             progress_callback("Looking up citations...", 25, 100)
         
-        # Parallel batch lookup - much faster than sequential
-        from concurrent.futures import ThreadPoolExecutor, as_completed
+        # Batched lookup: a few multi-citation API requests, per-citation
+        # search only for what those miss
+        def report_found(found: int, total_citations: int):
+            if progress_callback:
+                pct = 25 + int((found / total_citations) * 50)  # 25-75%
+                progress_callback(f"Found {found}/{total_citations} references", pct, 100)
         
-        def lookup_single(citation: AuthorYearCitation) -> Tuple[AuthorYearCitation, Optional[CitationMetadata]]:
-            """Look up a single citation (runs in thread pool)."""
-            try:
-                metadata = self.engine.search(
-                    citation.author,
-                    citation.year,
-                    citation.second_author,
-                    timeout=8.0,  # 8s is plenty without Semantic Scholar retries
-                    context=document_context  # Pass field context for smarter matching
-                )
-                return (citation, metadata)
-            except Exception as e:
-                print(f"[AuthorDateProcessor] Lookup error for {citation.author} ({citation.year}): {e}")
-                return (citation, None)
-        
-        # Submit all lookups in parallel (max 4 concurrent to reduce rate limiting)
-        lookup_results: Dict[AuthorYearCitation, Optional[CitationMetadata]] = {}
-        
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            futures = {
-                executor.submit(lookup_single, citation): citation 
-                for citation in unique_citations
-            }
-            
-            completed = 0
-            for future in as_completed(futures, timeout=90):  # 90s max for all citations
-                try:
-                    citation, metadata = future.result()
-                    lookup_results[citation] = metadata
-                    completed += 1
-                    
-                    if progress_callback:
-                        pct = 25 + int((completed / total) * 50)  # 25-75%
-                        progress_callback(
-                            f"Found {completed}/{total} references",
-                            pct, 100
-                        )
-                except Exception as e:
-                    citation = futures[future]
-                    lookup_results[citation] = None
-                    completed += 1
+        try:
+            found_by_key = self.engine.search_batch(
+                [(c.author, c.year, c.second_author, c.third_author) for c in unique_citations],
+                context=document_context,  # Pass field context for smarter matching
+                timeout=90.0,              # 90s for every stage incl. AI (under gunicorn's 120s)
+                progress_callback=report_found
+            )
+        except Exception as e:
+            print(f"[AuthorDateProcessor] Batch lookup error: {e}")
+            found_by_key = {}
+        
+        lookup_results: Dict[AuthorYearCitation, Optional[CitationMetadata]] = {
+            citation: found_by_key.get(citation.search_key()) for citation in unique_citations
+        }
         
         # Process results in original order
         for citation in unique_citations:
@@ -367,7 +521,8 @@ class AuthorDateProcessor:
         processed_bytes = self._update_document_references(
             file_bytes,
             reference_list_text,
-            style
+            style,
+            scan=scan
         )
         
         if progress_callback:
@@ -416,23 +571,22 @@ class AuthorDateProcessor:
         self,
         file_bytes: bytes,
         reference_list_text: str,
-        style: str
+        style: str,
+        scan: Optional[DocumentScan] = None
     ) -> bytes:
         """
         Update the Word document with the new references section.
         
         If a References section exists, replace it.
         Otherwise, append to the end.
-        """
-        temp_dir = tempfile.mkdtemp()
         
+        With the DocumentScan from _scan_document, its already parsed tree
+        and References heading are reused instead of reading the XML again.
+        """
         try:
-            # Extract docx
-            with zipfile.ZipFile(BytesIO(file_bytes), 'r') as zf:
-                zf.extractall(temp_dir)
-            
-            # Load document.xml
-            doc_path = os.path.join(temp_dir, 'word', 'document.xml')
+            # Open the package in memory (only document.xml is parsed)
+            package = scan.package if scan else DocxPackage(file_bytes)
+            doc_part = 'word/document.xml'
             
             NS = {
                 'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main',
@@ -443,7 +597,9 @@ class AuthorDateProcessor:
             for prefix, uri in NS.items():
                 ET.register_namespace(prefix, uri)
             
-            tree = ET.parse(doc_path)
+            tree = package.get_tree(doc_part)
+            if tree is None:
+                return file_bytes
             root = tree.getroot()
             
             # Find body element
@@ -456,13 +612,20 @@ class AuthorDateProcessor:
             references_start_idx = None
             
             paragraphs = body.findall('w:p', NS)
-            for i, para in enumerate(paragraphs):
-                para_text = ''.join(t.text or '' for t in para.findall('.//w:t', NS))
-                if re.match(r'^References?\s*$|^Bibliography\s*$|^References Cited\s*$', 
-                           para_text.strip(), re.IGNORECASE):
-                    references_para = para
-                    references_start_idx = i
-                    break
+            if scan:
+                # Located during the scan
+                references_para = scan.references_heading
+                for i, para in enumerate(paragraphs):
+                    if para is references_para:
+                        references_start_idx = i
+                        break
+            else:
+                for i, para in enumerate(paragraphs):
+                    para_text = ''.join(t.text or '' for t in para.findall('.//w:t', NS))
+                    if REFERENCES_HEADING.match(para_text.strip()):
+                        references_para = para
+                        references_start_idx = i
+                        break
             
             # Create new references paragraphs
             new_paragraphs = self._create_reference_paragraphs(reference_list_text, NS)
@@ -482,28 +645,13 @@ class AuthorDateProcessor:
             for i, para in enumerate(new_paragraphs):
                 body.insert(insert_idx + i, para)
             
-            # Write back
-            tree.write(doc_path, encoding='UTF-8', xml_declaration=True)
-            
-            # Repackage
-            output_buffer = BytesIO()
-            with zipfile.ZipFile(output_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-                for root_dir, dirs, files in os.walk(temp_dir):
-                    for file in files:
-                        file_path = os.path.join(root_dir, file)
-                        arcname = os.path.relpath(file_path, temp_dir)
-                        zf.write(file_path, arcname)
-            
-            output_buffer.seek(0)
-            return output_buffer.read()
+            # Repackage (other members are copied raw)
+            package.mark_dirty(doc_part)
+            return package.to_bytes()
         
         except Exception as e:
             print(f"[AuthorDateProcessor] Error updating document: {e}")
             return file_bytes
-        
-        finally:
-            if os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
     
     def _create_reference_paragraphs(
         self,
@@ -7,6 +7,15 @@ Used as the primary AI router for ambiguous citation queries.
 Version History:
     2025-12-06: Initial production version with multi-option support
     2025-12-07: Added guess_citation() and guess_and_search() for Claude-first lookup
+    2026-10-16: HTTP calls use the shared pooled client; guess_and_search reuses
+                module-level engine instances instead of building new ones per call
+    2026-10-16: guess_and_search runs its DOI/PMID lookups and query x engine
+                searches concurrently (priority-ordered race, first verified wins)
+    2026-10-16: Added batch_guess_citations() (type + guessed metadata for up to
+                BATCH_GUESS_SIZE notes per call); guess_and_search accepts a
+                precomputed guess and skips its own Claude call
+    2026-10-16: batch_guess_citations() takes a system prompt and document context
+                (used by the author-date engine's batched Claude fallback)
     
 Usage:
     from claude_router import classify_with_claude, get_citation_options, guess_and_search
@@ -24,7 +33,6 @@ Usage:
 import os
 import re
 import json
-import requests
 from typing import Optional, Tuple, List
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
@@ -32,6 +40,7 @@ import anthropic
 
 from models import CitationType, CitationMetadata
 from config import DEFAULT_TIMEOUT
+from engines.http_client import http_get
 
 # =============================================================================
 # CONFIGURATION
@@ -100,12 +109,19 @@ class ClaudeRouter:
             
         except anthropic.RateLimitError:
             print("[ClaudeRouter] Rate limited")
+            from engines.orchestrator import mark_incomplete
+            mark_incomplete("Claude rate limited")
             return CitationType.UNKNOWN, None
         except anthropic.AuthenticationError:
             print("[ClaudeRouter] Authentication failed - check ANTHROPIC_API_KEY")
+            from engines.orchestrator import mark_incomplete
+            mark_incomplete("Claude authentication failed")
             return CitationType.UNKNOWN, None
         except Exception as e:
+            # Connection errors, timeouts and 5xx are as transient as a 429
             print(f"[ClaudeRouter] Error: {e}")
+            from engines.orchestrator import mark_incomplete
+            mark_incomplete(f"Claude {type(e).__name__}")
             return CitationType.UNKNOWN, None
     
     def _parse_response(self, response_text: str, original: str) -> Tuple[CitationType, Optional[CitationMetadata]]:
@@ -246,7 +262,7 @@ def _web_search_citation(fragment: str) -> Optional[dict]:
         }
         
         print(f"[WebSearch] Searching: {fragment[:50]}...")
-        response = requests.get(url, params=params, timeout=10)
+        response = http_get(url, params=params, timeout=10)
         
         if response.status_code != 200:
             print(f"[WebSearch] API error: {response.status_code}")
@@ -272,6 +288,8 @@ def _web_search_citation(fragment: str) -> Optional[dict]:
         
     except Exception as e:
         print(f"[WebSearch] Error: {e}")
+        from engines.orchestrator import mark_incomplete
+        mark_incomplete(f"web search {type(e).__name__}")
         return None
 
 
@@ -327,6 +345,8 @@ Set confidence LOW (<0.5) if results are ambiguous or don't match the query."""
             
     except Exception as e:
         print(f"[WebSearch] Parse error: {e}")
+        from engines.orchestrator import mark_incomplete
+        mark_incomplete(f"Claude {type(e).__name__}")
     
     return None
 
@@ -367,11 +387,88 @@ def guess_citation(fragment: str) -> dict:
             
     except Exception as e:
         print(f"[ClaudeGuess] Error: {e}")
+        from engines.orchestrator import mark_incomplete
+        mark_incomplete(f"Claude {type(e).__name__}")
     
     return {"confidence": 0.0, "type": "unknown", "raw_fragment": fragment}
 
 
-def guess_and_search(fragment: str) -> Optional[CitationMetadata]:
+_verification_engines = None
+
+
+def _get_verification_engines():
+    """
+    Shared (Crossref, OpenAlex, PubMed) engines for guess_and_search().
+    
+    Created on first use (lazy import avoids a cycle with engines/) and
+    reused across calls; engines are stateless apart from the pooled session.
+    """
+    global _verification_engines
+    if _verification_engines is None:
+        from engines.academic import CrossrefEngine, OpenAlexEngine, PubMedEngine
+        _verification_engines = (CrossrefEngine(), OpenAlexEngine(), PubMedEngine())
+    return _verification_engines
+
+
+# Overall deadline for one round of guess verification lookups
+VERIFY_TIMEOUT = 15  # seconds
+
+
+async def _checked(lookup, fragment: str, must_match: bool, label: str, log_prefix: str) -> Optional[CitationMetadata]:
+    """Await one verification lookup and keep it only if it's acceptable."""
+    result = await lookup
+    if not result:
+        return None
+    if not must_match:
+        return result
+    if not result.title:
+        return None
+    if _fragment_matches_result(fragment, result):
+        return result
+    print(f"[{log_prefix}] {label} result doesn't match fragment: {result.title[:50]}...")
+    return None
+
+
+def _verify_concurrently(fragment: str, lookups: list, source_prefix: str, log_prefix: str) -> Optional[CitationMetadata]:
+    """
+    Run verification lookups concurrently; the highest-priority acceptable
+    result wins and the rest are cancelled.
+    
+    Args:
+        fragment: Original citation fragment
+        lookups: (label, awaitable, must_match_fragment) in priority order
+        source_prefix: Prefix for the winner's source_engine ("Claude", "Web Search")
+        log_prefix: Log tag
+        
+    Returns:
+        The verified CitationMetadata, or None
+    """
+    from engines.orchestrator import race, run_sync
+    
+    if not lookups:
+        return None
+    
+    checked = [
+        (label, _checked(lookup, fragment, must_match, label, log_prefix))
+        for label, lookup, must_match in lookups
+    ]
+    
+    try:
+        winner = run_sync(race(checked, timeout=VERIFY_TIMEOUT, ordered=True))
+    except Exception as e:
+        print(f"[{log_prefix}] Verification failed: {e}")
+        return None
+    
+    if not winner:
+        return None
+    
+    result = winner.value
+    print(f"[{log_prefix}] Verified via {winner.label}: {result.title[:50] if result.title else ''}...")
+    result.source_engine = f"{source_prefix} + {winner.label}"
+    return result
+
+
+def guess_and_search(fragment: str, guess: Optional[dict] = None) -> Optional[CitationMetadata]:
     """
     Two-step process: Claude guesses, then APIs verify.
     
@@ -381,14 +478,17 @@ def guess_and_search(fragment: str) -> Optional[CitationMetadata]:
     
     Args:
         fragment: Messy citation fragment
+        guess: Guess already made for this fragment (e.g. by
+               batch_guess_citations); skips the Claude call
         
     Returns:
         CitationMetadata if found/verified, None otherwise
     """
-    from engines.academic import CrossrefEngine, OpenAlexEngine, PubMedEngine
+    crossref, openalex, pubmed = _get_verification_engines()
     
     # Step 1: Get Claude's guess
-    guess = guess_citation(fragment)
+    if guess is None:
+        guess = guess_citation(fragment)
     
     if guess.get('confidence', 0) < 0.3:
         print(f"[ClaudeGuess] Low confidence ({guess.get('confidence')}), skipping")
@@ -402,36 +502,6 @@ def guess_and_search(fragment: str) -> Optional[CitationMetadata]:
     pmid = guess.get('pmid', '')
     doi = guess.get('doi', '')
     
-    # Try direct lookups first (most reliable)
-    # BUT verify the result actually matches the original fragment
-    if doi:
-        try:
-            result = CrossrefEngine().get_by_id(doi)
-            if result and result.title:
-                # Verify result matches ORIGINAL fragment, not just Claude's guess
-                if _fragment_matches_result(fragment, result):
-                    print(f"[ClaudeGuess] Verified via DOI: {doi}")
-                    result.source_engine = "Claude + Crossref (DOI)"
-                    return result
-                else:
-                    print(f"[ClaudeGuess] DOI result doesn't match fragment: {result.title[:50]}...")
-        except:
-            pass
-    
-    if pmid:
-        try:
-            result = PubMedEngine().get_by_id(pmid)
-            if result and result.title:
-                # Verify result matches ORIGINAL fragment
-                if _fragment_matches_result(fragment, result):
-                    print(f"[ClaudeGuess] Verified via PMID: {pmid}")
-                    result.source_engine = "Claude + PubMed (PMID)"
-                    return result
-                else:
-                    print(f"[ClaudeGuess] PMID result doesn't match fragment: {result.title[:50]}...")
-        except:
-            pass
-    
     # Build smart queries from guessed metadata
     queries_to_try = []
     
@@ -452,25 +522,27 @@ def guess_and_search(fragment: str) -> Optional[CitationMetadata]:
     if guess.get('search_query'):
         queries_to_try.append(guess['search_query'])
     
-    # Step 3: Try APIs with constructed queries
     engines = [
-        ('OpenAlex', OpenAlexEngine()),
-        ('Crossref', CrossrefEngine()),
-        ('PubMed', PubMedEngine()),
+        ('OpenAlex', openalex),
+        ('Crossref', crossref),
+        ('PubMed', pubmed),
     ]
     
+    # Step 3: Direct lookups first (most reliable), then the query x engine
+    # matrix - all launched at once, accepted in this priority order.
+    # Every result must match the ORIGINAL fragment, not just Claude's guess.
+    lookups = []
+    if doi:
+        lookups.append(('Crossref (DOI)', crossref.aget_by_id(doi), True))
+    if pmid:
+        lookups.append(('PubMed (PMID)', pubmed.aget_by_id(pmid), True))
     for query in queries_to_try[:3]:  # Limit attempts
         for engine_name, engine in engines:
-            try:
-                result = engine.search(query)
-                if result and result.title:
-                    # Verify against ORIGINAL fragment, not Claude's guess
-                    if _fragment_matches_result(fragment, result):
-                        print(f"[ClaudeGuess] Verified via {engine_name}: {result.title[:50]}...")
-                        result.source_engine = f"Claude + {engine_name}"
-                        return result
-            except Exception as e:
-                continue
+            lookups.append((engine_name, engine.asearch(query), True))
+    
+    result = _verify_concurrently(fragment, lookups, "Claude", "ClaudeGuess")
+    if result:
+        return result
     
     # Step 4: Web search fallback - search the web and parse results
     print(f"[ClaudeGuess] API verification failed, trying web search...")
@@ -481,40 +553,20 @@ def guess_and_search(fragment: str) -> Optional[CitationMetadata]:
         web_doi = web_result.get('doi', '')
         web_pmid = web_result.get('pmid', '')
         
-        # Try to verify web search result via APIs
+        # Try to verify web search result via APIs (DOI/PMID hits are trusted,
+        # title searches must match the original fragment)
+        lookups = []
         if web_doi:
-            try:
-                result = CrossrefEngine().get_by_id(web_doi)
-                if result:
-                    print(f"[WebSearch] Verified via DOI: {web_doi}")
-                    result.source_engine = "Web Search + Crossref (DOI)"
-                    return result
-            except:
-                pass
-        
+            lookups.append(('Crossref (DOI)', crossref.aget_by_id(web_doi), False))
         if web_pmid:
-            try:
-                result = PubMedEngine().get_by_id(web_pmid)
-                if result:
-                    print(f"[WebSearch] Verified via PMID: {web_pmid}")
-                    result.source_engine = "Web Search + PubMed (PMID)"
-                    return result
-            except:
-                pass
-        
-        # Try searching with the web-derived title
+            lookups.append(('PubMed (PMID)', pubmed.aget_by_id(web_pmid), False))
         if web_title:
             for engine_name, engine in engines:
-                try:
-                    result = engine.search(web_title)
-                    if result and result.title:
-                        # Verify against ORIGINAL fragment
-                        if _fragment_matches_result(fragment, result):
-                            print(f"[WebSearch] Verified via {engine_name}: {result.title[:50]}...")
-                            result.source_engine = f"Web Search + {engine_name}"
-                            return result
-                except:
-                    continue
+                lookups.append((engine_name, engine.asearch(web_title), True))
+        
+        result = _verify_concurrently(fragment, lookups, "Web Search", "WebSearch")
+        if result:
+            return result
         
         # Return web search result if high confidence even without API verification
         # But only if it matches the original fragment
@@ -1075,7 +1127,7 @@ def _search_google_books(query: str, limit: int = 3) -> list:
     try:
         url = "https://www.googleapis.com/books/v1/volumes"
         params = {"q": query, "maxResults": limit * 2, "orderBy": "relevance"}
-        resp = requests.get(url, params=params, timeout=10)
+        resp = http_get(url, params=params, timeout=10)
         
         if resp.status_code == 200:
             items = resp.json().get("items", [])
@@ -1135,7 +1187,7 @@ def _search_crossref(query: str, limit: int = 3) -> list:
         url = "https://api.crossref.org/works"
         params = {"query": query, "rows": limit * 2}
         headers = {"User-Agent": "CiteFlex/1.0 (mailto:contact@citeflex.com)"}
-        resp = requests.get(url, params=params, headers=headers, timeout=10)
+        resp = http_get(url, params=params, headers=headers, timeout=10)
         
         if resp.status_code == 200:
             items = resp.json().get("message", {}).get("items", [])
@@ -1225,7 +1277,7 @@ def _search_pubmed(query: str, limit: int = 3) -> list:
         # Step 1: Search for PMIDs
         search_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
         search_params = {"db": "pubmed", "term": query, "retmax": limit, "retmode": "json"}
-        search_resp = requests.get(search_url, params=search_params, timeout=10)
+        search_resp = http_get(search_url, params=search_params, timeout=10)
         
         if search_resp.status_code != 200:
             return results
@@ -1237,7 +1289,7 @@ def _search_pubmed(query: str, limit: int = 3) -> list:
         # Step 2: Fetch details
         fetch_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi"
         fetch_params = {"db": "pubmed", "id": ",".join(pmids), "retmode": "json"}
-        fetch_resp = requests.get(fetch_url, params=fetch_params, timeout=10)
+        fetch_resp = http_get(fetch_url, params=fetch_params, timeout=10)
         
         if fetch_resp.status_code != 200:
             return results
@@ -1351,7 +1403,7 @@ def get_citation_options(messy_note: str, max_options: int = 5) -> list:
         try:
             url = f"https://api.crossref.org/works/{doi}"
             headers = {"User-Agent": "CiteFlex/1.0"}
-            resp = requests.get(url, headers=headers, timeout=10)
+            resp = http_get(url, headers=headers, timeout=10)
             if resp.status_code == 200:
                 item = resp.json().get("message", {})
                 title = item.get("title", [""])[0] if item.get("title") else ""
@@ -1439,6 +1491,12 @@ def get_citation_options(messy_note: str, max_options: int = 5) -> list:
 # Added: 2025-12-06
 # =============================================================================
 
+# Ibid/Id. references never need a model call
+BATCH_IBID_FILTER = re.compile(
+    r'^(?:ibid\.?|ibidem\.?|id\.?)(?:\s|$|,|\.|\s*at\s)',
+    re.IGNORECASE
+)
+
 BATCH_CLASSIFY_PROMPT = """You are a citation classification expert. Classify each citation in the list below.
 
 For each citation, determine its type:
@@ -1487,17 +1545,12 @@ def batch_classify_notes(notes: list, batch_size: int = 50) -> dict:
     classifications = {}
     
     # Pre-filter ibid references (no need for Claude)
-    IBID_FILTER = re.compile(
-        r'^(?:ibid\.?|ibidem\.?|id\.?)(?:\s|$|,|\.|\s*at\s)',
-        re.IGNORECASE
-    )
-    
     valid_notes = []
     for note in notes:
         text = note.get('text', '').strip()
         if not text:
             continue
-        if IBID_FILTER.match(text):
+        if BATCH_IBID_FILTER.match(text):
             classifications[text] = 'skip'
             continue
         valid_notes.append({'idx': len(valid_notes), 'text': text})
@@ -1555,3 +1608,146 @@ def batch_classify_notes(notes: list, batch_size: int = 50) -> dict:
     elapsed = time.time() - start_time
     print(f"[BatchClassifier] Completed in {elapsed:.1f}s - classified {len(classifications)} notes")
     return classifications
+
+
+# =============================================================================
+# BATCH GUESSING (document pre-pass: type + guessed metadata per note)
+# =============================================================================
+
+# Notes per Claude call; a 200-note document takes 4 calls
+BATCH_GUESS_SIZE = 50
+
+BATCH_GUESS_PROMPT = """You are a scholarly citation expert with comprehensive knowledge of academic literature, books, legal cases, and published works.
+
+For EACH numbered citation fragment below, classify it and USE YOUR KNOWLEDGE to guess the most likely published work being referenced.
+
+Respond with a JSON array, one object per fragment:
+{
+    "index": the fragment number (1-based),
+    "type": "journal|book|legal|newspaper|government|medical|interview|url|skip|unknown",
+    "confidence": 0.0-1.0,
+    "title": "full title of the work",
+    "authors": ["First Last"],
+    "year": "YYYY",
+    "journal": "journal name if applicable",
+    "pmid": "PubMed ID if you know it",
+    "doi": "DOI if you know it",
+    "search_query": "optimized query to verify in databases"
+}
+
+IMPORTANT:
+- Leave out fields you don't know instead of writing empty values
+- "skip" is for ibid/supra references and empty or invalid entries
+- Set confidence HIGH (0.8+) only if you're fairly sure this is a real, published work
+- If you don't recognize the work at all, set confidence to 0.0 and give only index and type
+- Never invent fictional works - only guess works you believe actually exist
+
+Return ONLY the JSON array, no explanation."""
+
+
+def _guess_batch(
+    client,
+    batch: List[str],
+    batch_num: int,
+    total_batches: int,
+    system: str = BATCH_GUESS_PROMPT,
+    context: Optional[str] = None
+) -> dict:
+    """One batch_guess_citations() call: fragment text -> guess dict."""
+    print(f"[BatchGuess] Batch {batch_num}/{total_batches} ({len(batch)} notes)...")
+    
+    notes_text = "\n".join(f"{i+1}. {text[:400]}" for i, text in enumerate(batch))
+    context_hint = f"\n\nThese citations appear in a document about {context}." if context else ""
+    guesses = {}
+    
+    try:
+        response = client.messages.create(
+            model=CLAUDE_MODEL,
+            max_tokens=200 * len(batch) + 500,
+            system=system,
+            messages=[{
+                "role": "user",
+                "content": f"Classify and identify these {len(batch)} citations:{context_hint}\n\n{notes_text}"
+            }]
+        )
+        response_text = response.content[0].text.strip()
+        
+        json_match = re.search(r'\[[\s\S]*\]', response_text)
+        if json_match:
+            for result in json.loads(json_match.group()):
+                idx = result.pop('index', 0) - 1 if isinstance(result, dict) else -1
+                if 0 <= idx < len(batch):
+                    result.setdefault('confidence', 0.0)
+                    result['raw_fragment'] = batch[idx]
+                    guesses[batch[idx]] = result
+    
+    except anthropic.RateLimitError:
+        print(f"[BatchGuess] Rate limited on batch {batch_num}")
+    except json.JSONDecodeError as e:
+        print(f"[BatchGuess] JSON parse error on batch {batch_num}: {e}")
+    except Exception as e:
+        print(f"[BatchGuess] Error on batch {batch_num}: {e}")
+    
+    return guesses
+
+
+def batch_guess_citations(
+    texts: List[str],
+    batch_size: int = BATCH_GUESS_SIZE,
+    timeout: Optional[float] = None,
+    system: str = BATCH_GUESS_PROMPT,
+    context: Optional[str] = None
+) -> dict:
+    """
+    Classify and guess many citation fragments in a few Claude calls.
+    
+    Each guess has the same fields as guess_citation() plus a "type", so it
+    can be handed to guess_and_search(fragment, guess) and used in place of
+    a per-note classification. Batches run concurrently. Fragments missing
+    from a response (or in a failed batch) are simply absent from the
+    result, and fall back to per-note calls.
+    
+    Args:
+        texts: Note texts (ibid references and duplicates are skipped)
+        batch_size: Fragments per Claude call
+        timeout: Deadline in seconds; batches still running are dropped
+        system: System prompt; must ask for a JSON array of {"index": n, ...}
+        context: Optional document field, added to each call as a hint
+        
+    Returns:
+        Dict mapping note text -> guess dict
+    """
+    import time
+    from engines.orchestrator import fan_out, run_blocking, run_sync
+    
+    client = _get_client()
+    if not client:
+        return {}
+    
+    unique = [
+        text for text in dict.fromkeys(t.strip() for t in texts)
+        if text and not BATCH_IBID_FILTER.match(text)
+    ]
+    if not unique:
+        return {}
+    
+    batches = [unique[i:i + batch_size] for i in range(0, len(unique), batch_size)]
+    print(f"[BatchGuess] Guessing {len(unique)} notes in {len(batches)} calls")
+    start_time = time.time()
+    
+    try:
+        done = run_sync(fan_out([
+            (f"batch {n}", run_blocking(_guess_batch, client, batch, n, len(batches), system, context))
+            for n, batch in enumerate(batches, 1)
+        ], timeout=timeout))
+    except Exception as e:
+        print(f"[BatchGuess] Failed: {e}")
+        return {}
+    
+    guesses = {}
+    for result in done.values():
+        if result:
+            guesses.update(result)
+    
+    print(f"[BatchGuess] Completed in {time.time() - start_time:.1f}s - {len(guesses)}/{len(unique)} notes guessed")
+    return guesses
@@ -4,12 +4,22 @@ citeflex/config.py
 Configuration, constants, and shared settings.
 
 Version History:
+    2026-10-16: Added background job settings (JOB_WORKERS, JOB_*)
+                and event stream limits (JOB_EVENT_STREAMS, JOB_EVENT_STREAM_SECONDS)
+    2026-10-16: Added SESSION_BACKEND (shared SQLite session store by default)
+    2026-10-16: Added SESSION_MEMORY_BYTES (session LRU budget)
+    2026-10-16: SESSIONS_DIR moved here from app.py (shared by session store and cache)
+    2026-10-16: Added FAMOUS_PAPERS_PATH for the famous papers index
+    2026-10-16: Added per-host rate limits and circuit breaker settings (RATE_LIMITS, CIRCUIT_*)
+                (RATE_LIMITS also lists breaker-only upstreams, rate None)
+    2026-10-16: Added shared HTTP pool settings (HTTP_POOL_*, HTTP_HOST_POOL_SIZES)
+    2026-10-16: Added metadata cache settings (CACHE_DIR, CACHE_TTLS, negative TTL)
     2025-12-07: Added SERPAPI_KEY for Google Scholar integration
     2025-12-05: Added version tracking, fixed get_gov_agency to check specific domains first
 """
 
 import os
-from typing import Dict
+from typing import Dict, Optional
 
 # =============================================================================
 # API KEYS (from environment)
@@ -34,6 +44,143 @@ DEFAULT_HEADERS = {
     'Accept': 'application/json'
 }
 
+# Shared connection pools (engines/http_client.py)
+HTTP_POOL_HOSTS = 32     # Distinct hosts kept alive at once
+HTTP_POOL_MAXSIZE = 10   # Keep-alive connections per host
+HTTP_HOST_POOL_SIZES: Dict[str, int] = {
+    # Hosts hit on nearly every note get larger pools
+    'api.crossref.org': 20,
+    'api.openalex.org': 20,
+    'eutils.ncbi.nlm.nih.gov': 10,
+    'openlibrary.org': 16,
+    'www.googleapis.com': 16,
+}
+
+# Proactive per-host throttling (engines/rate_limit.py): host -> (requests
+# per second, burst), or None for a circuit breaker without throttling.
+# Only these upstreams get their own limiter (and appear on /health); every
+# other host shares one pass-through limiter.
+RATE_LIMITS: Dict[str, Optional[tuple]] = {
+    'api.crossref.org': (10.0, 20),          # Polite pool (mailto in User-Agent)
+    'api.openalex.org': (10.0, 10),
+    'api.semanticscholar.org': (10.0, 10) if SEMANTIC_SCHOLAR_API_KEY else (1.0, 3),
+    'eutils.ncbi.nlm.nih.gov': (10.0, 10) if PUBMED_API_KEY else (3.0, 3),
+    'serpapi.com': (5.0, 5),
+    'api.search.brave.com': (1.0, 2),         # Free plan
+    'www.courtlistener.com': (1.5, 5),
+    'www.googleapis.com': None,
+    'openlibrary.org': None,
+    'export.arxiv.org': None,
+    'api.openai.com': None,
+}
+RATE_LIMIT_MAX_WAIT = 5  # Longest a request waits for a token before giving up (seconds)
+
+# A 429 is only retried in-line when the upstream asks for a short wait;
+# longer Retry-After windows are handed back to the caller immediately
+RATE_LIMIT_MAX_RETRY_WAIT = 1.0  # seconds
+
+# Circuit breaker: after this many consecutive failures (connection errors,
+# timeouts, 5xx, 429) requests to the host fail fast for the cooldown, then
+# a single probe request decides whether to close the circuit again
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_COOLDOWN = 30  # seconds
+
+# =============================================================================
+# SESSION STORAGE
+# =============================================================================
+
+# Workbench sessions (session_store.py) - use the Railway Volume mount point
+# so they survive deployments
+SESSIONS_DIR = os.environ.get('SESSIONS_DIR', '/data/sessions')
+
+# Where session records live:
+# - 'sqlite': one WAL-mode database in SESSIONS_DIR, shared by all workers
+# - 'files':  one JSON file per session (single-worker deployments only)
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'sqlite').lower()
+
+# Session data kept in memory per worker (least recently used sessions are
+# dropped and re-read from disk when needed)
+SESSION_MEMORY_BYTES = int(os.environ.get('SESSION_MEMORY_MB', '256')) * 1024 * 1024
+
+# =============================================================================
+# BACKGROUND JOBS
+# =============================================================================
+
+# Document processing threads per gunicorn worker (job_queue.py). The queue
+# lives in SESSIONS_DIR, so any worker can pick up or report on any job.
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+
+# Idle workers check the shared queue this often (seconds); jobs submitted
+# to the same worker start immediately
+JOB_POLL_INTERVAL = 1.0
+
+# A running job whose worker hasn't reported in this long is marked failed
+# (e.g. the gunicorn worker was restarted mid-job)
+JOB_HEARTBEAT_INTERVAL = 15
+JOB_STALE_AFTER = 120
+
+# Finished jobs are kept for status polling this long (seconds)
+JOB_RETENTION = 4 * 60 * 60
+
+# Server-sent event streams (/api/jobs/<id>/events) each hold a request thread
+# (gunicorn runs --threads 4 per worker): at most JOB_EVENT_STREAMS are open per
+# worker - further clients are told to poll - and each stream ends after
+# JOB_EVENT_STREAM_SECONDS, after which the browser resumes it on a new request
+JOB_EVENT_STREAMS = int(os.environ.get('JOB_EVENT_STREAMS', '1'))
+JOB_EVENT_STREAM_SECONDS = 20
+
+# =============================================================================
+# METADATA CACHE SETTINGS
+# =============================================================================
+
+# Set CITEFLEX_CACHE=off to disable the lookup cache entirely
+CACHE_ENABLED = os.environ.get('CITEFLEX_CACHE', 'on').lower() not in ('0', 'off', 'false', 'no')
+
+# Disk tier lives next to the session store (Railway Volume mount point)
+CACHE_DIR = os.environ.get('CACHE_DIR', SESSIONS_DIR)
+CACHE_MEMORY_ENTRIES = 4096  # In-process LRU size (per worker)
+
+DAY = 24 * 60 * 60
+
+# How long a found record stays fresh, by source engine (prefix match on
+# CitationMetadata.source_engine / SearchEngine.name)
+CACHE_TTLS: Dict[str, int] = {
+    'Crossref': 30 * DAY,
+    'OpenAlex': 30 * DAY,
+    'PubMed': 30 * DAY,
+    'Semantic Scholar': 30 * DAY,
+    'arXiv': 30 * DAY,
+    'Famous Papers Cache': 30 * DAY,
+    'Famous Cases Cache': 30 * DAY,
+    'CourtListener': 14 * DAY,
+    'Google Books': 14 * DAY,
+    'Open Library': 14 * DAY,
+    'Library of Congress': 14 * DAY,
+    'Google Scholar': 7 * DAY,
+    'Wikipedia': 1 * DAY,
+    'YouTube': 1 * DAY,
+    'Vimeo': 1 * DAY,
+    'Newspaper': 1 * DAY,
+    'Government': 1 * DAY,
+    'Generic URL': 1 * DAY,
+}
+CACHE_DEFAULT_TTL = 7 * DAY
+
+# Misses are cached briefly so a repeated unknown query doesn't re-run the
+# whole cascade, but a transient upstream failure doesn't stick for long
+CACHE_NEGATIVE_TTL = 30 * 60  # seconds
+
+# =============================================================================
+# FAMOUS PAPERS INDEX
+# =============================================================================
+
+# Table of highly cited works (engines/famous_papers.py); rebuild it from a
+# Crossref/OpenAlex dump with scripts/build_famous_papers.py
+FAMOUS_PAPERS_PATH = os.environ.get(
+    'FAMOUS_PAPERS_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'engines', 'data', 'famous_papers.tsv')
+)
+
 # =============================================================================
 # GEMINI SETTINGS
 # =============================================================================
@@ -8,27 +8,53 @@ Ported from the monolithic citation_manager.py to preserve:
 - Italic formatting via <i> tags
 - Clickable hyperlinks for URLs
 
-This approach extracts the docx as a zip, manipulates the XML directly,
-and repackages it - giving full control over Word's internal structure.
+This approach opens the docx as an in-memory package (docx_package.DocxPackage),
+manipulates the XML directly, and repackages it - giving full control over
+Word's internal structure. Parts that aren't edited are copied through raw.
 
 Version History:
     2025-12-05 12:53: Enhanced IBID_PATTERN to recognize "Id." (Bluebook) and "pp." prefixes
                       Switched from router to unified_router import
     2025-12-05 13:15: Verified ibid detection passes 13/13 tests including Id. at X patterns
+    2026-10-16: process_document resolves notes concurrently (resolve_notes) before
+                the sequential ibid/short-form pass
+    2026-10-16: Added WordDocumentProcessor.write_notes() batched writer; notes parts
+                are parsed once, indexed by w:id, and serialized on save
+    2026-10-16: WordDocumentProcessor, LinkActivator and update_document_note use the
+                in-memory DocxPackage instead of tempdir extract/rezip; untouched
+                members (media, fonts) are copied without recompression
+    2026-10-16: Added NoteEditSession: Workbench edits patch the parsed notes parts
+                in memory, activate links only in the edited note, and the package
+                is zipped only on download
+    2026-10-16: LinkActivator rewritten as a single-pass tag scanner that tracks
+                hyperlink/field nesting; skips parts without "http"; note-ID filter
+    2026-10-16: resolve_notes runs a batched AI pre-pass (get_note_hints) and hands
+                each note's hint to get_citation
+    2026-10-16: process_document clusters notes citing the same work (pincites
+                stripped) and resolves one representative per cluster; each note
+                keeps its own page reference
+    2026-10-16: CitationHistory computes each source key once and compares ibid
+                candidates against the stored key of the previous note
+    2026-10-16: process_document/resolve_notes accept a progress_callback (used by
+                background jobs, see job_queue.py)
+    2026-10-16: process_document finishes notes in order while lookups are still
+                running and reports each through note_callback (streamed to the
+                client by /api/jobs/<job_id>/events)
 """
 
-import os
 import re
 import html
-import zipfile
-import tempfile
-import shutil
+import hashlib
+import threading
+import unicodedata
 import xml.etree.ElementTree as ET
-from typing import List, Optional, Dict, Any, Tuple
+from collections import OrderedDict
+from typing import List, Optional, Dict, Any, Set, Tuple
 from dataclasses import dataclass, field
 from io import BytesIO
 
 from models import normalize_doi
+from docx_package import DocxPackage
 
 
 # =============================================================================
@@ -266,12 +292,26 @@ class CitationHistory:
     Maintains:
     - Previous citation (for ibid detection)
     - All cited sources (for short form detection)
+    
+    Both checks are key comparisons, and each metadata object's source key
+    is computed once (notes in the same cluster share one object).
     """
     
     def __init__(self):
         self.previous: Optional[CitationHistoryEntry] = None
         self.all_sources: Dict[str, CitationHistoryEntry] = {}  # source_key -> first occurrence
         self.note_counter: int = 0
+        # id(metadata) -> (metadata, source_key); the object is held so its id stays unique
+        self._keys: Dict[int, Tuple[Any, Optional[str]]] = {}
+    
+    def source_key(self, metadata: Any) -> Optional[str]:
+        """generate_source_key(), memoized per metadata object."""
+        cached = self._keys.get(id(metadata))
+        if cached is not None and cached[0] is metadata:
+            return cached[1]
+        key = generate_source_key(metadata)
+        self._keys[id(metadata)] = (metadata, key)
+        return key
     
     def add(self, metadata: Any, formatted: str) -> None:
         """
@@ -282,7 +322,7 @@ class CitationHistory:
             formatted: Formatted citation string
         """
         self.note_counter += 1
-        source_key = generate_source_key(metadata)
+        source_key = self.source_key(metadata)
         
         entry = CitationHistoryEntry(
             metadata=metadata,
@@ -308,10 +348,11 @@ class CitationHistory:
         Returns:
             True if this is the same source as the previous citation
         """
-        if self.previous is None:
+        if self.previous is None or self.previous.source_key is None:
             return False
         
-        return sources_match(metadata, self.previous.metadata)
+        # Same as sources_match(), with the previous key already stored
+        return self.source_key(metadata) == self.previous.source_key
     
     def has_been_cited_before(self, metadata: Any) -> bool:
         """
@@ -323,7 +364,7 @@ class CitationHistory:
         Returns:
             True if this source has been cited before (not counting current)
         """
-        source_key = generate_source_key(metadata)
+        source_key = self.source_key(metadata)
         if source_key is None:
             return False
         
@@ -356,62 +397,100 @@ class WordDocumentProcessor:
         'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships',
     }
     
+    # Package parts
+    DOCUMENT_PART = 'word/document.xml'
+    NOTE_PARTS = {
+        'endnote': 'word/endnotes.xml',
+        'footnote': 'word/footnotes.xml',
+    }
+    
     def __init__(self, file_path_or_buffer):
         """
         Initialize with a file path or file-like object (BytesIO).
         """
-        self.temp_dir = tempfile.mkdtemp()
         self.original_path = None
         
+        # Parsed notes parts: note_type -> (tree, {note_id: note element})
+        self._note_parts: Dict[str, Optional[Tuple[ET.ElementTree, Dict[str, ET.Element]]]] = {}
+        
         # Handle both file paths and file-like objects
-        if hasattr(file_path_or_buffer, 'read'):
-            # It's a file-like object (e.g., from upload)
-            with zipfile.ZipFile(file_path_or_buffer, 'r') as z:
-                z.extractall(self.temp_dir)
-        else:
-            # It's a file path
+        if not hasattr(file_path_or_buffer, 'read'):
             self.original_path = file_path_or_buffer
-            with zipfile.ZipFile(file_path_or_buffer, 'r') as z:
-                z.extractall(self.temp_dir)
+        
+        self.package = DocxPackage(file_path_or_buffer)
     
-    def get_endnotes(self) -> List[Dict[str, str]]:
+    def _get_note_part(self, note_type: str) -> Optional[Tuple[ET.ElementTree, Dict[str, ET.Element]]]:
         """
-        Extract all endnotes from the document.
+        Parse a notes part once and index its notes by w:id.
         
+        The parsed tree is kept in memory by the package so reads and
+        writes share it; edits are serialized when the package is saved.
+        
+        Args:
+            note_type: 'endnote' or 'footnote'
+            
         Returns:
-            List of dicts: [{'id': '1', 'text': 'citation text'}, ...]
+            (tree, {note_id: element}) or None if the part doesn't exist
         """
-        endnotes_path = os.path.join(self.temp_dir, 'word', 'endnotes.xml')
-        if not os.path.exists(endnotes_path):
+        if note_type in self._note_parts:
+            return self._note_parts[note_type]
+        
+        # Register namespaces to preserve them
+        ET.register_namespace('w', self.NS['w'])
+        ET.register_namespace('xml', self.NS['xml'])
+        
+        tree = self.package.get_tree(self.NOTE_PARTS[note_type])
+        if tree is None:
+            self._note_parts[note_type] = None
+            return None
+        
+        id_attr = f"{{{self.NS['w']}}}id"
+        index = {
+            note.get(id_attr): note
+            for note in tree.getroot().iter(f"{{{self.NS['w']}}}{note_type}")
+        }
+        
+        self._note_parts[note_type] = (tree, index)
+        return self._note_parts[note_type]
+    
+    def _get_notes(self, note_type: str) -> List[Dict[str, str]]:
+        """Extract the user notes (id >= 1) of one type."""
+        part = self._get_note_part(note_type)
+        if part is None:
             return []
         
-        try:
-            tree = ET.parse(endnotes_path)
-            root = tree.getroot()
-            notes = []
-            
-            for endnote in root.findall('.//w:endnote', self.NS):
-                note_id = endnote.get(f"{{{self.NS['w']}}}id")
-                
-                # Skip system endnotes (id 0 and -1)
-                try:
-                    if int(note_id) < 1:
-                        continue
-                except (ValueError, TypeError):
+        _, index = part
+        notes = []
+        
+        for note_id, note in index.items():
+            # Skip system notes (id 0 and -1)
+            try:
+                if int(note_id) < 1:
                     continue
-                
-                # Extract all text from this endnote
-                text_parts = []
-                for t in endnote.findall('.//w:t', self.NS):
-                    if t.text:
-                        text_parts.append(t.text)
-                
-                full_text = "".join(text_parts).strip()
-                if full_text:
-                    notes.append({'id': note_id, 'text': full_text})
+            except (ValueError, TypeError):
+                continue
             
-            return notes
+            # Extract all text from this note
+            text_parts = []
+            for t in note.findall('.//w:t', self.NS):
+                if t.text:
+                    text_parts.append(t.text)
             
+            full_text = "".join(text_parts).strip()
+            if full_text:
+                notes.append({'id': note_id, 'text': full_text})
+        
+        return notes
+    
+    def get_endnotes(self) -> List[Dict[str, str]]:
+        """
+        Extract all endnotes from the document.
+        
+        Returns:
+            List of dicts: [{'id': '1', 'text': 'citation text'}, ...]
+        """
+        try:
+            return self._get_notes('endnote')
         except Exception as e:
             print(f"[WordDocumentProcessor] Error reading endnotes: {e}")
             return []
@@ -423,37 +502,8 @@ class WordDocumentProcessor:
         Returns:
             List of dicts: [{'id': '1', 'text': 'citation text'}, ...]
         """
-        footnotes_path = os.path.join(self.temp_dir, 'word', 'footnotes.xml')
-        if not os.path.exists(footnotes_path):
-            return []
-        
         try:
-            tree = ET.parse(footnotes_path)
-            root = tree.getroot()
-            notes = []
-            
-            for footnote in root.findall('.//w:footnote', self.NS):
-                note_id = footnote.get(f"{{{self.NS['w']}}}id")
-                
-                # Skip system footnotes (id 0 and -1)
-                try:
-                    if int(note_id) < 1:
-                        continue
-                except (ValueError, TypeError):
-                    continue
-                
-                # Extract all text
-                text_parts = []
-                for t in footnote.findall('.//w:t', self.NS):
-                    if t.text:
-                        text_parts.append(t.text)
-                
-                full_text = "".join(text_parts).strip()
-                if full_text:
-                    notes.append({'id': note_id, 'text': full_text})
-            
-            return notes
-            
+            return self._get_notes('footnote')
         except Exception as e:
             print(f"[WordDocumentProcessor] Error reading footnotes: {e}")
             return []
@@ -473,13 +523,11 @@ class WordDocumentProcessor:
         Returns:
             List of dicts with unique author-year combinations for reference generation
         """
-        document_path = os.path.join(self.temp_dir, 'word', 'document.xml')
-        if not os.path.exists(document_path):
+        if not self.package.has_part(self.DOCUMENT_PART):
             return []
         
         try:
-            tree = ET.parse(document_path)
-            root = tree.getroot()
+            root = ET.fromstring(self.package.read_part(self.DOCUMENT_PART))
             
             # Extract full document text
             text_elements = root.findall('.//{%s}t' % self.NS['w'])
@@ -629,13 +677,11 @@ class WordDocumentProcessor:
         Returns:
             bool: True if successful
         """
-        document_path = os.path.join(self.temp_dir, 'word', 'document.xml')
-        if not os.path.exists(document_path):
+        if not self.package.has_part(self.DOCUMENT_PART):
             return False
         
         try:
-            with open(document_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            content = self.package.read_text(self.DOCUMENT_PART)
             
             # Escape for regex
             escaped_old = re.escape(old_text)
@@ -644,8 +690,7 @@ class WordDocumentProcessor:
             new_content, count = re.subn(escaped_old, new_text, content, count=1)
             
             if count > 0:
-                with open(document_path, 'w', encoding='utf-8') as f:
-                    f.write(new_content)
+                self.package.set_part(self.DOCUMENT_PART, new_content)
                 return True
             
             return False
@@ -654,224 +699,159 @@ class WordDocumentProcessor:
             print(f"[WordDocumentProcessor] Error replacing body citation: {e}")
             return False
     
-    def write_endnote(self, note_id: str, new_content: str) -> bool:
+    def write_notes(self, contents: Dict[str, str], note_type: Optional[str] = None) -> Dict[str, bool]:
         """
-        Replace an endnote's content with new formatted citation.
-        Handles <i> tags for italics using regex (no BeautifulSoup needed).
-        PRESERVES the endnoteRef element for proper numbering and linking.
+        Replace the content of many notes in one pass.
+        
+        Each notes part is parsed once and its notes are looked up by id,
+        so writing N notes costs one parse and (at save time) one
+        serialization instead of N of each.
         
         Args:
-            note_id: The endnote ID to update
-            new_content: New citation text (may contain <i> tags for italics)
-            
+            contents: Dict mapping note ID -> new citation text (may contain <i> tags)
+            note_type: 'endnote' or 'footnote'. If None, each ID is written to
+                       the endnote with that ID, falling back to the footnote.
+                       
         Returns:
-            bool: True if successful
+            Dict mapping note ID -> True if the note was written
         """
-        endnotes_path = os.path.join(self.temp_dir, 'word', 'endnotes.xml')
-        if not os.path.exists(endnotes_path):
-            return False
+        note_types = [note_type] if note_type else ['endnote', 'footnote']
+        written = {}
         
-        try:
-            # Register namespace to preserve it
-            ET.register_namespace('w', self.NS['w'])
-            ET.register_namespace('xml', self.NS['xml'])
-            
-            tree = ET.parse(endnotes_path)
-            root = tree.getroot()
+        for note_id, new_content in contents.items():
+            note_id = str(note_id)
+            written[note_id] = False
             
-            # Find the target endnote
-            target = None
-            for endnote in root.findall('.//w:endnote', self.NS):
-                if endnote.get(f"{{{self.NS['w']}}}id") == str(note_id):
-                    target = endnote
-                    break
-            
-            if target is None:
-                return False
-            
-            # Find or create paragraph
-            para = target.find('.//w:p', self.NS)
-            if para is None:
-                para = ET.SubElement(target, f"{{{self.NS['w']}}}p")
-            else:
-                # FIXED: Preserve paragraph properties AND endnoteRef run
-                preserved_pPr = None
-                preserved_endnoteRef_run = None
-                
-                for child in list(para):
-                    tag = child.tag.replace(f"{{{self.NS['w']}}}", "")
-                    
-                    # Preserve paragraph properties
-                    if tag == 'pPr':
-                        preserved_pPr = child
+            for current_type in note_types:
+                try:
+                    part = self._get_note_part(current_type)
+                    if part is None:
                         continue
                     
-                    # Check if this run contains endnoteRef
-                    if tag == 'r':
-                        endnote_ref = child.find(f".//{{{self.NS['w']}}}endnoteRef")
-                        if endnote_ref is not None:
-                            preserved_endnoteRef_run = child
-                            continue
-                    
-                    # Remove all other children
-                    para.remove(child)
-                
-                # If no endnoteRef run was found, create one
-                if preserved_endnoteRef_run is None:
-                    ref_run = ET.Element(f"{{{self.NS['w']}}}r")
-                    rPr = ET.SubElement(ref_run, f"{{{self.NS['w']}}}rPr")
-                    rStyle = ET.SubElement(rPr, f"{{{self.NS['w']}}}rStyle")
-                    rStyle.set(f"{{{self.NS['w']}}}val", "EndnoteReference")
-                    ET.SubElement(ref_run, f"{{{self.NS['w']}}}endnoteRef")
+                    target = part[1].get(note_id)
+                    if target is None:
+                        continue
                     
-                    # Insert after pPr if it exists, otherwise at beginning
-                    if preserved_pPr is not None:
-                        idx = list(para).index(preserved_pPr) + 1
-                        para.insert(idx, ref_run)
-                    else:
-                        para.insert(0, ref_run)
-            
-            # Parse content using regex to handle <i> tags (no BeautifulSoup)
-            parts = re.split(r'(<i>.*?</i>)', html.unescape(new_content))
-            
-            for part in parts:
-                if not part:
-                    continue
+                    self._write_note_element(target, new_content, current_type)
+                    self.package.mark_dirty(self.NOTE_PARTS[current_type])
+                    written[note_id] = True
+                    break
                     
-                run = ET.SubElement(para, f"{{{self.NS['w']}}}r")
-                
-                # Check if this is italic text
-                italic_match = re.match(r'<i>(.*?)</i>', part)
-                if italic_match:
-                    rPr = ET.SubElement(run, f"{{{self.NS['w']}}}rPr")
-                    ET.SubElement(rPr, f"{{{self.NS['w']}}}i")
-                    text_content = italic_match.group(1)
-                else:
-                    text_content = part
-                
-                t = ET.SubElement(run, f"{{{self.NS['w']}}}t")
-                t.text = text_content
-                t.set(f"{{{self.NS['xml']}}}space", "preserve")
-            
-            tree.write(endnotes_path, encoding='UTF-8', xml_declaration=True)
-            return True
+                except Exception as e:
+                    print(f"[WordDocumentProcessor] Error writing {current_type} {note_id}: {e}")
+        
+        return written
+    
+    def write_endnote(self, note_id: str, new_content: str) -> bool:
+        """
+        Replace an endnote's content with new formatted citation.
+        
+        Prefer write_notes() when writing more than one note.
+        
+        Args:
+            note_id: The endnote ID to update
+            new_content: New citation text (may contain <i> tags for italics)
             
-        except Exception as e:
-            print(f"[WordDocumentProcessor] Error writing endnote: {e}")
-            return False
+        Returns:
+            bool: True if successful
+        """
+        return self.write_notes({note_id: new_content}, 'endnote')[str(note_id)]
     
     def write_footnote(self, note_id: str, new_content: str) -> bool:
         """
         Replace a footnote's content with new formatted citation.
+        
+        Prefer write_notes() when writing more than one note.
+        """
+        return self.write_notes({note_id: new_content}, 'footnote')[str(note_id)]
+    
+    def _write_note_element(self, target: ET.Element, new_content: str, note_type: str) -> None:
+        """
+        Replace the runs of a parsed endnote/footnote element.
         Handles <i> tags for italics using regex (no BeautifulSoup needed).
-        PRESERVES the footnoteRef element for proper numbering and linking.
+        PRESERVES the endnoteRef/footnoteRef element for proper numbering and linking.
         """
-        footnotes_path = os.path.join(self.temp_dir, 'word', 'footnotes.xml')
-        if not os.path.exists(footnotes_path):
-            return False
+        w = self.NS['w']
+        ref_tag = f"{note_type}Ref"
+        ref_style = "EndnoteReference" if note_type == 'endnote' else "FootnoteReference"
         
-        try:
-            ET.register_namespace('w', self.NS['w'])
-            ET.register_namespace('xml', self.NS['xml'])
-            
-            tree = ET.parse(footnotes_path)
-            root = tree.getroot()
-            
-            target = None
-            for footnote in root.findall('.//w:footnote', self.NS):
-                if footnote.get(f"{{{self.NS['w']}}}id") == str(note_id):
-                    target = footnote
-                    break
-            
-            if target is None:
-                return False
+        # Find or create paragraph
+        para = target.find('.//w:p', self.NS)
+        if para is None:
+            para = ET.SubElement(target, f"{{{w}}}p")
+        else:
+            # FIXED: Preserve paragraph properties AND endnoteRef/footnoteRef run
+            preserved_pPr = None
+            preserved_ref_run = None
             
-            para = target.find('.//w:p', self.NS)
-            if para is None:
-                para = ET.SubElement(target, f"{{{self.NS['w']}}}p")
-            else:
-                # FIXED: Preserve paragraph properties AND footnoteRef run
-                preserved_pPr = None
-                preserved_footnoteRef_run = None
+            for child in list(para):
+                tag = child.tag.replace(f"{{{w}}}", "")
                 
-                for child in list(para):
-                    tag = child.tag.replace(f"{{{self.NS['w']}}}", "")
-                    
-                    # Preserve paragraph properties
-                    if tag == 'pPr':
-                        preserved_pPr = child
+                # Preserve paragraph properties
+                if tag == 'pPr':
+                    preserved_pPr = child
+                    continue
+                
+                # Check if this run contains the note reference
+                if tag == 'r':
+                    note_ref = child.find(f".//{{{w}}}{ref_tag}")
+                    if note_ref is not None:
+                        preserved_ref_run = child
                         continue
-                    
-                    # Check if this run contains footnoteRef
-                    if tag == 'r':
-                        footnote_ref = child.find(f".//{{{self.NS['w']}}}footnoteRef")
-                        if footnote_ref is not None:
-                            preserved_footnoteRef_run = child
-                            continue
-                    
-                    # Remove all other children
-                    para.remove(child)
                 
-                # If no footnoteRef run was found, create one
-                if preserved_footnoteRef_run is None:
-                    ref_run = ET.Element(f"{{{self.NS['w']}}}r")
-                    rPr = ET.SubElement(ref_run, f"{{{self.NS['w']}}}rPr")
-                    rStyle = ET.SubElement(rPr, f"{{{self.NS['w']}}}rStyle")
-                    rStyle.set(f"{{{self.NS['w']}}}val", "FootnoteReference")
-                    ET.SubElement(ref_run, f"{{{self.NS['w']}}}footnoteRef")
-                    
-                    # Insert after pPr if it exists, otherwise at beginning
-                    if preserved_pPr is not None:
-                        idx = list(para).index(preserved_pPr) + 1
-                        para.insert(idx, ref_run)
-                    else:
-                        para.insert(0, ref_run)
-            
-            # Parse content using regex to handle <i> tags
-            parts = re.split(r'(<i>.*?</i>)', html.unescape(new_content))
-            
-            for part in parts:
-                if not part:
-                    continue
-                    
-                run = ET.SubElement(para, f"{{{self.NS['w']}}}r")
+                # Remove all other children
+                para.remove(child)
+            
+            # If no reference run was found, create one
+            if preserved_ref_run is None:
+                ref_run = ET.Element(f"{{{w}}}r")
+                rPr = ET.SubElement(ref_run, f"{{{w}}}rPr")
+                rStyle = ET.SubElement(rPr, f"{{{w}}}rStyle")
+                rStyle.set(f"{{{w}}}val", ref_style)
+                ET.SubElement(ref_run, f"{{{w}}}{ref_tag}")
                 
-                # Check if this is italic text
-                italic_match = re.match(r'<i>(.*?)</i>', part)
-                if italic_match:
-                    rPr = ET.SubElement(run, f"{{{self.NS['w']}}}rPr")
-                    ET.SubElement(rPr, f"{{{self.NS['w']}}}i")
-                    text_content = italic_match.group(1)
+                # Insert after pPr if it exists, otherwise at beginning
+                if preserved_pPr is not None:
+                    idx = list(para).index(preserved_pPr) + 1
+                    para.insert(idx, ref_run)
                 else:
-                    text_content = part
+                    para.insert(0, ref_run)
+        
+        # Parse content using regex to handle <i> tags (no BeautifulSoup)
+        parts = re.split(r'(<i>.*?</i>)', html.unescape(new_content))
+        
+        for part in parts:
+            if not part:
+                continue
                 
-                t = ET.SubElement(run, f"{{{self.NS['w']}}}t")
-                t.text = text_content
-                t.set(f"{{{self.NS['xml']}}}space", "preserve")
-            
-            tree.write(footnotes_path, encoding='UTF-8', xml_declaration=True)
-            return True
+            run = ET.SubElement(para, f"{{{w}}}r")
+            
+            # Check if this is italic text
+            italic_match = re.match(r'<i>(.*?)</i>', part)
+            if italic_match:
+                rPr = ET.SubElement(run, f"{{{w}}}rPr")
+                ET.SubElement(rPr, f"{{{w}}}i")
+                text_content = italic_match.group(1)
+            else:
+                text_content = part
             
-        except Exception as e:
-            print(f"[WordDocumentProcessor] Error writing footnote: {e}")
-            return False
+            t = ET.SubElement(run, f"{{{w}}}t")
+            t.text = text_content
+            t.set(f"{{{self.NS['xml']}}}space", "preserve")
     
     def save_to_buffer(self) -> BytesIO:
         """
         Save the modified document to a BytesIO buffer.
         
+        Only edited parts are re-serialized; all other members are
+        copied from the original package as-is.
+        
         Returns:
             BytesIO buffer containing the .docx file
         """
-        buffer = BytesIO()
-        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(self.temp_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, self.temp_dir)
-                    zipf.write(file_path, arcname)
-        buffer.seek(0)
-        return buffer
+        ET.register_namespace('w', self.NS['w'])
+        ET.register_namespace('xml', self.NS['xml'])
+        return self.package.save()
     
     def save_as(self, output_path: str) -> None:
         """
@@ -880,17 +860,14 @@ class WordDocumentProcessor:
         Args:
             output_path: Path for the output .docx file
         """
-        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(self.temp_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, self.temp_dir)
-                    zipf.write(file_path, arcname)
+        ET.register_namespace('w', self.NS['w'])
+        ET.register_namespace('xml', self.NS['xml'])
+        self.package.save(output_path)
     
     def cleanup(self) -> None:
-        """Remove temporary files."""
-        if os.path.exists(self.temp_dir):
-            shutil.rmtree(self.temp_dir)
+        """Release the in-memory package."""
+        self._note_parts.clear()
+        self.package.close()
     
     def __del__(self):
         """Cleanup on deletion."""
@@ -910,11 +887,35 @@ class LinkActivator:
     underlined styling.
     
     RESTORED: Using proper HYPERLINK field codes for actual clickable links.
+    
+    Each part is scanned once, tag by tag, tracking whether the current
+    text is already a link (inside <w:hyperlink>, a HYPERLINK field, or a
+    HYPERLINK fldSimple). Only <w:t> runs containing a URL are rewritten;
+    everything else is copied through byte for byte. Parts without "http"
+    are not scanned at all.
     """
     
     # Pattern to match URLs
     URL_PATTERN = re.compile(r'(https?://[^\s<>"]+)')
     
+    # What the scanner stops at: paragraphs, tags that change the link/note
+    # state, and every "http" (a possible URL). Everything between is copied
+    # as one slice.
+    _SCAN = re.compile(
+        r'<(/?)(w:(?:p|hyperlink|fldSimple|fldChar|instrText|endnote|footnote))(?=[\s/>])[^>]*>|http'
+    )
+    _RUN_OPEN = re.compile(r'<w:r(?=[\s>])[^>]*>')
+    _FIELD_TYPE = re.compile(r'w:fldCharType="(\w+)"')
+    _NOTE_ID = re.compile(r'w:id="(-?\d+)"')
+    
+    # Parts that may contain URLs
+    TARGET_PARTS = [
+        'word/document.xml',
+        'word/endnotes.xml',
+        'word/footnotes.xml'
+    ]
+    NOTE_PARTS = ['word/endnotes.xml', 'word/footnotes.xml']
+    
     @classmethod
     def process(cls, docx_buffer: BytesIO) -> BytesIO:
         """
@@ -926,110 +927,236 @@ class LinkActivator:
         Returns:
             BytesIO containing the processed .docx file with clickable URLs
         """
-        temp_dir = tempfile.mkdtemp()
-        
         try:
-            # Extract docx to temp directory
-            docx_buffer.seek(0)
-            with zipfile.ZipFile(docx_buffer, 'r') as zf:
-                zf.extractall(temp_dir)
-            
-            # Process each relevant XML file
-            target_files = [
-                'word/document.xml',
-                'word/endnotes.xml',
-                'word/footnotes.xml'
-            ]
-            
-            for xml_file in target_files:
-                full_path = os.path.join(temp_dir, xml_file)
-                if os.path.exists(full_path):
-                    cls._process_xml_file(full_path)
-            
-            # Repackage as docx
-            output_buffer = BytesIO()
-            with zipfile.ZipFile(output_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-                for root, dirs, files in os.walk(temp_dir):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.relpath(file_path, temp_dir)
-                        zf.write(file_path, arcname)
-            
-            output_buffer.seek(0)
-            return output_buffer
+            package = DocxPackage(docx_buffer)
+            cls.process_package(package)
+            return package.save()
             
         except Exception as e:
             print(f"[LinkActivator] Error: {e}")
             docx_buffer.seek(0)
             return docx_buffer
-            
-        finally:
-            if os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
     
     @classmethod
-    def _process_xml_file(cls, file_path: str):
-        """Process a single XML file to convert URLs to hyperlinks."""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Pattern to find URLs within w:t elements
-        pattern = r'(<w:t[^>]*>)([^<]*?)(https?://[^\s<>"]+)([^<]*?)(</w:t>)'
-        
-        def replace_url(match):
-            t_open = match.group(1)
-            text_before = match.group(2)
-            url = match.group(3)
-            text_after = match.group(4)
-            t_close = match.group(5)
-            
-            # Check if this is inside a hyperlink (crude check)
-            pos = match.start()
-            context_before = content[max(0, pos-500):pos]
-            
-            # Count hyperlink opens vs closes before this point
-            hyperlink_opens = context_before.count('<w:hyperlink')
-            hyperlink_closes = context_before.count('</w:hyperlink>')
-            
-            # Also check for HYPERLINK in instrText (field-based hyperlinks)
-            if 'HYPERLINK' in context_before[-200:]:
-                return match.group(0)  # Already a hyperlink, skip
+    def process_package(cls, package: DocxPackage, note_ids: Optional[set] = None) -> None:
+        """
+        Make URLs clickable in an already-open package, in place.
+        
+        Lets callers that are about to save a package anyway (process_document,
+        update_document_note) skip a second unzip/rezip round trip.
+        
+        Args:
+            package: The open package
+            note_ids: If given, only notes with these w:ids (in either notes
+                      part) are processed and document.xml is left alone
+        """
+        part_names = cls.NOTE_PARTS if note_ids is not None else cls.TARGET_PARTS
+        note_ids = {str(note_id) for note_id in note_ids} if note_ids is not None else None
+        
+        for part_name in part_names:
+            if not package.has_part(part_name):
+                continue
+            raw = package.read_part(part_name)
+            if b'http' not in raw:
+                continue
+            content = raw.decode('utf-8')
+            new_content = cls._process_xml(content, note_ids)
+            if new_content is not content:
+                package.set_part(part_name, new_content)
+    
+    @classmethod
+    def process_fragment(cls, xml: str) -> str:
+        """
+        Make URLs clickable in a fragment of part XML (e.g. one note's runs).
+        
+        Used by NoteEditSession so an edit only scans the note that changed.
+        """
+        if 'http' not in xml:
+            return xml
+        return cls._process_xml(xml)
+    
+    @classmethod
+    def _process_xml(cls, content: str, note_ids: Optional[set] = None) -> str:
+        """
+        Convert URLs in one XML part's content to hyperlinks in a single pass.
+        
+        Args:
+            content: Part XML (or a fragment of runs)
+            note_ids: Only rewrite text inside these notes (w:id strings)
+        
+        Returns:
+            The rewritten XML, or `content` itself if nothing changed
+        """
+        out: List[str] = []
+        copied_to = 0
+        
+        hyperlink_depth = 0             # open <w:hyperlink> elements
+        simple_fields: List[bool] = []  # open <w:fldSimple>: is it a HYPERLINK?
+        fields: List[List] = []         # open complex fields: [instruction text, is_hyperlink]
+        instr_start = -1
+        note_active = note_ids is None
+        paragraphs: List[int] = []      # start of each open <w:p>
+        
+        for match in cls._SCAN.finditer(content):
+            name = match.group(2)
             
-            if hyperlink_opens > hyperlink_closes:
-                return match.group(0)  # Inside a hyperlink, skip
+            if name is None:
+                # "http": rewrite the <w:t> it's in, unless that's already a link
+                if match.start() < copied_to or not note_active or instr_start >= 0:
+                    continue
+                if hyperlink_depth or any(simple_fields) or any(f[1] for f in fields):
+                    continue
+                
+                rewrite = cls._text_run_at(content, match.start(), paragraphs[-1] if paragraphs else 0)
+                if rewrite is None:
+                    continue
+                t_start, t_end, rpr = rewrite
+                replacement = cls._link_text(content[content.index('>', t_start) + 1:t_end], rpr)
+                if replacement is not None:
+                    out.append(content[copied_to:t_start])
+                    out.append(replacement)
+                    copied_to = t_end + len('</w:t>')
+                continue
             
-            # Clean URL
+            closing = match.group(1)
+            self_closing = match.group(0).endswith('/>')
+            
+            if name == 'w:p':
+                if closing:
+                    if paragraphs:
+                        paragraphs.pop()
+                elif not self_closing:
+                    paragraphs.append(match.start())
+            
+            elif name == 'w:hyperlink':
+                if closing:
+                    hyperlink_depth = max(hyperlink_depth - 1, 0)
+                elif not self_closing:
+                    hyperlink_depth += 1
+            
+            elif name == 'w:fldSimple':
+                if closing:
+                    if simple_fields:
+                        simple_fields.pop()
+                elif not self_closing:
+                    simple_fields.append('HYPERLINK' in match.group(0).upper())
+            
+            elif name == 'w:fldChar':
+                field_type = cls._FIELD_TYPE.search(match.group(0))
+                field_type = field_type.group(1) if field_type else ''
+                if field_type == 'begin':
+                    fields.append(['', False])
+                elif field_type == 'end' and fields:
+                    fields.pop()
+            
+            elif name == 'w:instrText':
+                if closing:
+                    if instr_start >= 0 and fields:
+                        fields[-1][0] += content[instr_start:match.start()]
+                        fields[-1][1] = 'HYPERLINK' in fields[-1][0].upper()
+                    instr_start = -1
+                elif not self_closing:
+                    instr_start = match.end()
+            
+            elif note_ids is not None:
+                # w:endnote / w:footnote
+                if closing:
+                    note_active = False
+                elif not self_closing:
+                    id_match = cls._NOTE_ID.search(match.group(0))
+                    note_active = bool(id_match) and id_match.group(1) in note_ids
+        
+        if not out:
+            return content
+        out.append(content[copied_to:])
+        return ''.join(out)
+    
+    @classmethod
+    def _text_run_at(cls, content: str, position: int, paragraph_start: int) -> Optional[Tuple[int, int, str]]:
+        """
+        Locate the <w:t> containing `position` and its run's properties.
+        
+        Searches back no further than `paragraph_start`, so each lookup
+        costs the size of one paragraph.
+        
+        Returns:
+            (start of the <w:t> tag, start of </w:t>, the run's <w:rPr> XML
+            or ''), or None if the position isn't inside a run's text
+        """
+        t_start = content.rfind('<', 0, position)
+        if t_start < 0 or not content.startswith('<w:t', t_start) or content[t_start + 4] not in ' >':
+            return None
+        t_end = content.find('</w:t>', position)
+        if t_end < 0 or content.find('<', position, t_end) >= 0:
+            return None
+        
+        # The enclosing run: the last <w:r> opened (and not closed) before the text
+        run_start = max(
+            content.rfind('<w:r>', paragraph_start, t_start),
+            content.rfind('<w:r ', paragraph_start, t_start)
+        )
+        if run_start < 0 or content.rfind('</w:r>', run_start, t_start) >= 0:
+            return None
+        run_open = cls._RUN_OPEN.match(content, run_start)
+        if run_open is None:
+            return None
+        
+        # Run properties are the run's first child; they can nest (w:rPrChange)
+        rpr = ''
+        rpr_start = run_open.end()
+        while rpr_start < t_start and content[rpr_start].isspace():
+            rpr_start += 1
+        if content.startswith('<w:rPr/>', rpr_start):
+            rpr = '<w:rPr/>'
+        elif content.startswith('<w:rPr>', rpr_start) or content.startswith('<w:rPr ', rpr_start):
+            depth, cursor = 0, rpr_start
+            for tag in re.finditer(r'<(/?)w:rPr(?=[\s>/])[^>]*>', content[rpr_start:t_start]):
+                if tag.group(0).endswith('/>'):
+                    continue
+                depth += -1 if tag.group(1) else 1
+                if depth == 0:
+                    cursor = rpr_start + tag.end()
+                    break
+            rpr = content[rpr_start:cursor]
+        
+        return t_start, t_end, rpr
+    
+    @classmethod
+    def _link_text(cls, text: str, rpr: str) -> Optional[str]:
+        """
+        Rewrite one <w:t> (inside a run) so each URL becomes a HYPERLINK field.
+        
+        The enclosing run is closed before each link and reopened (with the
+        same run properties) after it, so the surrounding </w:r> still
+        closes the last piece.
+        
+        Returns:
+            Replacement XML, or None if the text has no URL
+        """
+        plain = html.unescape(text)
+        pieces = cls.URL_PATTERN.split(plain)
+        if len(pieces) == 1:
+            return None
+        
+        def text_xml(value: str) -> str:
+            return f'<w:t xml:space="preserve">{html.escape(value, quote=False)}</w:t>'
+        
+        # pieces alternates text, url, text, url, ..., text
+        result = text_xml(pieces[0]) if pieces[0] else ''
+        for index in range(1, len(pieces), 2):
+            url = pieces[index]
             clean_url = url.rstrip('.,;:)]\'"')
             trailing = url[len(clean_url):]
-            safe_url = html.escape(clean_url)
-            
-            # Build result
-            result = ""
             
-            # Text before URL (if any)
-            if text_before:
-                result += f'{t_open}{text_before}{t_close}</w:r>'
-            else:
-                result += '</w:r>'
-            
-            # The hyperlink field
-            result += cls._build_hyperlink_field(safe_url, clean_url)
-            
-            # Text after URL (if any), including any trailing punctuation
-            after_text = trailing + text_after
-            if after_text:
-                result += f'<w:r>{t_open}{after_text}{t_close}'
-            else:
-                result += '<w:r>'
+            # Close the run, add the link, reopen the run for the text after it
+            result += '</w:r>'
+            result += cls._build_hyperlink_field(html.escape(clean_url), clean_url)
+            result += f'<w:r>{rpr}'
             
-            return result
-        
-        # Apply the replacement
-        new_content = re.sub(pattern, replace_url, content)
-        
-        # Write back
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(new_content)
+            text_after = trailing + pieces[index + 1]
+            if text_after:
+                result += text_xml(text_after)
+        return result
     
     @classmethod
     def _build_hyperlink_field(cls, safe_url: str, display_text: str) -> str:
@@ -1063,10 +1190,279 @@ class LinkActivator:
         return field_xml
 
 
+# =============================================================================
+# NOTE CLUSTERING (same work, different pincites)
+# =============================================================================
+
+# Trailing page locator: ", 45" / ", p. 45" / " at 112-14" / ", 45 n. 3". A number
+# after a plain space is only a page with "at"/"p."/"pp." ("Federalist 10" isn't)
+PINCITE_PATTERN = re.compile(
+    r'(?:,\s*|\s+(?=at\s|pp?\.))(at\s+|pp?\.\s*)?(\d+(?:\s*[-–]\s*\d+)?(?:\s*nn?\.\s*\d+)?)\s*\.?\s*$',
+    re.IGNORECASE
+)
+_YEAR = re.compile(r'^(1[4-9]|20)\d{2}$')
+# A bare number after these is part of the citation ("vol. 3", "no. 12"), not a page
+_LOCATOR_BEFORE = re.compile(
+    r'(?:\b(?:vols?|nos?|chs?|chap|pts?|arts?|bks?|secs?)\.|§)\s*$',
+    re.IGNORECASE
+)
+# Reporter and statute abbreviations: a number right after them belongs to the cited
+# authority ("347 U.S. 483", "42 U.S.C. 12101", "Pub. L. 111-148"), and so does a
+# number listed after a statute section ("42 U.S.C. 12101, 12102")
+_AUTHORITY_BEFORE = re.compile(
+    r'(?:\bU\.\s?S\.|\bS\.\s?Ct\.|\bL\.\s?Ed\.(?:\s?2d)?|\bF\.\s?(?:[234]d|4th|Supp\.(?:\s?[23]d)?)'
+    r'|(?:\bU\.\s?S\.\s?C\.?|\bC\.\s?F\.\s?R\.?|\bPub\.\s?L\.?|\bStat\.|\bFed\.\s?Reg\.|§§?)'
+    r'(?:\s*[\w().–-]*\d[\w().–-]*)?)\s*$',
+    re.IGNORECASE
+)
+_DASHES = re.compile(r'\s*[-–—]\s*')
+_CLUSTER_TOKEN = re.compile(r'[a-z0-9]+')
+_CLUSTER_STOPWORDS = frozenset('a an and the of in on for to at by p pp ed eds trans vol'.split())
+
+# Fewer content words (numbers aside) than this is too generic to merge ("Smith, 45")
+MIN_CLUSTER_TOKENS = 2
+
+
+def split_pincite(text: str) -> Tuple[str, Optional[str]]:
+    """
+    Split a note into the citation and its trailing page reference.
+    
+    Examples:
+    - "Smith, Wealth of Nations, 45." -> ("Smith, Wealth of Nations", "45")
+    - "Smith, Wealth of Nations, pp. 112-14" -> ("Smith, Wealth of Nations", "112-14")
+    - "Smith, Wealth of Nations, 1776." -> unchanged (a bare year isn't a page)
+    - "Smith, Wealth of Nations, vol. 3" -> unchanged (a volume isn't a page)
+    - "Hamilton, Federalist 10" -> unchanged (no locator before the number)
+    - "42 U.S.C. 12101", "Pub. L. 111-148" -> unchanged (section / law number)
+    
+    Returns:
+        (citation without the locator, page or None)
+    """
+    cleaned = (text or '').strip()
+    match = PINCITE_PATTERN.search(cleaned)
+    if not match:
+        return cleaned, None
+    
+    prefix, page = match.group(1), match.group(2)
+    before = cleaned[:match.start()]
+    if _AUTHORITY_BEFORE.search(before):
+        return cleaned, None
+    if not prefix and (_YEAR.match(page) or _LOCATOR_BEFORE.search(before)):
+        return cleaned, None
+    
+    base = before.rstrip(' ,.:;')
+    if not _specific_enough(_cluster_tokens(base)):
+        return cleaned, None
+    return base, re.sub(r'\s+', ' ', page)
+
+
+def _cluster_tokens(text: str) -> List[str]:
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    folded = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return [t for t in _CLUSTER_TOKEN.findall(folded) if t not in _CLUSTER_STOPWORDS]
+
+
+def _specific_enough(tokens: List[str]) -> bool:
+    return sum(1 for t in set(tokens) if not t.isdigit()) >= MIN_CLUSTER_TOKENS
+
+
+def note_cluster_key(text: str) -> Optional[str]:
+    """
+    Key shared by notes that clearly cite the same work.
+    
+    URLs compare by normalize_url(); other notes by the sequence of
+    content words left after removing the page reference, so punctuation,
+    case, accents and articles don't matter but word order does
+    ("Jones v. Smith" and "Smith v. Jones" stay apart). Returns None for
+    notes too short to merge safely.
+    """
+    stripped = (text or '').strip()
+    if stripped.lower().startswith(('http://', 'https://')):
+        return f"url:{normalize_url(stripped)}"
+    
+    base, _ = split_pincite(stripped)
+    tokens = _cluster_tokens(base)
+    if not _specific_enough(tokens):
+        return None
+    return 'words:' + ' '.join(tokens)
+
+
+def cluster_notes(texts: List[str]) -> Dict[str, Tuple[str, Optional[str]]]:
+    """
+    Group note texts by the work they cite.
+    
+    A cluster of two or more notes is resolved once, through its most
+    complete (longest) text with the page reference removed; every member
+    reuses that result with its own page reference. Notes that share
+    their work with no other note are resolved as written.
+    
+    Args:
+        texts: Note texts (ibid references already excluded)
+    
+    Returns:
+        Dict mapping each note text -> (representative text, page or None)
+    """
+    clusters: Dict[str, List[str]] = {}
+    singles: List[str] = []
+    for text in dict.fromkeys(texts):
+        key = note_cluster_key(text)
+        if key is None:
+            singles.append(text)
+        else:
+            clusters.setdefault(key, []).append(text)
+    
+    mapping: Dict[str, Tuple[str, Optional[str]]] = {}
+    for members in clusters.values():
+        if len(members) == 1:
+            singles.extend(members)
+            continue
+        representative = split_pincite(max(members, key=len))[0]
+        for text in members:
+            mapping[text] = (representative, split_pincite(text)[1])
+    for text in singles:
+        mapping[text] = (text, None)
+    
+    sources = len(set(representative for representative, _ in mapping.values()))
+    if sources < len(mapping):
+        print(f"[cluster_notes] {len(mapping)} distinct notes cite {sources} sources")
+    return mapping
+
+
+def _shown_pages(metadata: Any) -> Set[str]:
+    """Page numbers a formatted citation already shows: its page range (and first page), a case's reporter page."""
+    shown = set()
+    pages = _DASHES.sub('-', (getattr(metadata, 'pages', '') or '').strip())
+    if pages:
+        shown.update((pages, pages.split('-')[0]))
+    reporter = re.search(r'(\d+)\s*$', getattr(metadata, 'citation', '') or '')
+    if reporter:
+        shown.add(reporter.group(1))
+    return shown
+
+
+def with_pincite(formatted: str, page: Optional[str], metadata: Any = None) -> str:
+    """
+    Add a note's page reference to a full or short citation.
+    
+    Left unchanged if the page is the citation's own page range or first
+    page (metadata.pages) or a case's reporter page (metadata.citation);
+    hyphens and en dashes compare alike. Other numbers in the citation
+    (volume, year) don't count.
+    """
+    if not page or not formatted:
+        return formatted
+    if _DASHES.sub('-', page) in _shown_pages(metadata):
+        return formatted
+    return f"{formatted.rstrip().rstrip('.')}, {page}."
+
+
+# =============================================================================
+# CONCURRENT NOTE RESOLUTION
+# =============================================================================
+
+# Bounded pool size for resolving note texts in parallel
+NOTE_WORKERS = 8
+
+# Deadline for resolving every note in a document (stays under gunicorn's 120s)
+DOCUMENT_TIMEOUT = 90  # seconds
+
+# Share of the deadline the batched AI pre-pass (get_note_hints) may use
+HINTS_TIMEOUT_SHARE = 0.4
+
+
+def resolve_notes(
+    texts: List[str],
+    style: str,
+    max_workers: int = NOTE_WORKERS,
+    timeout: float = DOCUMENT_TIMEOUT,
+    progress_callback=None,
+    result_callback=None
+) -> Dict[str, Tuple[Any, str]]:
+    """
+    Resolve note texts through get_citation concurrently.
+    
+    A pre-pass first guesses all notes in a few batched AI calls
+    (unified_router.get_note_hints); each lookup gets its note's guess, so
+    per-note AI calls are only made for notes the batch didn't cover.
+    
+    Each unique text is looked up once on a bounded thread pool. Lookups
+    that have not finished when the document deadline passes are cancelled
+    and recorded as misses, so a few slow notes cannot stall the whole
+    document.
+    
+    Args:
+        texts: Note texts to resolve (duplicates are looked up once)
+        style: Citation style to use
+        max_workers: Maximum concurrent lookups
+        timeout: Deadline in seconds for the whole batch
+        progress_callback: Optional callback(current, total) as each note finishes
+        result_callback: Optional callback(text, (metadata, formatted)) as each
+                         note finishes (in the calling thread, completion order)
+        
+    Returns:
+        Dict mapping note text -> (metadata, formatted); misses map to (None, None)
+    """
+    # Import here to avoid circular imports
+    from unified_router import get_citation, get_note_hints
+    from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+    import time
+    
+    unique_texts = list(dict.fromkeys(texts))
+    resolved: Dict[str, Tuple[Any, str]] = {}
+    
+    if not unique_texts:
+        return resolved
+    
+    started = time.monotonic()
+    hints = get_note_hints(unique_texts, timeout=timeout * HINTS_TIMEOUT_SHARE)
+    remaining = max(timeout - (time.monotonic() - started), 0)
+    
+    print(f"[resolve_notes] Resolving {len(unique_texts)} unique notes with {max_workers} workers "
+          f"({len(hints)} with batch hints)")
+    
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {
+            executor.submit(get_citation, text, style, hints.get(text.strip())): text
+            for text in unique_texts
+        }
+        try:
+            for future in as_completed(futures, timeout=remaining):
+                text = futures[future]
+                try:
+                    resolved[text] = future.result()
+                except Exception as e:
+                    print(f"[resolve_notes] Error in get_citation: {e}")
+                    resolved[text] = (None, None)
+                
+                if progress_callback:
+                    try:
+                        progress_callback(len(resolved), len(unique_texts))
+                    except Exception as e:
+                        print(f"[resolve_notes] Progress callback error: {e}")
+                if result_callback:
+                    result_callback(text, resolved[text])
+        except FuturesTimeout:
+            pass
+        
+        for future, text in futures.items():
+            if text not in resolved:
+                future.cancel()
+                print(f"[resolve_notes] Deadline of {timeout}s passed for: {text[:50]}...")
+                resolved[text] = (None, None)
+    finally:
+        # Don't block on lookups that overran the deadline
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    return resolved
+
+
 def process_document(
     file_bytes: bytes,
     style: str = "Chicago Manual of Style",
-    add_links: bool = True
+    add_links: bool = True,
+    progress_callback=None,
+    note_callback=None
 ) -> tuple:
     """
     Process all citations in a Word document.
@@ -1080,21 +1476,28 @@ def process_document(
     - Explicit ibid references (user typed "ibid" or "ibid., 45")
     - Repetitive URLs (same URL as previous note → ibid)
     
+    Notes citing the same work are clustered (see cluster_notes) and one
+    representative per cluster is resolved concurrently (see
+    resolve_notes), so lookups scale with distinct sources, not notes.
+    The ibid/short-form logic runs in note order, adding each note's own
+    page reference; a note is finished as soon as its lookup and those of
+    every earlier note are in, so results come out in order while later
+    lookups are still running.
+    
     Args:
         file_bytes: The document as bytes
         style: Citation style to use
         add_links: Whether to make URLs clickable
+        progress_callback: Optional callback(status, current, total), as in
+                           AuthorDateProcessor.process_document
+        note_callback: Optional callback(index, ProcessedCitation) for each
+                       finished note, in note order (index starts at 1)
         
     Returns:
         Tuple of (processed_document_bytes, results_list)
     """
     # Import here to avoid circular imports
-    from unified_router import get_citation
     from formatters.base import BaseFormatter, get_formatter
-    from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
-    
-    # Per-note timeout to prevent indefinite hanging
-    NOTE_TIMEOUT = 8  # seconds per note
     
     results = []
     
@@ -1104,26 +1507,26 @@ def process_document(
     # Get the formatter for short form citations
     formatter = get_formatter(style)
     
+    def report(status: str, pct: int) -> None:
+        if progress_callback:
+            progress_callback(status, pct, 100)
+    
     # Load document
+    report("Reading notes...", 0)
     processor = WordDocumentProcessor(BytesIO(file_bytes))
     
     # Get all endnotes and footnotes
     endnotes = processor.get_endnotes()
     footnotes = processor.get_footnotes()
     
-    # Helper to call get_citation with timeout
-    def get_citation_with_timeout(text: str, style: str, timeout: int = NOTE_TIMEOUT):
-        """Call get_citation with a timeout wrapper."""
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(get_citation, text, style)
-            try:
-                return future.result(timeout=timeout)
-            except FuturesTimeout:
-                print(f"[process_document] Timeout after {timeout}s for: {text[:50]}...")
-                return None, None
-            except Exception as e:
-                print(f"[process_document] Error in get_citation: {e}")
-                return None, None
+    # One representative lookup per cited work
+    clusters = cluster_notes(
+        [note['text'] for note in endnotes + footnotes if not is_ibid(note['text'])]
+    )
+    lookups: Dict[str, Tuple[Any, str]] = {}
+    
+    # Formatted notes to write, applied in one batch per notes part
+    pending_writes: Dict[str, Dict[str, str]] = {'endnote': {}, 'footnote': {}}
     
     def process_single_note(note: Dict[str, str], note_type: str) -> ProcessedCitation:
         """
@@ -1152,10 +1555,7 @@ def process_document(
                 page = extract_ibid_page(original_text)
                 formatted = BaseFormatter.format_ibid(page)
                 
-                if note_type == 'endnote':
-                    processor.write_endnote(note_id, formatted)
-                else:
-                    processor.write_footnote(note_id, formatted)
+                pending_writes[note_type][note_id] = formatted
                 
                 return ProcessedCitation(
                     original=original_text,
@@ -1166,8 +1566,9 @@ def process_document(
                     citation_form="ibid"
                 )
             
-            # Case 2+: Process citation to get metadata (with timeout)
-            metadata, full_formatted = get_citation_with_timeout(original_text, style)
+            # Case 2+: Metadata was resolved by lookup (via the note's cluster)
+            representative, page = clusters.get(original_text, (original_text, None))
+            metadata, full_formatted = lookups.get(representative, (None, None))
             
             if not metadata or not full_formatted:
                 return ProcessedCitation(
@@ -1189,10 +1590,7 @@ def process_document(
             if current_url and previous_url and urls_match(current_url, previous_url):
                 formatted = BaseFormatter.format_ibid()
                 
-                if note_type == 'endnote':
-                    processor.write_endnote(note_id, formatted)
-                else:
-                    processor.write_footnote(note_id, formatted)
+                pending_writes[note_type][note_id] = formatted
                 
                 return ProcessedCitation(
                     original=original_text,
@@ -1205,12 +1603,9 @@ def process_document(
             
             # Case 3: Check if same source as previous → ibid
             if history.is_same_as_previous(metadata):
-                formatted = BaseFormatter.format_ibid()
+                formatted = BaseFormatter.format_ibid(page)
                 
-                if note_type == 'endnote':
-                    processor.write_endnote(note_id, formatted)
-                else:
-                    processor.write_footnote(note_id, formatted)
+                pending_writes[note_type][note_id] = formatted
                 
                 return ProcessedCitation(
                     original=original_text,
@@ -1223,12 +1618,9 @@ def process_document(
             
             # Case 4: Check if previously cited → short form
             if history.has_been_cited_before(metadata):
-                formatted = formatter.format_short(metadata)
+                formatted = with_pincite(formatter.format_short(metadata), page, metadata)
                 
-                if note_type == 'endnote':
-                    processor.write_endnote(note_id, formatted)
-                else:
-                    processor.write_footnote(note_id, formatted)
+                pending_writes[note_type][note_id] = formatted
                 
                 history.add(metadata, formatted)
                 
@@ -1242,10 +1634,8 @@ def process_document(
                 )
             
             # Case 5: New source → full citation
-            if note_type == 'endnote':
-                processor.write_endnote(note_id, full_formatted)
-            else:
-                processor.write_footnote(note_id, full_formatted)
+            full_formatted = with_pincite(full_formatted, page, metadata)
+            pending_writes[note_type][note_id] = full_formatted
             
             history.add(metadata, full_formatted)
             
@@ -1270,33 +1660,72 @@ def process_document(
                 citation_form="full"
             )
     
-    # Process endnotes
-    total_notes = len(endnotes) + len(footnotes)
-    print(f"[process_document] Processing {len(endnotes)} endnotes, {len(footnotes)} footnotes ({total_notes} total)")
+    # Notes in document order; finish_ready() finishes every note whose
+    # lookup (and every earlier note's lookup) has arrived
+    ordered_notes = [(note, 'endnote') for note in endnotes] + [(note, 'footnote') for note in footnotes]
     
-    for idx, note in enumerate(endnotes):
-        print(f"[process_document] Processing endnote {idx+1}/{len(endnotes)}: {note.get('text', '')[:40]}...")
-        result = process_single_note(note, 'endnote')
-        results.append(result)
-        print(f"[process_document] Endnote {idx+1} {'✔' if result.success else '✗'}")
+    def is_ready(note: Dict[str, str]) -> bool:
+        text = note['text']
+        return is_ibid(text) or clusters.get(text, (text, None))[0] in lookups
     
-    # Process footnotes
-    for idx, note in enumerate(footnotes):
-        print(f"[process_document] Processing footnote {idx+1}/{len(footnotes)}: {note.get('text', '')[:40]}...")
-        result = process_single_note(note, 'footnote')
-        results.append(result)
-        print(f"[process_document] Footnote {idx+1} {'✔' if result.success else '✗'}")
+    def finish_ready() -> None:
+        while len(results) < len(ordered_notes) and is_ready(ordered_notes[len(results)][0]):
+            note, note_type = ordered_notes[len(results)]
+            position = len(results) + 1 if note_type == 'endnote' else len(results) + 1 - len(endnotes)
+            count = len(endnotes) if note_type == 'endnote' else len(footnotes)
+            
+            print(f"[process_document] Processing {note_type} {position}/{count}: {note.get('text', '')[:40]}...")
+            result = process_single_note(note, note_type)
+            results.append(result)
+            print(f"[process_document] {note_type.capitalize()} {position} {'✔' if result.success else '✗'}")
+            
+            if note_callback:
+                try:
+                    note_callback(len(results), result)
+                except Exception as e:
+                    print(f"[process_document] Note callback error: {e}")
+    
+    def lookup_done(text: str, value: Tuple[Any, str]) -> None:
+        lookups[text] = value
+        finish_ready()
+    
+    def lookup_progress(done: int, total: int) -> None:
+        report(f"Found {done}/{total} sources", 10 + int((done / total) * 70))  # 10-80%
+    
+    print(f"[process_document] Processing {len(endnotes)} endnotes, {len(footnotes)} footnotes ({len(ordered_notes)} total)")
+    
+    report("Looking up citations...", 10)
+    finish_ready()  # leading ibids, if any
+    lookups.update(resolve_notes(
+        list(dict.fromkeys(representative for representative, _ in clusters.values())),
+        style,
+        progress_callback=lookup_progress if progress_callback else None,
+        result_callback=lookup_done
+    ))
+    
+    # Notes whose lookups missed the deadline
+    report("Formatting citations...", 80)
+    finish_ready()
+    
+    # Write all formatted notes (one parse per notes part)
+    report("Updating document...", 90)
+    processor.write_notes(pending_writes['endnote'], 'endnote')
+    processor.write_notes(pending_writes['footnote'], 'footnote')
+    
+    # Make URLs clickable if requested (in the same package, before the single save)
+    if add_links:
+        try:
+            LinkActivator.process_package(processor.package)
+        except Exception as e:
+            print(f"[LinkActivator] Error: {e}")
     
     # Save to buffer
     doc_buffer = processor.save_to_buffer()
     
-    # Make URLs clickable if requested
-    if add_links:
-        doc_buffer = LinkActivator.process(doc_buffer)
-    
     # Cleanup
     processor.cleanup()
     
+    report("Complete!", 100)
     return doc_buffer.read(), results
 
 
@@ -1305,12 +1734,166 @@ def process_document(
 # Added: 2025-12-05 13:40
 # =============================================================================
 
+class NoteEditSession:
+    """
+    A processed document kept open across Workbench note edits.
+    
+    The endnotes/footnotes parts are split once into the XML around each
+    note and the body of each note, indexed by w:id. An edit replaces one
+    note body (with links activated in that note only), so 50 edits cost 50
+    small string patches instead of 50 full package rebuilds. The package
+    is zipped only when to_bytes() is called (on download), and the result
+    is reused until the next edit.
+    
+    Usage:
+        editor = NoteEditSession(processed_doc)
+        editor.apply(3, "<i>Title</i>, 2020.")
+        docx_bytes = editor.to_bytes()
+    """
+    
+    # (part name, note element, note type), in lookup order
+    NOTE_PARTS = [
+        ('word/endnotes.xml', 'w:endnote', 'endnote'),
+        ('word/footnotes.xml', 'w:footnote', 'footnote'),
+    ]
+    
+    def __init__(self, doc_bytes: bytes):
+        self.digest = document_digest(doc_bytes)
+        self.package = DocxPackage(doc_bytes)
+        self._lock = threading.RLock()
+        
+        # part name -> [xml before note 1, note 1 body, xml between, note 2 body, ..., tail]
+        self._pieces: Dict[str, List[str]] = {}
+        # part name -> {note id: index of its body in _pieces[part]}
+        self._note_index: Dict[str, Dict[str, int]] = {}
+        self._dirty: set = set()
+        self._saved: Optional[bytes] = None
+        
+        # note id -> HTML currently applied
+        self.applied: Dict[str, str] = {}
+        
+        for part_name, note_tag, _ in self.NOTE_PARTS:
+            if self.package.has_part(part_name):
+                self._split_part(part_name, note_tag)
+    
+    def _split_part(self, part_name: str, note_tag: str) -> None:
+        content = self.package.read_text(part_name)
+        pattern = re.compile(rf'(<{note_tag}\b[^>]*?(?<!/)>)(.*?)(</{note_tag}>)', re.DOTALL)
+        
+        pieces: List[str] = []
+        index: Dict[str, int] = {}
+        position = 0
+        for match in pattern.finditer(content):
+            pieces.append(content[position:match.end(1)])
+            id_match = re.search(r'w:id="(-?\d+)"', match.group(1))
+            if id_match:
+                index.setdefault(id_match.group(1), len(pieces))
+            pieces.append(match.group(2))
+            position = match.start(3)
+        pieces.append(content[position:])
+        
+        self._pieces[part_name] = pieces
+        self._note_index[part_name] = index
+    
+    def has_note(self, note_id: int) -> bool:
+        """Whether the document contains an endnote or footnote with this w:id."""
+        return any(str(note_id) in index for index in self._note_index.values())
+    
+    def apply(self, note_id: int, new_html: str) -> bool:
+        """
+        Replace one note's content.
+        
+        Args:
+            note_id: The note's w:id (endnotes are searched first)
+            new_html: The new HTML content for the note
+        
+        Returns:
+            True if the note was found and updated
+        """
+        with self._lock:
+            for part_name, _, note_type in self.NOTE_PARTS:
+                piece = self._note_index.get(part_name, {}).get(str(note_id))
+                if piece is None:
+                    continue
+                
+                word_xml = LinkActivator.process_fragment(html_to_word_xml(new_html, note_type))
+                self._pieces[part_name][piece] = word_xml
+                self._dirty.add(part_name)
+                self._saved = None
+                self.applied[str(note_id)] = new_html
+                return True
+            return False
+    
+    def sync(self, edits: Dict[str, str]) -> None:
+        """Apply every edit in `edits` that isn't applied yet (e.g. made by another worker)."""
+        with self._lock:
+            for note_id, new_html in edits.items():
+                if self.applied.get(str(note_id)) != new_html:
+                    if not self.apply(int(note_id), new_html):
+                        print(f"[NoteEditSession] Note {note_id} not found in document")
+                        # Remember it anyway so it isn't retried on every sync
+                        self.applied[str(note_id)] = new_html
+    
+    def to_bytes(self) -> bytes:
+        """Serialize the edited document (cached until the next edit)."""
+        with self._lock:
+            if self._saved is None:
+                for part_name in self._dirty:
+                    self.package.set_part(part_name, ''.join(self._pieces[part_name]))
+                self._dirty.clear()
+                self._saved = self.package.to_bytes()
+            return self._saved
+
+
+def document_digest(doc_bytes: bytes) -> str:
+    """Identity of a document's content (to tell whether an edit session is still current)."""
+    return hashlib.blake2b(doc_bytes, digest_size=16).hexdigest()
+
+
+# Open edit sessions per worker, least recently used first
+EDIT_SESSION_CACHE_SIZE = 16
+
+_edit_sessions: "OrderedDict[str, NoteEditSession]" = OrderedDict()
+_edit_sessions_lock = threading.Lock()
+
+
+def get_edit_session(key: str, doc_bytes: bytes, edits: Optional[Dict[str, str]] = None) -> NoteEditSession:
+    """
+    Return the open edit session for a Workbench session, with `edits` applied.
+    
+    The session is reused while the base document is unchanged; it is
+    rebuilt if the document was replaced or an edit it holds was dropped.
+    
+    Args:
+        key: Workbench session ID
+        doc_bytes: The processed document the edits apply to
+        edits: note id -> HTML for every note edited so far
+    """
+    edits = edits or {}
+    digest = document_digest(doc_bytes)
+    
+    with _edit_sessions_lock:
+        editor = _edit_sessions.get(key)
+        if editor is not None:
+            _edit_sessions.move_to_end(key)
+    
+    if editor is None or editor.digest != digest or set(editor.applied) - set(map(str, edits)):
+        editor = NoteEditSession(doc_bytes)
+        with _edit_sessions_lock:
+            _edit_sessions[key] = editor
+            while len(_edit_sessions) > EDIT_SESSION_CACHE_SIZE:
+                _edit_sessions.popitem(last=False)
+    
+    editor.sync(edits)
+    return editor
+
+
 def update_document_note(doc_bytes: bytes, note_id: int, new_html: str) -> bytes:
     """
     Update a single endnote/footnote in a processed document.
     
-    This function is used by the Workbench UI to update individual notes
-    after manual editing.
+    One-shot form of NoteEditSession; the Workbench uses get_edit_session()
+    so repeated edits don't rebuild the package each time.
     
     Args:
         doc_bytes: The current processed document as bytes
@@ -1320,74 +1903,12 @@ def update_document_note(doc_bytes: bytes, note_id: int, new_html: str) -> bytes
     Returns:
         Updated document as bytes
     """
-    import io
-    import zipfile
-    import tempfile
-    import shutil
-    import re
-    
     try:
-        # Extract the docx
-        temp_dir = tempfile.mkdtemp()
-        
-        with zipfile.ZipFile(io.BytesIO(doc_bytes), 'r') as zf:
-            zf.extractall(temp_dir)
-        
-        # Find and update the endnote
-        endnotes_path = os.path.join(temp_dir, 'word', 'endnotes.xml')
-        footnotes_path = os.path.join(temp_dir, 'word', 'footnotes.xml')
-        
-        updated = False
-        
-        for xml_path, note_tag in [(endnotes_path, 'w:endnote'), (footnotes_path, 'w:footnote')]:
-            if not os.path.exists(xml_path):
-                continue
-            
-            # Determine note type for styling
-            note_type = 'footnote' if 'footnote' in xml_path else 'endnote'
-                
-            with open(xml_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Find the note with matching ID
-            # Pattern: <w:endnote w:id="N">...</w:endnote>
-            pattern = rf'(<{note_tag}\s+[^>]*w:id="{note_id}"[^>]*>)(.*?)(</{note_tag}>)'
-            
-            def replace_note_content(match):
-                open_tag = match.group(1)
-                close_tag = match.group(3)
-                
-                # Convert HTML to Word XML with proper style
-                word_xml = html_to_word_xml(new_html, note_type)
-                
-                return f"{open_tag}{word_xml}{close_tag}"
-            
-            new_content, count = re.subn(pattern, replace_note_content, content, flags=re.DOTALL)
-            
-            if count > 0:
-                with open(xml_path, 'w', encoding='utf-8') as f:
-                    f.write(new_content)
-                updated = True
-                break
-        
-        # Repackage the docx
-        output_buffer = io.BytesIO()
-        with zipfile.ZipFile(output_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-            for root, dirs, files in os.walk(temp_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, temp_dir)
-                    zf.write(file_path, arcname)
-        
-        # Cleanup
-        shutil.rmtree(temp_dir)
-        
-        output_buffer.seek(0)
-        
-        # Activate any URLs as clickable hyperlinks (use internal LinkActivator)
-        output_buffer = LinkActivator.process(output_buffer)
-        
-        return output_buffer.read()
+        editor = NoteEditSession(doc_bytes)
+        if not editor.apply(note_id, new_html):
+            print(f"[update_document_note] Note {note_id} not found")
+            return doc_bytes
+        return editor.to_bytes()
         
     except Exception as e:
         print(f"[update_document_note] Error: {e}")
@@ -0,0 +1,359 @@
+"""
+citeflex/docx_package.py
+
+In-memory model of a .docx (OPC zip) package.
+
+A .docx is a zip of XML parts plus media, fonts, and other binaries. CiteFlex
+only ever edits a handful of XML parts (word/document.xml, word/endnotes.xml,
+word/footnotes.xml), so instead of extracting the whole package to a temp
+directory and re-compressing every file on save, DocxPackage:
+
+- Reads the zip once into memory and only decompresses parts that are asked for
+- Keeps parts that are edited as parsed ElementTrees (or replacement bytes)
+- Copies every untouched member into the output raw, without recompressing
+
+Images and fonts in large manuscripts are therefore never inflated or deflated.
+
+Created: 2026-10-16
+
+Version History:
+    2026-10-16: Added iterparse() - streams a part's parse events and caches the
+                finished tree, so reading a part and then editing it parses it once
+    2026-10-16: Raw member copy checks for the zipfile internals it uses and
+                falls back to writestr() for ZIP64, encrypted or non-deflate
+                members
+"""
+
+import os
+import copy
+import struct
+import zipfile
+import xml.etree.ElementTree as ET
+from io import BytesIO
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+
+# Offset of the (filename length, extra length) pair in a zip local file header
+_LOCAL_HEADER_SIZE = 30
+_LOCAL_HEADER_NAME_LENGTHS = 26
+
+# Data descriptor flag: CRC and sizes follow the data instead of the header
+_FLAG_DATA_DESCRIPTOR = 0x08
+_FLAG_ENCRYPTED = 0x01
+
+_LOCAL_HEADER_SIGNATURE = b'PK\x03\x04'
+
+# Sizes and offsets at or above this need ZIP64 extra fields
+_ZIP64_LIMIT = 0xFFFFFFFF
+_ZIP64_EXTRA_ID = 0x0001
+
+# zipfile internals the raw copy relies on (not public API)
+_RAW_COPY_ATTRS = ('fp', 'start_dir', 'filelist', 'NameToInfo')
+
+
+def _has_extra(extra: bytes, header_id: int) -> bool:
+    """Whether a zip extra field block contains a record with this header id."""
+    pos = 0
+    while pos + 4 <= len(extra):
+        record_id, size = struct.unpack('<HH', extra[pos:pos + 4])
+        if record_id == header_id:
+            return True
+        pos += 4 + size
+    return False
+
+
+class DocxPackage:
+    """
+    A .docx package held in memory with lazily parsed, editable parts.
+    
+    Parts are addressed by their zip member name (e.g. 'word/endnotes.xml').
+    
+    Editing model:
+    - get_tree(name) parses a part once and caches the tree. Callers that
+      modify the tree must call mark_dirty(name) so it is serialized on save.
+    - set_part(name, data) replaces a part's content outright (used by the
+      string-level rewriters). This invalidates any tree handed out for it.
+    - read_part(name) always returns the current content, serializing a
+      dirty tree first if needed.
+    
+    Usage:
+        package = DocxPackage(uploaded_file)
+        tree = package.get_tree('word/endnotes.xml')
+        ...  # edit tree
+        package.mark_dirty('word/endnotes.xml')
+        buffer = package.save()
+    """
+    
+    def __init__(self, source: Union[str, bytes, BytesIO]):
+        """
+        Load a package from a file path, raw bytes, or a file-like object.
+        
+        Only the zip directory is read here; part contents are decompressed
+        on first access.
+        """
+        if isinstance(source, (bytes, bytearray)):
+            data = bytes(source)
+        elif hasattr(source, 'read'):
+            if hasattr(source, 'seek'):
+                source.seek(0)
+            data = source.read()
+        else:
+            with open(source, 'rb') as f:
+                data = f.read()
+        
+        self._data = data
+        self._zip = zipfile.ZipFile(BytesIO(data), 'r')
+        self._members: Dict[str, zipfile.ZipInfo] = {
+            info.filename: info for info in self._zip.infolist()
+        }
+        
+        # Parsed trees and replacement bytes for parts that have been touched
+        self._trees: Dict[str, ET.ElementTree] = {}
+        self._replaced: Dict[str, bytes] = {}
+        self._dirty: Set[str] = set()
+    
+    # -------------------------------------------------------------------------
+    # Part access
+    # -------------------------------------------------------------------------
+    
+    def has_part(self, name: str) -> bool:
+        """Check whether the package contains a part."""
+        return name in self._replaced or name in self._members
+    
+    def part_names(self) -> List[str]:
+        """Names of all parts, in archive order."""
+        names = list(self._members)
+        names.extend(name for name in self._replaced if name not in self._members)
+        return names
+    
+    def read_part(self, name: str) -> bytes:
+        """
+        Return the current content of a part.
+        
+        Raises:
+            KeyError: if the part doesn't exist
+        """
+        if name in self._dirty and name in self._trees:
+            self._replaced[name] = self._serialize(self._trees[name])
+            self._dirty.discard(name)
+        
+        if name in self._replaced:
+            return self._replaced[name]
+        
+        return self._zip.read(self._members[name])
+    
+    def read_text(self, name: str, encoding: str = 'utf-8') -> str:
+        """Return the current content of a part as text."""
+        return self.read_part(name).decode(encoding)
+    
+    def get_tree(self, name: str) -> Optional[ET.ElementTree]:
+        """
+        Parse a part into an ElementTree (cached).
+        
+        Register any namespaces with ET.register_namespace() before calling
+        save() so prefixes are written back unchanged.
+        
+        Returns:
+            The parsed tree, or None if the part doesn't exist
+        """
+        if name in self._trees:
+            return self._trees[name]
+        
+        if not self.has_part(name):
+            return None
+        
+        tree = ET.ElementTree(ET.fromstring(self.read_part(name)))
+        self._trees[name] = tree
+        return tree
+    
+    def iterparse(
+        self,
+        name: str,
+        events: Sequence[str] = ('end',)
+    ) -> Iterator[Tuple[str, ET.Element]]:
+        """
+        Parse a part incrementally, yielding (event, element) like ET.iterparse.
+        
+        The part is decompressed and parsed in one streaming pass. Elements
+        are left in place, and once the iteration completes the tree is
+        cached exactly as get_tree() would have parsed it, so reading a part
+        and then editing it costs a single parse. A part that already has a
+        tree is replayed from it. Abandoning the iteration early caches nothing.
+        
+        Args:
+            name: Part name (e.g. 'word/document.xml')
+            events: Any of 'start' and 'end'
+        """
+        if name in self._trees:
+            yield from self._replay(self._trees[name].getroot(), events)
+            return
+        
+        if not self.has_part(name):
+            return
+        
+        if name in self._replaced:
+            source = BytesIO(self._replaced[name])
+        else:
+            source = self._zip.open(self._members[name])
+        
+        with source:
+            parser = ET.iterparse(source, events=events)
+            yield from parser
+            self._trees[name] = ET.ElementTree(parser.root)
+    
+    @classmethod
+    def _replay(cls, element: ET.Element, events: Sequence[str]) -> Iterator[Tuple[str, ET.Element]]:
+        """iterparse events for an already parsed element, in document order."""
+        if 'start' in events:
+            yield 'start', element
+        for child in element:
+            yield from cls._replay(child, events)
+        if 'end' in events:
+            yield 'end', element
+    
+    def mark_dirty(self, name: str) -> None:
+        """Flag a tree returned by get_tree() as modified."""
+        if name in self._trees:
+            self._dirty.add(name)
+    
+    def set_part(self, name: str, data: Union[str, bytes]) -> None:
+        """
+        Replace the content of a part (or add a new one).
+        
+        Any cached tree for the part is discarded.
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        
+        self._replaced[name] = data
+        self._trees.pop(name, None)
+        self._dirty.discard(name)
+    
+    # -------------------------------------------------------------------------
+    # Saving
+    # -------------------------------------------------------------------------
+    
+    def save(self, target: Union[str, BytesIO, None] = None) -> Optional[BytesIO]:
+        """
+        Write the package as a .docx.
+        
+        Edited parts are compressed afresh; everything else is copied raw
+        from the source archive.
+        
+        Args:
+            target: Optional output path or writable buffer. When omitted a
+                    new BytesIO is created.
+        
+        Returns:
+            BytesIO positioned at 0 (the target itself if it was a buffer),
+            or None when writing to a path
+        """
+        for name in list(self._dirty):
+            self._replaced[name] = self._serialize(self._trees[name])
+            self._dirty.discard(name)
+        
+        if isinstance(target, (str, os.PathLike)):
+            with open(target, 'wb') as f:
+                self._write_zip(f)
+            return None
+        
+        buffer = target if target is not None else BytesIO()
+        self._write_zip(buffer)
+        buffer.seek(0)
+        return buffer
+    
+    def to_bytes(self) -> bytes:
+        """Write the package and return the .docx bytes."""
+        return self.save().getvalue()
+    
+    def close(self) -> None:
+        """Release the in-memory archive and cached parts."""
+        self._zip.close()
+        self._trees.clear()
+        self._replaced.clear()
+        self._dirty.clear()
+    
+    def _write_zip(self, fileobj) -> None:
+        """Write all parts to fileobj, keeping the original member order."""
+        with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED) as out:
+            for name, info in self._members.items():
+                if name in self._replaced:
+                    out.writestr(self._edited_info(info), self._replaced[name])
+                else:
+                    self._copy_raw(info, out)
+            
+            for name, data in self._replaced.items():
+                if name not in self._members:
+                    out.writestr(name, data)
+    
+    @staticmethod
+    def _edited_info(info: zipfile.ZipInfo) -> zipfile.ZipInfo:
+        """Fresh ZipInfo for a rewritten member, keeping its name and attributes."""
+        new_info = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+        new_info.compress_type = zipfile.ZIP_DEFLATED
+        new_info.external_attr = info.external_attr
+        new_info.create_system = info.create_system
+        return new_info
+    
+    def _copy_raw(self, info: zipfile.ZipInfo, out: zipfile.ZipFile) -> None:
+        """
+        Copy a member's compressed bytes straight into the output archive.
+        
+        zipfile has no public API for this, so the local header is rebuilt
+        from the (already validated) central directory entry and the stored
+        data is appended as-is. CRC and sizes are unchanged.
+        
+        ZIP64 and encrypted members, unknown compression methods, and
+        zipfile versions without the internals used here are decompressed
+        and rewritten through writestr() instead.
+        """
+        raw = self._raw_data(info, out)
+        if raw is None:
+            out.writestr(self._edited_info(info), self._zip.read(info))
+            return
+        
+        new_info = copy.copy(info)
+        # Sizes and CRC go in the header, so no trailing data descriptor
+        new_info.flag_bits &= ~_FLAG_DATA_DESCRIPTOR
+        new_info.header_offset = out.fp.tell()
+        
+        out.fp.write(new_info.FileHeader())
+        out.fp.write(raw)
+        out.start_dir = out.fp.tell()
+        out.filelist.append(new_info)
+        out.NameToInfo[new_info.filename] = new_info
+    
+    def _raw_data(self, info: zipfile.ZipInfo, out: zipfile.ZipFile) -> Optional[bytes]:
+        """A member's compressed bytes, or None if it can't be copied raw."""
+        if not all(hasattr(out, attr) for attr in _RAW_COPY_ATTRS):
+            return None
+        if not hasattr(info, 'FileHeader'):
+            return None
+        if info.flag_bits & _FLAG_ENCRYPTED:
+            return None
+        if info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            return None
+        if max(info.file_size, info.compress_size, info.header_offset, out.fp.tell()) >= _ZIP64_LIMIT:
+            return None
+        if _has_extra(info.extra, _ZIP64_EXTRA_ID):
+            return None
+        
+        # Locate the compressed data after the source local header
+        header = self._data[info.header_offset:info.header_offset + _LOCAL_HEADER_SIZE]
+        if len(header) < _LOCAL_HEADER_SIZE or not header.startswith(_LOCAL_HEADER_SIGNATURE):
+            return None
+        name_len, extra_len = struct.unpack(
+            '<HH', header[_LOCAL_HEADER_NAME_LENGTHS:_LOCAL_HEADER_SIZE]
+        )
+        start = info.header_offset + _LOCAL_HEADER_SIZE + name_len + extra_len
+        raw = self._data[start:start + info.compress_size]
+        if len(raw) != info.compress_size:
+            return None
+        return raw
+    
+    @staticmethod
+    def _serialize(tree: ET.ElementTree) -> bytes:
+        """Serialize a part tree with an XML declaration, as Word writes it."""
+        buffer = BytesIO()
+        tree.write(buffer, encoding='UTF-8', xml_declaration=True)
+        return buffer.getvalue()
@@ -3,15 +3,63 @@ citeflex/engines/base.py
 
 Abstract base class for all search engines.
 Each engine must implement the search() method.
+
+Version History:
+    2026-10-16: get_by_id() overrides are wrapped with the shared metadata cache
+                (transient failures are not negative-cached)
+    2026-10-16: Engines share one pooled HTTP session (engines/http_client.py);
+                per-engine headers live in self.headers
+    2026-10-16: Added async asearch()/asearch_multiple()/aget_by_id() counterparts
+    2026-10-16: _make_request() goes through the per-host rate limiter and circuit breaker
+                (see engines/orchestrator.py for race/fan-out helpers)
 """
 
-import time
+import functools
 from abc import ABC, abstractmethod
 from typing import Optional, List
 import requests
 
 from models import CitationMetadata, CitationType
 from config import DEFAULT_HEADERS, DEFAULT_TIMEOUT
+from metadata_cache import get_cache, normalize_identifier, ttl_for
+from engines import http_client
+
+
+def _cached_get_by_id(get_by_id):
+    """
+    Wrap an engine's get_by_id() with the metadata cache.
+    
+    Keyed on (engine name, normalized identifier); hits are cached with the
+    engine's TTL, misses with the negative TTL - unless the lookup was cut
+    short (timeout, open circuit, rate limit, request error), in which case
+    nothing is cached.
+    """
+    if getattr(get_by_id, '_metadata_cached', False):
+        return get_by_id
+    
+    @functools.wraps(get_by_id)
+    def wrapper(self, identifier, *args, **kwargs):
+        if args or kwargs or not identifier:
+            return get_by_id(self, identifier, *args, **kwargs)
+        
+        cache = get_cache()
+        namespace = f"id:{self.name}"
+        key = normalize_identifier(identifier)
+        
+        hit, cached = cache.get(namespace, key)
+        if hit:
+            return cached
+        
+        from engines.orchestrator import trace_lookups
+        
+        with trace_lookups() as trace:
+            result = get_by_id(self, identifier)
+        if result is not None or not trace.incomplete:
+            cache.set(namespace, key, result, ttl_for(self.name))
+        return result
+    
+    wrapper._metadata_cached = True
+    return wrapper
 
 
 class SearchEngine(ABC):
@@ -24,6 +72,12 @@ class SearchEngine(ABC):
     Engines may optionally implement:
     - search_multiple(query, limit) -> List[CitationMetadata]
     - get_by_id(id) -> CitationMetadata (for DOI, PMID, ISBN lookup)
+    
+    get_by_id() overrides are cached automatically (see metadata_cache).
+    
+    Every engine also has async counterparts (asearch, asearch_multiple,
+    aget_by_id). The defaults run the blocking method on the shared engine
+    I/O pool; an engine with a native async client can override them.
     """
     
     # Override in subclasses
@@ -31,21 +85,24 @@ class SearchEngine(ABC):
     base_url: str = ""
     
     # Rate limit retry settings
-    MAX_RETRIES = 2
-    RETRY_DELAY_BASE = 2  # Base delay in seconds for exponential backoff
+    MAX_RETRIES = http_client.MAX_RETRIES
+    RETRY_DELAY_BASE = http_client.RETRY_DELAY_BASE  # Base delay in seconds for exponential backoff
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if 'get_by_id' in cls.__dict__:
+            cls.get_by_id = _cached_get_by_id(cls.__dict__['get_by_id'])
     
     def __init__(self, api_key: Optional[str] = None, timeout: int = DEFAULT_TIMEOUT):
         self.api_key = api_key
         self.timeout = timeout
-        self._session = None
+        # Default headers for this engine's requests (subclasses may update)
+        self.headers = dict(DEFAULT_HEADERS)
     
     @property
     def session(self) -> requests.Session:
-        """Lazy-loaded requests session with default headers."""
-        if self._session is None:
-            self._session = requests.Session()
-            self._session.headers.update(DEFAULT_HEADERS)
-        return self._session
+        """The process-wide pooled session (shared by all engines)."""
+        return http_client.get_session()
     
     @abstractmethod
     def search(self, query: str) -> Optional[CitationMetadata]:
@@ -88,6 +145,21 @@ class SearchEngine(ABC):
         """
         return None
     
+    async def asearch(self, query: str) -> Optional[CitationMetadata]:
+        """Async search(); runs the blocking lookup on the engine I/O pool."""
+        from engines.orchestrator import run_blocking
+        return await run_blocking(self.search, query)
+    
+    async def asearch_multiple(self, query: str, limit: int = 5) -> List[CitationMetadata]:
+        """Async search_multiple()."""
+        from engines.orchestrator import run_blocking
+        return await run_blocking(self.search_multiple, query, limit)
+    
+    async def aget_by_id(self, identifier: str) -> Optional[CitationMetadata]:
+        """Async get_by_id() (goes through the metadata cache like the sync call)."""
+        from engines.orchestrator import run_blocking
+        return await run_blocking(self.get_by_id, identifier)
+    
     def _make_request(
         self,
         url: str,
@@ -97,52 +169,34 @@ class SearchEngine(ABC):
         retry_count: int = 0
     ) -> Optional[requests.Response]:
         """
-        Make an HTTP request with error handling and rate limit retry.
+        Make an HTTP request with error handling and rate limiting.
         
-        Implements exponential backoff for 429 (Too Many Requests) responses.
+        Requests are throttled per upstream host and skipped while the host's
+        circuit is open (see http_client.send / rate_limit.py).
         
         Returns:
             Response object if successful, None on error
         """
         try:
-            merged_headers = dict(DEFAULT_HEADERS)
+            merged_headers = dict(self.headers)
             if headers:
                 merged_headers.update(headers)
             
-            if method.upper() == "GET":
-                response = self.session.get(
-                    url,
-                    params=params,
-                    headers=merged_headers,
-                    timeout=self.timeout
-                )
-            else:
-                response = self.session.post(
-                    url,
-                    json=params,
-                    headers=merged_headers,
-                    timeout=self.timeout
-                )
+            request_args = {'params': params} if method.upper() == "GET" else {'json': params}
+            response = http_client.send(
+                method.upper(),
+                url,
+                label=self.name,
+                max_retries=max(self.MAX_RETRIES - retry_count, 0),
+                retry_delay_base=self.RETRY_DELAY_BASE,
+                timeout=self.timeout,
+                headers=merged_headers,
+                **request_args
+            )
             
-            # Handle rate limiting with exponential backoff
             if response.status_code == 429:
-                if retry_count < self.MAX_RETRIES:
-                    # Get retry delay from header or use exponential backoff
-                    retry_after = response.headers.get('Retry-After')
-                    if retry_after:
-                        try:
-                            delay = int(retry_after)
-                        except ValueError:
-                            delay = self.RETRY_DELAY_BASE * (2 ** retry_count)
-                    else:
-                        delay = self.RETRY_DELAY_BASE * (2 ** retry_count)
-                    
-                    print(f"[{self.name}] Rate limited. Retrying in {delay}s (attempt {retry_count + 1}/{self.MAX_RETRIES})...")
-                    time.sleep(delay)
-                    return self._make_request(url, params, headers, method, retry_count + 1)
-                else:
-                    print(f"[{self.name}] Rate limit exceeded after {self.MAX_RETRIES} retries")
-                    return None
+                print(f"[{self.name}] Rate limit exceeded")
+                return None
             
             response.raise_for_status()
             return response
@@ -20,6 +20,7 @@ API Key:
 
 Version History:
     2025-12-09: Initial creation for fast URL lookup
+    2026-10-16: Requests go through the shared pooled HTTP client
 """
 
 import os
@@ -30,6 +31,7 @@ from urllib.parse import urlparse, quote_plus
 from datetime import datetime
 
 from models import CitationMetadata, CitationType
+from engines.http_client import http_get
 
 
 # =============================================================================
@@ -115,7 +117,7 @@ def brave_search(query: str, api_key: str = None, count: int = 5) -> List[Dict[s
     }
     
     try:
-        response = requests.get(
+        response = http_get(
             BRAVE_SEARCH_URL,
             headers=headers,
             params=params,
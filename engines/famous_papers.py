@@ -0,0 +1,324 @@
+"""
+citeflex/engines/famous_papers.py
+
+Offline index of highly cited works.
+
+A handful of papers (Watson & Crick, Lowry, Bradford, Kaplan-Meier...) are
+cited constantly. Resolving them from a local table skips the network
+cascade entirely and avoids the fuzzy-match mistakes the search APIs make
+on short, generic titles.
+
+The table (config.FAMOUS_PAPERS_PATH) is a tab-separated file, one work per
+line:
+
+    doi  year  title  authors (';'-separated)  journal  volume  issue  pages
+
+It is memory-mapped on first lookup and only the token index is built in
+memory; rows are decoded from the map when a candidate needs checking.
+
+Lookup:
+1. The query is folded (accents, case) and split into content tokens
+2. Tokens not in the vocabulary are mapped to their closest vocabulary
+   token through a trigram index (tolerates typos and OCR damage)
+3. Candidates are gathered from the inverted index on title words and
+   author surnames, best overlap first
+4. A candidate is accepted only if the query covers (nearly) the whole
+   title, or names its first authors, its year and at least one title or
+   journal word ("Bandura 1977" alone fits several papers) - a famous paper
+   is returned as-is, so false positives are worse than misses
+
+Rebuild the table from a Crossref or OpenAlex dump with
+scripts/build_famous_papers.py.
+
+Usage:
+    from engines.famous_papers import find_famous_paper
+    famous = find_famous_paper("Watson & Crick 1953, Molecular structure of nucleic acids")
+    if famous:
+        metadata = CitationMetadata(citation_type=CitationType.JOURNAL, **famous)
+
+Created: 2026-10-16
+"""
+
+import re
+import mmap
+import time
+import threading
+import unicodedata
+from array import array
+from collections import Counter
+from typing import Dict, List, Optional, Set
+
+from config import FAMOUS_PAPERS_PATH
+
+
+# Column order of the on-disk table
+COLUMNS = ('doi', 'year', 'title', 'authors', 'journal', 'volume', 'issue', 'pages')
+AUTHOR_SEPARATOR = '; '
+
+# Share of the title's content words the query must contain
+MIN_TITLE_COVERAGE = 0.8
+
+# Titles this short ("Deep learning", "Long short-term memory") are too
+# generic on their own: the query must also name an author or consist mostly
+# of the paper's own words
+SHORT_TITLE_TOKENS = 4
+MIN_QUERY_COVERAGE = 0.75
+
+# Closest-vocabulary-token matching for words not in the index
+FUZZY_MIN_LENGTH = 5
+FUZZY_MIN_SIMILARITY = 0.5
+
+# Candidates verified per lookup (best token overlap first)
+MAX_CANDIDATES = 5
+
+STOPWORDS = frozenset(
+    'a an and the of in on for to with from by at as via its is are or into '
+    'under during et al vs their this that using'.split()
+)
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+_YEAR = re.compile(r'\b(1[5-9]\d{2}|20\d{2})\b')
+
+
+# =============================================================================
+# TEXT HELPERS
+# =============================================================================
+
+def _fold(text: str) -> str:
+    """Lowercase and strip accents ("Schmidhüber" -> "schmidhuber")."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def _tokens(text: str) -> List[str]:
+    """Content words of a string (no stopwords, initials, or bare numbers)."""
+    return [
+        t for t in _TOKEN.findall(_fold(text))
+        if len(t) > 1 and t not in STOPWORDS and not t.isdigit()
+    ]
+
+
+def _surname(author: str) -> str:
+    """Family name of a "Given Family" author string."""
+    tokens = _tokens(author)
+    return tokens[-1] if tokens else ''
+
+
+def _trigrams(token: str) -> Set[str]:
+    padded = f' {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# =============================================================================
+# INDEX
+# =============================================================================
+
+class FamousPapersIndex:
+    """
+    Memory-mapped table of famous papers with a token/trigram inverted index.
+    
+    The file is opened and indexed on first lookup (a few milliseconds per
+    thousand rows); lookups after that are pure in-memory set arithmetic.
+    """
+    
+    def __init__(self, path: str = FAMOUS_PAPERS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._map: Optional[mmap.mmap] = None
+        
+        # Byte offset of each row in the map; row id = position in this array
+        self._offsets = array('Q')
+        
+        # token -> row ids, for title words and for author surnames
+        self._title_postings: Dict[str, array] = {}
+        self._author_postings: Dict[str, array] = {}
+        
+        # trigram -> vocabulary tokens containing it (fuzzy token matching)
+        self._trigram_postings: Dict[str, Set[str]] = {}
+    
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._offsets)
+    
+    # -------------------------------------------------------------------------
+    # Loading
+    # -------------------------------------------------------------------------
+    
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+    
+    def _load(self) -> None:
+        start = time.perf_counter()
+        try:
+            with open(self.path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            # ValueError: mmap of an empty file
+            print(f"[FamousPapers] Table unavailable ({e}). Famous paper lookup disabled.")
+            return
+        
+        offset = 0
+        while True:
+            line = self._map.readline()
+            if not line:
+                break
+            if not line.startswith(b'#') and line.strip():
+                row = self._parse(line)
+                if row and row['doi'] and row['title']:
+                    self._add(len(self._offsets), row)
+                    self._offsets.append(offset)
+            offset += len(line)
+        
+        for token in set(self._title_postings) | set(self._author_postings):
+            if len(token) >= FUZZY_MIN_LENGTH:
+                for trigram in _trigrams(token):
+                    self._trigram_postings.setdefault(trigram, set()).add(token)
+        
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"[FamousPapers] Indexed {len(self._offsets)} papers in {elapsed:.0f}ms")
+    
+    def _add(self, row_id: int, row: dict) -> None:
+        for token in set(_tokens(row['title'])):
+            self._title_postings.setdefault(token, array('I')).append(row_id)
+        for author in row['authors'][:3]:
+            surname = _surname(author)
+            if surname:
+                self._author_postings.setdefault(surname, array('I')).append(row_id)
+    
+    @staticmethod
+    def _parse(line: bytes) -> Optional[dict]:
+        fields = line.decode('utf-8', errors='replace').rstrip('\r\n').split('\t')
+        if len(fields) < 3:
+            return None
+        fields += [''] * (len(COLUMNS) - len(fields))
+        row = dict(zip(COLUMNS, (field.strip() for field in fields)))
+        row['authors'] = [a.strip() for a in row['authors'].split(';') if a.strip()]
+        return row
+    
+    def _row(self, row_id: int) -> Optional[dict]:
+        # Slice rather than seek/readline: the map is shared between threads
+        start = self._offsets[row_id]
+        end = self._map.find(b'\n', start)
+        return self._parse(self._map[start:end if end >= 0 else len(self._map)])
+    
+    # -------------------------------------------------------------------------
+    # Lookup
+    # -------------------------------------------------------------------------
+    
+    def _resolve(self, token: str) -> Optional[str]:
+        """Map a query token to itself or its closest vocabulary token."""
+        if token in self._title_postings or token in self._author_postings:
+            return token
+        if len(token) < FUZZY_MIN_LENGTH:
+            return None
+        
+        query_trigrams = _trigrams(token)
+        shared = Counter()
+        for trigram in query_trigrams:
+            shared.update(self._trigram_postings.get(trigram, ()))
+        
+        best, best_score = None, FUZZY_MIN_SIMILARITY
+        for candidate, count in shared.items():
+            score = count / (len(query_trigrams) + len(_trigrams(candidate)) - count)
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+    
+    def lookup(self, query: str) -> Optional[dict]:
+        """
+        Find the famous paper a citation query refers to.
+        
+        Returns:
+            Dict of CitationMetadata fields (title, authors, year, journal,
+            volume, issue, pages, doi), or None if no paper matches confidently
+        """
+        self._ensure_loaded()
+        if not self._offsets or not query:
+            return None
+        
+        # Unknown words stay in the set: they count against query coverage
+        words = {self._resolve(t) or t for t in _tokens(query)}
+        if not words:
+            return None
+        
+        overlap = Counter()
+        for word in words:
+            overlap.update(self._title_postings.get(word, ()))
+            overlap.update(self._author_postings.get(word, ()))
+        
+        years = set(_YEAR.findall(query))
+        for row_id, _ in overlap.most_common(MAX_CANDIDATES):
+            row = self._row(row_id)
+            if row and self._matches(row, words, years):
+                return {field: row[field] for field in COLUMNS}
+        return None
+    
+    @staticmethod
+    def _matches(row: dict, words: Set[str], years: Set[str]) -> bool:
+        """Whether a candidate row is confidently the paper the query cites."""
+        if years and row['year'] and row['year'] not in years:
+            return False
+        
+        title_words = set(_tokens(row['title']))
+        if not title_words:
+            return False
+        
+        surnames = {_surname(a) for a in row['authors'][:3]} - {''}
+        lead_authors = {_surname(a) for a in row['authors'][:2]} - {''}
+        work_words = title_words | set(_tokens(row['journal']))
+        paper_words = work_words | surnames
+        query_coverage = len(words & paper_words) / len(words)
+        
+        # Title match
+        if len(title_words & words) / len(title_words) >= MIN_TITLE_COVERAGE:
+            if len(title_words) > SHORT_TITLE_TOKENS:
+                return True
+            return bool(surnames & words) or query_coverage >= MIN_QUERY_COVERAGE
+        
+        # Author + year match ("Kahneman & Tversky 1979, Prospect theory"):
+        # an author often has several famous papers in one year, so the query
+        # must also name something of the work itself
+        return (
+            row['year'] in years
+            and bool(lead_authors)
+            and lead_authors <= words
+            and bool((work_words - lead_authors) & words)
+            and query_coverage >= MIN_QUERY_COVERAGE
+        )
+
+
+_index: Optional[FamousPapersIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> FamousPapersIndex:
+    """Return the process-wide index (loaded on first lookup)."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = FamousPapersIndex()
+    return _index
+
+
+def find_famous_paper(query: str) -> Optional[dict]:
+    """
+    Look a citation query up in the famous papers table.
+    
+    Args:
+        query: Free-text citation, title fragment, or "Author Year Title-word"
+    
+    Returns:
+        Dict of CitationMetadata fields including 'doi', or None
+    """
+    try:
+        return get_index().lookup(query)
+    except Exception as e:
+        print(f"[FamousPapers] Lookup error: {e}")
+        return None
@@ -52,7 +52,7 @@ class GenericURLEngine(SearchEngine):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         # Use browser-like headers to avoid being blocked
-        self.session.headers.update({
+        self.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'en-US,en;q=0.5',
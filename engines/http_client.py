@@ -0,0 +1,191 @@
+"""
+citeflex/engines/http_client.py
+
+Process-wide HTTP client shared by every engine and API helper.
+
+Before this, each SearchEngine instance had its own requests.Session and the
+book, Brave, and Claude-router helpers called requests.get() directly, so
+most lookups paid for a fresh TCP + TLS handshake. Everything now goes
+through one Session with:
+
+- Per-host connection pools with keep-alive (sizes in config.HTTP_HOST_POOL_SIZES)
+- gzip/deflate response compression
+- Connect-level retries for stale keep-alive sockets
+- The 429 policy formerly in SearchEngine._make_request (send())
+- Per-host token buckets and circuit breakers (engines/rate_limit.py)
+
+No cookies are kept, so responses for one user's lookup never influence
+another's.
+
+Usage:
+    from engines.http_client import http_get
+    response = http_get(url, params=params, timeout=5)   # drop-in for requests.get
+
+Created: 2026-10-16
+
+Version History:
+    2026-10-16: Requests go through per-host limiters; long 429 backoffs no
+                longer sleep in the worker thread
+    2026-10-16: Refused, failed, 5xx and given-up 429 requests mark the current
+                lookup trace incomplete (see orchestrator.trace_lookups)
+"""
+
+import time
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import (
+    DEFAULT_TIMEOUT,
+    HTTP_POOL_HOSTS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_HOST_POOL_SIZES,
+    RATE_LIMIT_MAX_RETRY_WAIT,
+)
+from engines.rate_limit import limiter_for_url
+from engines.orchestrator import mark_incomplete
+
+
+# Rate limit retry defaults (SearchEngine overrides per engine)
+MAX_RETRIES = 2
+RETRY_DELAY_BASE = 2  # Base delay in seconds for exponential backoff
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def _make_adapter(pool_maxsize: int) -> HTTPAdapter:
+    """Adapter with keep-alive pools and retries for failed connects only."""
+    retries = Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.2, raise_on_status=False)
+    return HTTPAdapter(
+        pool_connections=HTTP_POOL_HOSTS,
+        pool_maxsize=pool_maxsize,
+        max_retries=retries,
+    )
+
+
+def get_session() -> requests.Session:
+    """
+    Return the shared Session, creating it on first use.
+    
+    requests.Session is safe to share between threads for plain requests;
+    the underlying urllib3 pools are thread-safe.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                session.headers['Accept-Encoding'] = 'gzip, deflate'
+                session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+                
+                default_adapter = _make_adapter(HTTP_POOL_MAXSIZE)
+                session.mount('https://', default_adapter)
+                session.mount('http://', default_adapter)
+                
+                # Larger pools for the hosts we hit on nearly every note
+                for host, pool_size in HTTP_HOST_POOL_SIZES.items():
+                    session.mount(f'https://{host}/', _make_adapter(pool_size))
+                
+                _session = session
+    return _session
+
+
+def _retry_delay(response: requests.Response, attempt: int, delay_base: float) -> float:
+    """Delay before retrying a 429: Retry-After if given, else exponential backoff."""
+    retry_after = response.headers.get('Retry-After')
+    if retry_after:
+        try:
+            return int(retry_after)
+        except ValueError:
+            pass
+    return delay_base * (2 ** attempt)
+
+
+def send(
+    method: str,
+    url: str,
+    label: str = "HTTP",
+    max_retries: int = MAX_RETRIES,
+    retry_delay_base: float = RETRY_DELAY_BASE,
+    timeout: float = DEFAULT_TIMEOUT,
+    **kwargs
+) -> requests.Response:
+    """
+    Send a request on the shared session through the host's rate limiter.
+    
+    The limiter throttles proactively and skips hosts whose circuit is open
+    (see engines/rate_limit.py). A 429 pauses the host's bucket for its
+    Retry-After; the request is only retried in-line when that wait is short
+    (RATE_LIMIT_MAX_RETRY_WAIT), otherwise the 429 is returned at once
+    rather than parking the worker thread.
+    
+    Args:
+        method: HTTP method
+        url: Request URL
+        label: Prefix for log messages (usually the engine name)
+        max_retries: How many times to retry a 429
+        retry_delay_base: Base delay for exponential backoff
+        timeout: Request timeout in seconds (also bounds the wait for a
+                 rate limit slot)
+        **kwargs: Passed to requests.Session.request (params, json, headers...)
+    
+    Returns:
+        The final response (which may still be a 429)
+    
+    Raises:
+        requests.RequestException on connection errors and timeouts;
+        CircuitOpenError / RateLimitedError (both RequestException
+        subclasses) when the limiter refuses the request
+    """
+    session = get_session()
+    limiter = limiter_for_url(url)
+    
+    for attempt in range(max_retries + 1):
+        try:
+            limiter.acquire(max_wait=timeout)
+        except requests.RequestException as e:
+            mark_incomplete(f"{label}: {e}")
+            raise
+        
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except requests.RequestException as e:
+            limiter.record_failure()
+            mark_incomplete(f"{label}: {type(e).__name__}")
+            raise
+        
+        if response.status_code >= 500:
+            limiter.record_failure()
+            mark_incomplete(f"{label}: HTTP {response.status_code}")
+            return response
+        if response.status_code != 429:
+            limiter.record_success()
+            return response
+        
+        limiter.record_failure()
+        delay = _retry_delay(response, attempt, retry_delay_base)
+        limiter.pause(delay)
+        if attempt == max_retries or delay > RATE_LIMIT_MAX_RETRY_WAIT:
+            print(f"[{label}] Rate limited (retry after {delay}s), giving up on this request")
+            mark_incomplete(f"{label}: HTTP 429")
+            return response
+        print(f"[{label}] Rate limited. Retrying in {delay}s (attempt {attempt + 1}/{max_retries})...")
+        if limiter.bucket is None:
+            time.sleep(delay)  # No bucket to hold the retry back until the pause ends
+    
+    return response
+
+
+def http_get(url: str, timeout: float = DEFAULT_TIMEOUT, **kwargs) -> requests.Response:
+    """Drop-in replacement for requests.get() using the shared pools and rate limiting."""
+    return send('GET', url, timeout=timeout, **kwargs)
+
+
+def http_post(url: str, timeout: float = DEFAULT_TIMEOUT, **kwargs) -> requests.Response:
+    """Drop-in replacement for requests.post() using the shared pools and rate limiting."""
+    return send('POST', url, timeout=timeout, **kwargs)
@@ -0,0 +1,291 @@
+"""
+citeflex/engines/orchestrator.py
+
+Asyncio fan-out and race helpers for engine lookups.
+
+Engines are still built on blocking `requests` calls, so their async methods
+(SearchEngine.asearch / aget_by_id) run the blocking call on one shared,
+bounded I/O thread pool instead of each call site spinning up its own
+ThreadPoolExecutor. On top of that this module provides:
+
+- race():    run lookups concurrently, return the first acceptable result
+             (optionally the highest-priority acceptable one) and cancel the rest
+- fan_out(): run lookups concurrently, collect everything that finishes
+             within a deadline and cancel the stragglers
+- run_sync(): drive a coroutine from synchronous code (Flask request threads)
+- run_stage(): like run_blocking(), but on a separate pool for composite
+               stages that fan out to the I/O pool themselves
+- trace_lookups(): note whether anything under a lookup timed out, was
+                   skipped by the rate limiter or failed, so a miss caused
+                   by a transient problem isn't negative-cached
+
+Cancellation drops lookups that are still queued for the pool; a request
+already on the wire finishes in its worker thread and its result is ignored.
+
+Usage:
+    from engines.orchestrator import race_engines, run_sync
+    
+    winner = run_sync(race_engines(
+        [crossref, openalex, pubmed], query,
+        accept=lambda r: r and r.has_minimum_data(),
+        timeout=8,
+    ))
+    if winner:
+        print(winner.label, winner.value.title)
+
+Created: 2026-10-16
+"""
+
+import asyncio
+import functools
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+
+# Threads available for blocking engine I/O across the whole process
+ENGINE_IO_WORKERS = 32
+
+# Threads for composite stages (whole routing cascades) that themselves fan
+# out to the I/O pool; kept separate so stages can't starve their own lookups
+STAGE_WORKERS = 16
+
+_io_executor = ThreadPoolExecutor(max_workers=ENGINE_IO_WORKERS, thread_name_prefix="engine-io")
+_stage_executor = ThreadPoolExecutor(max_workers=STAGE_WORKERS, thread_name_prefix="route-stage")
+
+# A lookup: (label, awaitable) pairs or a {label: awaitable} dict
+Lookups = Union[Sequence[Tuple[str, Awaitable]], Dict[str, Awaitable]]
+
+
+@dataclass
+class RaceResult:
+    """Winning lookup from race()."""
+    label: str
+    value: Any
+
+
+class LookupTrace:
+    """Whether any lookup under trace_lookups() ended without a real answer."""
+    
+    def __init__(self, parent: Optional['LookupTrace'] = None):
+        self.parent = parent
+        self.incomplete = False
+        self.reason = ''
+
+
+_trace: contextvars.ContextVar[Optional[LookupTrace]] = contextvars.ContextVar('lookup_trace', default=None)
+
+
+@contextmanager
+def trace_lookups() -> Iterator[LookupTrace]:
+    """
+    Record transient failures for the lookups made inside the block.
+    
+    The trace follows the lookup into run_blocking()/run_stage() threads and
+    asyncio tasks (and plain pools via carry_context()). Nested traces also
+    mark their parent.
+    
+    Usage:
+        with trace_lookups() as trace:
+            result = lookup()
+        if result is not None or not trace.incomplete:
+            cache.set(...)
+    """
+    trace = LookupTrace(_trace.get())
+    token = _trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _trace.reset(token)
+
+
+def mark_incomplete(reason: str) -> None:
+    """Note that a lookup timed out, was skipped or failed (no-op outside a trace)."""
+    trace = _trace.get()
+    while trace is not None and not trace.incomplete:
+        trace.incomplete = True
+        trace.reason = reason
+        trace = trace.parent
+
+
+def carry_context(func: Callable) -> Callable:
+    """Bind func to a copy of the caller's context, for submitting to a plain thread pool."""
+    return functools.partial(contextvars.copy_context().run, func)
+
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking callable on the shared engine I/O pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_executor, functools.partial(carry_context(func), *args, **kwargs))
+
+
+async def run_stage(func: Callable, *args, **kwargs) -> Any:
+    """
+    Run a blocking composite stage (e.g. a whole routing branch) off the loop.
+    
+    Use this instead of run_blocking() for work that may itself call
+    run_sync()/run_blocking(), so nested fan-outs never wait on a pool their
+    parent is occupying.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_stage_executor, functools.partial(carry_context(func), *args, **kwargs))
+
+
+def _as_tasks(lookups: Lookups) -> List[Tuple[str, asyncio.Task]]:
+    """Schedule every awaitable as a task, keeping labels and order."""
+    items = lookups.items() if isinstance(lookups, dict) else lookups
+    return [(label, asyncio.ensure_future(awaitable)) for label, awaitable in items]
+
+
+async def _cancel(tasks: List[asyncio.Task]) -> None:
+    """Cancel unfinished tasks and let them unwind."""
+    pending = [task for task in tasks if not task.done()]
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+def _task_value(label: str, task: asyncio.Task) -> Any:
+    """Result of a finished task; failures are logged and count as no result."""
+    if task.cancelled():
+        return None
+    error = task.exception()
+    if error is not None:
+        print(f"[Orchestrator] {label} error: {error}")
+        mark_incomplete(f"{label} error")
+        return None
+    return task.result()
+
+
+async def race(
+    lookups: Lookups,
+    accept: Optional[Callable[[Any], bool]] = None,
+    timeout: Optional[float] = None,
+    ordered: bool = False
+) -> Optional[RaceResult]:
+    """
+    Run lookups concurrently and return the first acceptable result.
+    
+    Args:
+        lookups: (label, awaitable) pairs in priority order, or a dict
+        accept: Predicate a result must pass (default: truthy)
+        timeout: Overall deadline in seconds (None = wait for all)
+        ordered: If True, a result only wins once every higher-priority
+                 lookup has finished without an acceptable result, so the
+                 outcome matches trying them one by one - just faster
+    
+    Returns:
+        RaceResult for the winner, or None if nothing acceptable arrived
+        before the deadline. All other lookups are cancelled.
+    """
+    accept = accept or bool
+    tasks = _as_tasks(lookups)
+    if not tasks:
+        return None
+    
+    labels = {task: label for label, task in tasks}
+    ordered_tasks = [task for _, task in tasks]
+    accepted: Dict[asyncio.Task, Any] = {}
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout if timeout is not None else None
+    
+    try:
+        pending = set(ordered_tasks)
+        while pending:
+            remaining = None if deadline is None else max(deadline - loop.time(), 0)
+            if remaining == 0:
+                print(f"[Orchestrator] Race timed out after {timeout}s")
+                mark_incomplete("race timed out")
+                break
+            
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            
+            for task in done:
+                value = _task_value(labels[task], task)
+                try:
+                    if accept(value):
+                        accepted[task] = value
+                except Exception as e:
+                    print(f"[Orchestrator] {labels[task]} rejected: {e}")
+            
+            # Walk the priority list: the first task still running blocks a
+            # lower-priority winner in ordered mode
+            for task in ordered_tasks:
+                if task in accepted:
+                    return RaceResult(labels[task], accepted[task])
+                if ordered and not task.done():
+                    break
+        
+        # Deadline hit: settle for the best acceptable result we have
+        for task in ordered_tasks:
+            if task in accepted:
+                return RaceResult(labels[task], accepted[task])
+        return None
+    
+    finally:
+        await _cancel(ordered_tasks)
+
+
+async def fan_out(lookups: Lookups, timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Run lookups concurrently and collect whatever finishes in time.
+    
+    Args:
+        lookups: (label, awaitable) pairs or a dict
+        timeout: Overall deadline in seconds (None = wait for all)
+    
+    Returns:
+        Dict of label -> result (None if the lookup raised) for lookups that
+        completed, in the order they were given. Stragglers are cancelled.
+    """
+    tasks = _as_tasks(lookups)
+    if not tasks:
+        return {}
+    
+    done, pending = await asyncio.wait([task for _, task in tasks], timeout=timeout)
+    if pending:
+        print(f"[Orchestrator] {len(pending)} lookup(s) still running after {timeout}s, cancelling")
+        mark_incomplete("fan-out timed out")
+    await _cancel(list(pending))
+    
+    return {
+        label: _task_value(label, task)
+        for label, task in tasks
+        if task in done
+    }
+
+
+async def race_engines(
+    engines: Sequence[Any],
+    query: str,
+    accept: Optional[Callable[[Any], bool]] = None,
+    timeout: Optional[float] = None,
+    ordered: bool = False
+) -> Optional[RaceResult]:
+    """race() each engine's asearch(query), labelled by engine name."""
+    return await race(
+        [(engine.name, engine.asearch(query)) for engine in engines],
+        accept=accept,
+        timeout=timeout,
+        ordered=ordered,
+    )
+
+
+def run_sync(coro: Awaitable) -> Any:
+    """
+    Run a coroutine to completion from synchronous code.
+    
+    Each call gets its own short-lived event loop; the blocking work runs on
+    the shared I/O pool, so this is cheap. Must not be called from inside a
+    running event loop - await the coroutine there instead.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    if asyncio.iscoroutine(coro):
+        coro.close()
+    raise RuntimeError("run_sync() called from a running event loop; await the coroutine instead")
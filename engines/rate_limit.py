@@ -0,0 +1,257 @@
+"""
+citeflex/engines/rate_limit.py
+
+Per-upstream rate limiting and circuit breaking for the shared HTTP client.
+
+Every request sent through engines/http_client.send() first asks the
+limiter for its host:
+
+- TokenBucket:    proactive throttling to the upstream's published rate
+                  (config.RATE_LIMITS), so we stop provoking 429s instead of
+                  sleeping after them. A 429 with Retry-After pauses the
+                  bucket for everyone, not just the thread that got it.
+- CircuitBreaker: after CIRCUIT_FAILURE_THRESHOLD consecutive failures the
+                  host is skipped for CIRCUIT_COOLDOWN seconds, so a degraded
+                  upstream fails fast instead of costing its full timeout on
+                  every note. One probe request is let through afterwards to
+                  decide whether to close the circuit.
+
+Both raise subclasses of requests.RequestException, so existing
+`except requests.RequestException` handlers treat a skipped upstream like
+any other failed request.
+
+Limiters are per process (each gunicorn worker throttles on its own).
+Only the upstreams listed in RATE_LIMITS get a limiter of their own; any
+other host (e.g. a site cited by URL) goes through one shared pass-through
+limiter, so the limiter table stays fixed-size and /health never lists
+the sites users cite.
+
+Usage:
+    limiter = limiter_for_url(url)
+    limiter.acquire(max_wait=timeout)      # may raise CircuitOpenError / RateLimitedError
+    ...
+    limiter.record_success()  /  limiter.record_failure()
+
+Created: 2026-10-16
+"""
+
+import time
+import threading
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from config import (
+    RATE_LIMITS,
+    RATE_LIMIT_MAX_WAIT,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_COOLDOWN,
+)
+
+
+class RateLimitedError(requests.RequestException):
+    """No request slot for the host became free within the allowed wait."""
+
+
+class CircuitOpenError(requests.RequestException):
+    """The host's circuit is open; the request was skipped without being sent."""
+
+
+# =============================================================================
+# TOKEN BUCKET
+# =============================================================================
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+    
+    Tokens refill at `rate` per second up to `burst`. acquire() reserves a
+    token immediately (the balance may go negative) and then sleeps until
+    its slot comes up, so waiting threads are served in arrival order
+    without holding the lock.
+    """
+    
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+    
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._updated = now
+    
+    def acquire(self, max_wait: float) -> bool:
+        """
+        Take a token, waiting up to max_wait seconds for one.
+        
+        Returns:
+            True once a token is held, False (without waiting) if none would
+            be available in time
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            
+            wait = max(self._paused_until - now, 0.0)
+            if self._tokens < 1:
+                wait = max(wait, (1 - self._tokens) / self.rate)
+            if wait > max_wait:
+                return False
+            self._tokens -= 1
+        
+        if wait > 0:
+            time.sleep(wait)
+        return True
+    
+    def pause(self, seconds: float) -> None:
+        """Hold back every caller for `seconds` (e.g. an upstream Retry-After)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+# =============================================================================
+# CIRCUIT BREAKER
+# =============================================================================
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+    
+    States:
+        closed    - requests flow; failures are counted
+        open      - requests are rejected until the cooldown has passed
+        half-open - one probe request is allowed; its outcome closes the
+                    circuit or reopens it for another cooldown
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+    
+    def __init__(self, threshold: int = CIRCUIT_FAILURE_THRESHOLD, cooldown: float = CIRCUIT_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+    
+    def allow(self) -> bool:
+        """Whether a request may be sent now (claims the probe when half-open)."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+    
+    def retry_in(self) -> float:
+        """Seconds until an open circuit lets a probe through."""
+        return max(self.cooldown - (time.monotonic() - self._opened_at), 0.0)
+    
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+    
+    def record_failure(self) -> bool:
+        """
+        Count a failure.
+        
+        Returns:
+            True if this failure opened the circuit
+        """
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self.failures >= self.threshold
+            ):
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+
+# =============================================================================
+# PER-HOST LIMITERS
+# =============================================================================
+
+class HostLimiter:
+    """
+    Token bucket (if the host has a configured rate) plus circuit breaker for one host.
+    
+    With circuit=False the breaker never opens (used for the shared limiter
+    of unconfigured hosts, where one dead site must not block the others).
+    """
+    
+    def __init__(self, host: str, rate_limit: Optional[Tuple[float, int]] = None, circuit: bool = True):
+        self.host = host
+        self.bucket = TokenBucket(*rate_limit) if rate_limit else None
+        self.breaker = CircuitBreaker() if circuit else None
+    
+    def acquire(self, max_wait: float = RATE_LIMIT_MAX_WAIT) -> None:
+        """
+        Get permission to send one request to this host.
+        
+        Raises:
+            CircuitOpenError: the host is in its cooldown window
+            RateLimitedError: no token would be free within max_wait
+        """
+        if self.breaker and not self.breaker.allow():
+            raise CircuitOpenError(
+                f"{self.host} circuit open, skipping (retry in {self.breaker.retry_in():.0f}s)"
+            )
+        
+        max_wait = min(max_wait, RATE_LIMIT_MAX_WAIT)
+        if self.bucket and not self.bucket.acquire(max_wait):
+            # Don't leave the circuit stuck half-open with no probe in flight
+            if self.breaker and self.breaker.state == CircuitBreaker.HALF_OPEN:
+                self.breaker.record_failure()
+            raise RateLimitedError(f"{self.host} rate limit reached, no slot within {max_wait}s")
+    
+    def pause(self, seconds: float) -> None:
+        """Apply an upstream Retry-After to every caller of this host."""
+        if self.bucket:
+            self.bucket.pause(seconds)
+    
+    def record_success(self) -> None:
+        if self.breaker:
+            self.breaker.record_success()
+    
+    def record_failure(self) -> None:
+        if self.breaker and self.breaker.record_failure():
+            print(f"[RateLimit] {self.host} failing, circuit open for {self.breaker.cooldown}s")
+    
+    def status(self) -> dict:
+        return {
+            'state': self.breaker.state,
+            'failures': self.breaker.failures,
+            'rate': self.bucket.rate if self.bucket else None,
+        }
+
+
+# One limiter per configured upstream, built up front; everything else shares _default_limiter
+_limiters: Dict[str, HostLimiter] = {host: HostLimiter(host, rate) for host, rate in RATE_LIMITS.items()}
+_default_limiter = HostLimiter('other hosts', circuit=False)
+
+
+def get_limiter(host: str) -> HostLimiter:
+    """Return the process-wide limiter for a host (the shared default if it isn't in RATE_LIMITS)."""
+    return _limiters.get(host.lower(), _default_limiter)
+
+
+def limiter_for_url(url: str) -> HostLimiter:
+    """Return the limiter for a URL's host."""
+    return get_limiter(urlsplit(url).hostname or '')
+
+
+def status() -> Dict[str, dict]:
+    """Breaker state of each configured upstream (for /health)."""
+    return {host: limiter.status() for host, limiter in _limiters.items()}
@@ -4,6 +4,9 @@ citeflex/engines/superlegal.py
 Unified Legal Citation Engine - Merged from court.py + legal.py
 
 Version History:
+    2026-10-16: Dropped the fixed sleeps between CourtListener fallbacks; requests
+                are throttled by engines/rate_limit.py.
+    2026-10-16: CourtListener requests go through the shared pooled HTTP client.
     2025-12-06 17:00: Added year extraction and filtering for CourtListener.
                       Now extracts year (1789-2050) from citation and uses it
                       to prioritize correct case when multiple matches exist.
@@ -36,12 +39,11 @@ Features:
 
 import re
 import difflib
-import requests
-import time
 from typing import Optional, List, Dict
 from urllib.parse import urlparse, unquote
 
 from engines.base import SearchEngine
+from engines.http_client import http_get
 from models import CitationMetadata, CitationType
 from config import COURTLISTENER_API_KEY
 
@@ -576,7 +578,6 @@ class CourtListenerEngine(SearchEngine):
         # 3. Fuzzy search
         fuzzy_query = self._make_fuzzy(smart_query)
         if fuzzy_query != smart_query:
-            time.sleep(0.1)
             results = self._api_request(query, fuzzy_query)
             result = find_best_result(results)
             if result:
@@ -587,7 +588,6 @@ class CourtListenerEngine(SearchEngine):
         if plaintiff and len(plaintiff) > 4:
             common = ['state', 'people', 'united', 'states', 'board', 'city', 'county']
             if plaintiff.lower() not in common:
-                time.sleep(0.1)
                 results = self._api_request(query, plaintiff)
                 for r in results[:10]:
                     if plaintiff.lower() in (r.get('caseName', '') or '').lower():
@@ -618,7 +618,7 @@ class CourtListenerEngine(SearchEngine):
                 'order_by': 'score desc',
                 'format': 'json'
             }
-            response = requests.get(
+            response = http_get(
                 self.base_url,
                 params=params,
                 headers=self.headers,
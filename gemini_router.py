@@ -8,11 +8,11 @@ SECURITY FIX: API key passed in header (x-goog-api-key), not URL.
 
 import re
 import json
-import requests
 from typing import Optional, Tuple
 
 from models import CitationType, CitationMetadata
 from config import GEMINI_API_KEY, GEMINI_MODEL, DEFAULT_TIMEOUT
+from engines.http_client import http_post
 
 
 class GeminiRouter:
@@ -50,7 +50,7 @@ Respond in JSON only:
                 'generationConfig': {'temperature': 0.1, 'maxOutputTokens': 500}
             }
             
-            response = requests.post(url, headers=headers, json=payload, timeout=self.timeout)
+            response = http_post(url, headers=headers, json=payload, timeout=self.timeout)
             
             if response.status_code == 429:
                 return CitationType.UNKNOWN, None
@@ -67,6 +67,8 @@ Respond in JSON only:
             
         except Exception as e:
             print(f"[GeminiRouter] Error: {e}")
+            from engines.orchestrator import mark_incomplete
+            mark_incomplete(f"Gemini {type(e).__name__}")
             return CitationType.UNKNOWN, None
     
     def _parse_response(self, response_text: str, original: str) -> Tuple[CitationType, Optional[CitationMetadata]]:
@@ -0,0 +1,500 @@
+"""
+citeflex/job_queue.py
+
+Background jobs for document processing.
+
+/api/process and /api/process-author-date used to do all their work inside
+the HTTP request, so a long document held a gunicorn thread for minutes and
+ran into the 120s worker timeout. They now submit a job and return its ID at
+once; the client polls /api/jobs/<id> for progress and the result.
+
+The queue is a table in a WAL-mode SQLite database in SESSIONS_DIR (next to
+the session store), so no broker is needed and every gunicorn worker sees
+every job:
+
+- submit() inserts a 'queued' row holding the uploaded document and wakes
+  this worker's job threads
+- each worker runs JOB_WORKERS job threads; an idle thread claims the oldest
+  queued job with one atomic UPDATE ... RETURNING, so a job runs exactly once
+  even if several workers poll at the same moment
+- the handler reports progress through its progress_callback(status,
+  current, total), which is written to the row (throttled)
+- the handler saves its output in the session store and returns the JSON
+  response the endpoint used to send; that is stored as the job's result
+- partial results (e.g. each note as it is finished) are appended to a
+  job_events table with progress.publish(); events() replays and tails it,
+  for /api/jobs/<id>/events to stream as server-sent events
+
+A worker process that dies mid-job stops sending heartbeats and the job is
+marked failed after JOB_STALE_AFTER seconds. Finished jobs are deleted after
+JOB_RETENTION.
+
+Usage:
+    jobs = JobQueue()
+    jobs.register('process', run_process_job)   # handler(payload, params, progress) -> dict
+    job_id = jobs.submit('process', file_bytes, {'style': 'Chicago Manual of Style'})
+    jobs.status(job_id)   # {'status': 'running', 'stage': 'Looking up citations...', 'percent': 40, ...}
+    for event, data, event_id in jobs.events(job_id):   # ('note', {...}, 7) ... ('done', {...}, None)
+        ...
+
+Created: 2026-10-16
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import tempfile
+import threading
+import traceback
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from config import (
+    SESSIONS_DIR,
+    JOB_WORKERS,
+    JOB_POLL_INTERVAL,
+    JOB_HEARTBEAT_INTERVAL,
+    JOB_STALE_AFTER,
+    JOB_RETENTION,
+)
+
+
+# Minimum seconds between progress writes for one job (stage changes and
+# completion are always written)
+PROGRESS_WRITE_INTERVAL = 0.5
+
+# events(): how often the job is re-read, and how long a quiet stream may go
+# before a keepalive is sent
+EVENT_POLL_INTERVAL = 0.25
+EVENT_KEEPALIVE = 15
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+# =============================================================================
+# PROGRESS REPORTING
+# =============================================================================
+
+class JobProgress:
+    """
+    progress_callback(status, current, total) for one running job.
+    
+    Safe to call from any thread (lookups report from their pool threads);
+    writes to the queue are throttled to one per PROGRESS_WRITE_INTERVAL.
+    publish() records a partial result for streaming clients (not throttled).
+    """
+    
+    def __init__(self, queue: 'JobQueue', job_id: str):
+        self._queue = queue
+        self._job_id = job_id
+        self._lock = threading.Lock()
+        self._last_stage: Optional[str] = None
+        self._last_write = 0.0
+    
+    def __call__(self, status: str, current: int, total: int) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if (
+                status == self._last_stage
+                and current < total
+                and now - self._last_write < PROGRESS_WRITE_INTERVAL
+            ):
+                return
+            self._last_stage = status
+            self._last_write = now
+        
+        try:
+            self._queue._set_progress(self._job_id, status, current, total)
+        except Exception as e:
+            print(f"[JobQueue] Failed to record progress for {self._job_id[:8]}: {e}")
+    
+    def publish(self, event: str, data: dict) -> None:
+        """Append a partial result (e.g. event 'note') to the job's event stream."""
+        try:
+            self._queue._publish(self._job_id, event, data)
+        except Exception as e:
+            print(f"[JobQueue] Failed to publish {event} for {self._job_id[:8]}: {e}")
+
+
+# =============================================================================
+# QUEUE
+# =============================================================================
+
+JobHandler = Callable[[bytes, dict, JobProgress], dict]
+
+
+class JobQueue:
+    """
+    SQLite-backed job queue with an in-process worker pool.
+    
+    Handlers are registered per job kind, at import time, in every worker
+    process; a process only claims kinds it has a handler for.
+    """
+    
+    FILENAME = 'jobs.sqlite3'
+    
+    def __init__(self, storage_dir: str = SESSIONS_DIR, workers: int = JOB_WORKERS):
+        self.workers = max(workers, 1)
+        self._handlers: Dict[str, JobHandler] = {}
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._running: Dict[str, float] = {}  # job id -> start time, jobs run by this process
+        self._running_lock = threading.Lock()
+        self._started_pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+        
+        self.path = self._init_storage(Path(storage_dir))
+        self._ensure_started()
+    
+    def _init_storage(self, directory: Path) -> Path:
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            path = directory / self.FILENAME
+            self._create_table(path)
+            return path
+        except Exception as e:
+            # Jobs still work, but only the worker that accepted them can report on them
+            fallback = Path(tempfile.mkdtemp(prefix='citeflex-jobs-')) / self.FILENAME
+            print(f"[JobQueue] Shared job storage unavailable ({e}). Using {fallback} for this worker only.")
+            self._create_table(fallback)
+            return fallback
+    
+    def _create_table(self, path: Path) -> None:
+        self.path = path
+        conn = self._connect()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            ' id TEXT PRIMARY KEY,'
+            ' kind TEXT NOT NULL,'
+            ' status TEXT NOT NULL,'
+            ' params TEXT NOT NULL,'
+            ' payload BLOB,'
+            ' stage TEXT,'
+            ' current INTEGER NOT NULL DEFAULT 0,'
+            ' total INTEGER NOT NULL DEFAULT 0,'
+            ' result TEXT,'
+            ' error TEXT,'
+            ' created_at REAL NOT NULL,'
+            ' started_at REAL,'
+            ' finished_at REAL,'
+            ' heartbeat REAL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS job_events ('
+            ' seq INTEGER PRIMARY KEY AUTOINCREMENT,'
+            ' job_id TEXT NOT NULL,'
+            ' event TEXT NOT NULL,'
+            ' data TEXT NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS job_events_job ON job_events (job_id, seq)')
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'path', None) != self.path:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.path = self.path
+        return conn
+    
+    def _ensure_started(self) -> None:
+        """Start the job threads (again, in a forked child that didn't inherit them)."""
+        if self._started_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._started_pid == os.getpid():
+                return
+            self._local = threading.local()
+            for i in range(self.workers):
+                threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True).start()
+            threading.Thread(target=self._supervise, name="job-supervisor", daemon=True).start()
+            self._started_pid = os.getpid()
+            print(f"[JobQueue] {self.workers} job workers started (pid {self._started_pid})")
+    
+    # -------------------------------------------------------------------------
+    # Public API
+    # -------------------------------------------------------------------------
+    
+    def register(self, kind: str, handler: JobHandler) -> None:
+        """Register the function that runs jobs of this kind."""
+        self._handlers[kind] = handler
+    
+    def submit(self, kind: str, payload: bytes, params: Optional[dict] = None) -> str:
+        """
+        Queue a job.
+        
+        Args:
+            kind: Registered job kind
+            payload: Input document bytes
+            params: JSON-serializable options passed to the handler
+        
+        Returns:
+            Job ID
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        self._ensure_started()
+        
+        job_id = str(uuid.uuid4())
+        self._connect().execute(
+            'INSERT INTO jobs (id, kind, status, params, payload, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+            (job_id, kind, QUEUED, json.dumps(params or {}), sqlite3.Binary(payload), time.time())
+        )
+        print(f"[JobQueue] Queued {kind} job {job_id[:8]} ({len(payload)} bytes)")
+        self._wakeup.set()
+        return job_id
+    
+    def status(self, job_id: str) -> Optional[dict]:
+        """
+        Current state of a job.
+        
+        Returns:
+            Dict with status ('queued', 'running', 'done', 'failed'), stage,
+            current/total, percent, queue position (queued), result (done)
+            and error (failed); None if the job is unknown or expired
+        """
+        self._ensure_started()
+        conn = self._connect()
+        row = conn.execute(
+            'SELECT kind, status, stage, current, total, result, error, created_at, started_at, '
+            'finished_at, heartbeat FROM jobs WHERE id = ?',
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        
+        kind, status, stage, current, total, result, error, created_at, started_at, finished_at, heartbeat = row
+        if status == RUNNING and heartbeat and time.time() - heartbeat > JOB_STALE_AFTER:
+            self._fail_stale()
+            return self.status(job_id)
+        
+        info = {
+            'job_id': job_id,
+            'kind': kind,
+            'status': status,
+            'stage': stage,
+            'current': current,
+            'total': total,
+            'percent': int(100 * current / total) if total else (100 if status == DONE else 0),
+            'created_at': created_at,
+            'started_at': started_at,
+            'finished_at': finished_at,
+        }
+        if status == QUEUED:
+            info['position'] = conn.execute(
+                'SELECT COUNT(*) FROM jobs WHERE status = ? AND created_at < ?',
+                (QUEUED, created_at)
+            ).fetchone()[0] + 1
+        if result is not None:
+            info['result'] = json.loads(result)
+        if error is not None:
+            info['error'] = error
+        return info
+    
+    def events(
+        self,
+        job_id: str,
+        after: int = 0,
+        timeout: Optional[float] = None
+    ) -> Iterator[Tuple[str, Optional[dict], Optional[int]]]:
+        """
+        Stream a job's progress and partial results until it finishes.
+        
+        Replays published events after sequence number `after` (a client's
+        Last-Event-ID), then follows the job. Works from any worker process.
+        With a timeout the stream stops early, telling the client where to
+        resume.
+        
+        Yields:
+            (event, data, event_id) tuples:
+            - ('progress', {'status', 'stage', 'current', 'total', 'percent'}, None) on change
+            - (published event, data, seq), e.g. ('note', {...}, 12)
+            - ('keepalive', None, None) after EVENT_KEEPALIVE quiet seconds
+            - finally ('done', result, None) or ('failed', {'error': ...}, None),
+              or ('reconnect', {'after': seq}, None) once `timeout` seconds have passed
+            Nothing is yielded for an unknown job.
+        """
+        last_progress = None
+        last_sent = time.monotonic()
+        deadline = None if timeout is None else last_sent + timeout
+        
+        while True:
+            info = self.status(job_id)
+            if info is None:
+                return
+            
+            rows = self._connect().execute(
+                'SELECT seq, event, data FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq',
+                (job_id, after)
+            ).fetchall()
+            for seq, event, data in rows:
+                after = seq
+                yield event, json.loads(data), seq
+            sent = bool(rows)
+            
+            progress = {key: info[key] for key in ('status', 'stage', 'current', 'total', 'percent')}
+            if progress != last_progress:
+                last_progress = progress
+                sent = True
+                yield 'progress', progress, None
+            
+            if info['status'] == DONE:
+                yield 'done', info.get('result'), None
+                return
+            if info['status'] == FAILED:
+                yield 'failed', {'error': info.get('error')}, None
+                return
+            
+            if deadline is not None and time.monotonic() >= deadline:
+                yield 'reconnect', {'after': after}, None
+                return
+            if sent:
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= EVENT_KEEPALIVE:
+                last_sent = time.monotonic()
+                yield 'keepalive', None, None
+            time.sleep(EVENT_POLL_INTERVAL)
+    
+    def stats(self) -> dict:
+        """Job counts by status (for /health)."""
+        try:
+            rows = self._connect().execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        except Exception as e:
+            print(f"[JobQueue] Failed to count jobs: {e}")
+            rows = []
+        counts = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)}
+        counts.update(dict(rows))
+        return counts
+    
+    # -------------------------------------------------------------------------
+    # Workers
+    # -------------------------------------------------------------------------
+    
+    def _claim(self) -> Optional[tuple]:
+        """
+        Atomically take the oldest queued job this process can run.
+        
+        Other worker processes may be competing; only kinds with a handler
+        registered here are claimed (a worker still importing the app has none).
+        """
+        kinds = list(self._handlers)
+        if not kinds:
+            return None
+        
+        now = time.time()
+        placeholders = ','.join('?' * len(kinds))
+        return self._connect().execute(
+            'UPDATE jobs SET status = ?, started_at = ?, heartbeat = ? '
+            'WHERE id = (SELECT id FROM jobs WHERE status = ? '
+            f'AND kind IN ({placeholders}) ORDER BY created_at LIMIT 1) '
+            'AND status = ? '
+            'RETURNING id, kind, params, payload',
+            (RUNNING, now, now, QUEUED, *kinds, QUEUED)
+        ).fetchone()
+    
+    def _work(self) -> None:
+        while True:
+            try:
+                job = self._claim()
+            except Exception as e:
+                print(f"[JobQueue] Failed to claim a job: {e}")
+                job = None
+            
+            if job is None:
+                self._wakeup.wait(JOB_POLL_INTERVAL)
+                self._wakeup.clear()
+                continue
+            self._run(*job)
+    
+    def _run(self, job_id: str, kind: str, params: str, payload: bytes) -> None:
+        handler = self._handlers[kind]
+        with self._running_lock:
+            self._running[job_id] = time.time()
+        started = time.monotonic()
+        print(f"[JobQueue] Running {kind} job {job_id[:8]}")
+        
+        try:
+            result = handler(bytes(payload), json.loads(params), JobProgress(self, job_id))
+            self._finish(job_id, DONE, result=json.dumps(result))
+            print(f"[JobQueue] {kind} job {job_id[:8]} done in {time.monotonic() - started:.1f}s")
+        except Exception as e:
+            print(f"[JobQueue] {kind} job {job_id[:8]} failed: {e}")
+            traceback.print_exc()
+            self._finish(job_id, FAILED, error=str(e))
+        finally:
+            with self._running_lock:
+                self._running.pop(job_id, None)
+    
+    def _set_progress(self, job_id: str, stage: str, current: int, total: int) -> None:
+        self._connect().execute(
+            'UPDATE jobs SET stage = ?, current = ?, total = ?, heartbeat = ? WHERE id = ? AND status = ?',
+            (stage, current, total, time.time(), job_id, RUNNING)
+        )
+    
+    def _publish(self, job_id: str, event: str, data: dict) -> None:
+        self._connect().execute(
+            'INSERT INTO job_events (job_id, event, data) VALUES (?, ?, ?)',
+            (job_id, event, json.dumps(data))
+        )
+    
+    def _finish(self, job_id: str, status: str, result: Optional[str] = None, error: Optional[str] = None) -> None:
+        # The uploaded document is dropped; the handler saved what it needs in a session
+        try:
+            self._connect().execute(
+                'UPDATE jobs SET status = ?, result = ?, error = ?, payload = NULL, finished_at = ?, '
+                'current = CASE WHEN ? = ? THEN total ELSE current END '
+                'WHERE id = ?',
+                (status, result, error, time.time(), status, DONE, job_id)
+            )
+        except Exception as e:
+            print(f"[JobQueue] Failed to record result of {job_id[:8]}: {e}")
+    
+    # -------------------------------------------------------------------------
+    # Heartbeats and cleanup
+    # -------------------------------------------------------------------------
+    
+    def _supervise(self) -> None:
+        while True:
+            time.sleep(JOB_HEARTBEAT_INTERVAL)
+            try:
+                self._heartbeat()
+                self._fail_stale()
+                self._cleanup()
+            except Exception as e:
+                print(f"[JobQueue] Supervisor error: {e}")
+    
+    def _heartbeat(self) -> None:
+        with self._running_lock:
+            running: List[str] = list(self._running)
+        if running:
+            placeholders = ','.join('?' * len(running))
+            self._connect().execute(
+                f'UPDATE jobs SET heartbeat = ? WHERE id IN ({placeholders})',
+                (time.time(), *running)
+            )
+    
+    def _fail_stale(self) -> None:
+        failed = self._connect().execute(
+            'UPDATE jobs SET status = ?, error = ?, payload = NULL, finished_at = ? '
+            'WHERE status = ? AND heartbeat < ? RETURNING id',
+            (FAILED, 'Worker stopped while processing the document; please upload it again',
+             time.time(), RUNNING, time.time() - JOB_STALE_AFTER)
+        ).fetchall()
+        for (job_id,) in failed:
+            print(f"[JobQueue] Job {job_id[:8]} lost its worker, marked failed")
+    
+    def _cleanup(self) -> None:
+        removed = self._connect().execute(
+            'DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?',
+            (DONE, FAILED, time.time() - JOB_RETENTION)
+        ).rowcount
+        if removed:
+            self._connect().execute('DELETE FROM job_events WHERE job_id NOT IN (SELECT id FROM jobs)')
+            print(f"[JobQueue] Removed {removed} finished jobs")
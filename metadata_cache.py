@@ -0,0 +1,350 @@
+"""
+citeflex/metadata_cache.py
+
+Cross-request cache for CitationMetadata lookups.
+
+Sits below unified_router.get_citation() and SearchEngine.get_by_id() so a
+repeated DOI, ISBN, PMID or free-text query is answered without re-running
+the engine cascade. Students in the same course cite the same works, so most
+lookups after the first are repeats.
+
+Tiers (checked in order, filled on the way back):
+1. MemoryTier - per-process LRU of serialized entries
+2. SQLiteTier - shared on-disk table under CACHE_DIR (survives restarts and
+                is shared between gunicorn workers; WAL mode)
+
+Entries are stored as CitationMetadata.to_dict() JSON, so every hit returns
+a fresh object that callers are free to mutate. Misses are cached too
+(negative caching) with a short TTL.
+
+The cache is pluggable: get_cache() returns the process-wide instance and
+set_cache() swaps it (e.g. MetadataCache([MemoryTier()]) for memory-only,
+or NullCache() to disable).
+
+Created: 2026-10-16
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Optional, Tuple, List
+
+from models import CitationMetadata, normalize_doi
+from config import (
+    CACHE_ENABLED,
+    CACHE_DIR,
+    CACHE_MEMORY_ENTRIES,
+    CACHE_TTLS,
+    CACHE_DEFAULT_TTL,
+    CACHE_NEGATIVE_TTL,
+)
+
+
+# (expires_at, payload) - payload is the to_dict() JSON, or None for a cached miss
+CacheEntry = Tuple[float, Optional[str]]
+
+
+# =============================================================================
+# KEY NORMALIZATION
+# =============================================================================
+
+_WHITESPACE = re.compile(r'\s+')
+_PMID_PATTERN = re.compile(r'^(?:pmid\s*:?\s*)?(\d{1,9})$', re.IGNORECASE)
+_ISBN_PATTERN = re.compile(r'^(?:isbn(?:-1[03])?\s*:?\s*)?([\dXx\-\s]{10,17})$', re.IGNORECASE)
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a free-text citation query for use as a cache key.
+    
+    Only formatting noise is removed (Unicode form, surrounding and repeated
+    whitespace). Case is kept because parsed citations preserve the user's text.
+    """
+    query = unicodedata.normalize('NFC', query or '')
+    return _WHITESPACE.sub(' ', query).strip()
+
+
+def normalize_identifier(identifier: str) -> str:
+    """
+    Normalize a DOI, PMID or ISBN to a canonical cache key.
+    
+    Other identifiers (video IDs, Wikipedia titles) are case-sensitive and
+    are only stripped.
+    """
+    identifier = normalize_query(identifier)
+    
+    doi = normalize_doi(identifier)
+    if doi.startswith('10.'):
+        return doi
+    
+    pmid = _PMID_PATTERN.match(identifier)
+    if pmid:
+        return pmid.group(1)
+    
+    isbn = _ISBN_PATTERN.match(identifier)
+    if isbn:
+        digits = re.sub(r'[\-\s]', '', isbn.group(1)).upper()
+        if len(digits) in (10, 13):
+            return digits
+    
+    return identifier
+
+
+def ttl_for(source_engine: str) -> int:
+    """Freshness window for a record produced by an engine (prefix match)."""
+    source_engine = source_engine or ''
+    for engine_name, ttl in CACHE_TTLS.items():
+        if source_engine.startswith(engine_name):
+            return ttl
+    return CACHE_DEFAULT_TTL
+
+
+# =============================================================================
+# STORAGE TIERS
+# =============================================================================
+
+class MemoryTier:
+    """Thread-safe in-process LRU."""
+    
+    def __init__(self, max_entries: int = CACHE_MEMORY_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, namespace: str, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._entries[(namespace, key)]
+                return None
+            self._entries.move_to_end((namespace, key))
+            return entry
+    
+    def set(self, namespace: str, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self._entries[(namespace, key)] = entry
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteTier:
+    """
+    On-disk tier shared by all workers on the host.
+    
+    One connection per thread; WAL mode lets readers proceed while another
+    worker writes. SQLite errors are logged and treated as a miss rather
+    than failing the lookup.
+    """
+    
+    FILENAME = 'metadata_cache.sqlite3'
+    
+    def __init__(self, directory: str = CACHE_DIR):
+        self.path = os.path.join(directory, self.FILENAME)
+        self._local = threading.local()
+        self.available = False
+        
+        try:
+            os.makedirs(directory, exist_ok=True)
+            conn = self._connect()
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS metadata_cache ('
+                ' namespace TEXT NOT NULL,'
+                ' key TEXT NOT NULL,'
+                ' payload TEXT,'
+                ' expires_at REAL NOT NULL,'
+                ' PRIMARY KEY (namespace, key))'
+            )
+            # Drop anything that expired while we were down
+            conn.execute('DELETE FROM metadata_cache WHERE expires_at < ?', (time.time(),))
+            conn.commit()
+            self.available = True
+            print(f"[MetadataCache] Disk cache enabled at {self.path}")
+        except Exception as e:
+            print(f"[MetadataCache] Disk cache unavailable ({e}). Using in-memory only.")
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+    
+    def get(self, namespace: str, key: str) -> Optional[CacheEntry]:
+        if not self.available:
+            return None
+        try:
+            row = self._connect().execute(
+                'SELECT expires_at, payload FROM metadata_cache WHERE namespace = ? AND key = ?',
+                (namespace, key)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"[MetadataCache] Disk read failed: {e}")
+            return None
+        
+        if row is None or row[0] < time.time():
+            return None
+        return row[0], row[1]
+    
+    def set(self, namespace: str, key: str, entry: CacheEntry) -> None:
+        if not self.available:
+            return
+        try:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO metadata_cache (namespace, key, payload, expires_at) '
+                'VALUES (?, ?, ?, ?)',
+                (namespace, key, entry[1], entry[0])
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"[MetadataCache] Disk write failed: {e}")
+    
+    def clear(self) -> None:
+        if not self.available:
+            return
+        try:
+            conn = self._connect()
+            conn.execute('DELETE FROM metadata_cache')
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"[MetadataCache] Disk clear failed: {e}")
+
+
+# =============================================================================
+# CACHE
+# =============================================================================
+
+class MetadataCache:
+    """
+    Tiered read-through cache of CitationMetadata.
+    
+    Usage:
+        cache = get_cache()
+        hit, metadata = cache.get('citation', normalize_query(query))
+        if not hit:
+            metadata = expensive_lookup(query)
+            cache.set('citation', normalize_query(query), metadata)
+    """
+    
+    def __init__(self, tiers: List):
+        self.tiers = tiers
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, namespace: str, key: str) -> Tuple[bool, Optional[CitationMetadata]]:
+        """
+        Look up an entry.
+        
+        Returns:
+            (hit, metadata) - hit is True for cached misses too, in which
+            case metadata is None
+        """
+        for i, tier in enumerate(self.tiers):
+            entry = tier.get(namespace, key)
+            if entry is None:
+                continue
+            
+            # Promote into the faster tiers
+            for faster in self.tiers[:i]:
+                faster.set(namespace, key, entry)
+            
+            self.hits += 1
+            return True, self._decode(entry[1])
+        
+        self.misses += 1
+        return False, None
+    
+    def set(
+        self,
+        namespace: str,
+        key: str,
+        metadata: Optional[CitationMetadata],
+        ttl: Optional[int] = None
+    ) -> None:
+        """
+        Store a lookup result (None caches a miss with CACHE_NEGATIVE_TTL).
+        
+        Args:
+            ttl: Override the freshness window; defaults to the TTL of the
+                 engine that produced the metadata
+        """
+        if metadata is None:
+            entry = (time.time() + CACHE_NEGATIVE_TTL, None)
+        else:
+            if ttl is None:
+                ttl = ttl_for(metadata.source_engine)
+            try:
+                payload = json.dumps(metadata.to_dict(), default=str)
+            except (TypeError, ValueError) as e:
+                print(f"[MetadataCache] Not caching unserializable result: {e}")
+                return
+            entry = (time.time() + ttl, payload)
+        
+        for tier in self.tiers:
+            tier.set(namespace, key, entry)
+    
+    def clear(self) -> None:
+        for tier in self.tiers:
+            tier.clear()
+    
+    def stats(self) -> dict:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'memory_entries': sum(len(t) for t in self.tiers if isinstance(t, MemoryTier)),
+            'disk': any(isinstance(t, SQLiteTier) and t.available for t in self.tiers),
+        }
+    
+    @staticmethod
+    def _decode(payload: Optional[str]) -> Optional[CitationMetadata]:
+        if payload is None:
+            return None
+        return CitationMetadata.from_dict(json.loads(payload))
+
+
+class NullCache(MetadataCache):
+    """Cache that never stores anything (CITEFLEX_CACHE=off)."""
+    
+    def __init__(self):
+        super().__init__([])
+
+
+_cache: Optional[MetadataCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> MetadataCache:
+    """Return the process-wide cache, creating the default tiers on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                if CACHE_ENABLED:
+                    _cache = MetadataCache([MemoryTier(), SQLiteTier()])
+                else:
+                    _cache = NullCache()
+    return _cache
+
+
+def set_cache(cache: Optional[MetadataCache]) -> None:
+    """Replace the process-wide cache (None restores the default on next use)."""
+    global _cache
+    with _cache_lock:
+        _cache = cache
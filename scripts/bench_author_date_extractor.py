@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+citeflex/scripts/bench_author_date_extractor.py
+
+Time AuthorDateExtractor.extract_from_text against document size.
+
+Builds synthetic document bodies with N in-text citations in every form
+the extractor recognizes (parenthetical, narrative, et al., possessive,
+3+ authors, multi-year, semicolon groups) mixed into filler prose, and
+reports extraction time per size. With linear span bookkeeping the time
+per citation should stay flat as N grows.
+
+Usage:
+    python scripts/bench_author_date_extractor.py
+    python scripts/bench_author_date_extractor.py --sizes 1000 5000 20000 --repeat 5
+
+Created: 2026-10-16
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from author_date_extractor import AuthorDateExtractor
+
+
+SURNAMES = [
+    'Bandura', 'Kahneman', 'Tversky', 'Simonton', 'Piaget', 'Vygotsky', 'Skinner',
+    'Festinger', 'Milgram', 'Zimbardo', 'Ainsworth', 'Bowlby', 'Erikson', 'Maslow',
+    'Rogers', 'Seligman', 'Dweck', 'Baumeister', 'Chomsky', 'Gardner', 'Sternberg',
+    "O'Brien", 'García', 'Müller', 'Smith-Jones', 'Nguyen', 'Okafor', 'Larsen',
+]
+
+FILLER = [
+    'Prior work has examined this question in several settings.',
+    'The effect was robust across samples and measures.',
+    'These findings were later extended to other populations.',
+    'However, the interpretation remains contested.',
+    'Subsequent replications reported smaller effects.',
+    'This account emphasizes the role of social context.',
+]
+
+
+# =============================================================================
+# SYNTHETIC DOCUMENTS
+# =============================================================================
+
+def _year(rng: random.Random) -> str:
+    year = str(rng.randint(1950, 2024))
+    return year + rng.choice(['', '', '', 'a', 'b'])
+
+
+def _citation(rng: random.Random) -> str:
+    """One in-text citation in a random supported form."""
+    a, b, c, d = rng.sample(SURNAMES, 4)
+    year = _year(rng)
+    forms = [
+        f"({a}, {year})",
+        f"({a}, {year}, p. {rng.randint(1, 400)})",
+        f"({a} & {b}, {year})",
+        f"({a} et al., {year})",
+        f"{a} ({year}) argued that",
+        f"{a} ({year}, p. {rng.randint(1, 400)}) noted",
+        f"{a} et al. ({year}) found",
+        f"{a} and {b} ({year}) showed",
+        f"{a}, {b}, and {c} ({year}) reported",
+        f"{a}’s ({year}) account",
+        f"({a}, {b}, {c}, & {d}, {year})",
+        f"({a}, {year}, {_year(rng)}, {_year(rng)})",
+        f"({a}, {year}; {b} & {c}, {_year(rng)}; {d} et al., {_year(rng)})",
+    ]
+    return rng.choice(forms)
+
+
+def synthetic_document(citations: int, seed: int = 0) -> str:
+    """Body text with `citations` in-text citations (semicolon groups count once)."""
+    rng = random.Random(seed)
+    sentences = []
+    for _ in range(citations):
+        sentences.append(f"{rng.choice(FILLER)} {_citation(rng)} {rng.choice(FILLER)}")
+    return ' '.join(sentences)
+
+
+# =============================================================================
+# MAIN
+# =============================================================================
+
+def bench(sizes: List[int], repeat: int) -> None:
+    extractor = AuthorDateExtractor()
+    print(f"{'citations':>10} {'chars':>11} {'extracted':>10} {'unique':>8} {'best ms':>9} {'us/citation':>12}")
+    
+    for size in sizes:
+        text = synthetic_document(size)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            found = extractor.extract_from_text(text)
+            timings.append(time.perf_counter() - start)
+        
+        best = min(timings)
+        unique = len(extractor.get_unique_citations(found))
+        print(f"{size:>10} {len(text):>11} {len(found):>10} {unique:>8} "
+              f"{best * 1000:>9.1f} {best * 1e6 / size:>12.1f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='Citation counts to generate (default: 1000 10000 100000)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per size; the best is reported (default: 3)')
+    args = parser.parse_args()
+    
+    bench(args.sizes, args.repeat)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+citeflex/scripts/build_famous_papers.py
+
+Build the famous papers table (engines/famous_papers.py) from a metadata dump.
+
+Streams one or more dump files, keeps the N most-cited works, and writes
+them as the tab-separated table the index memory-maps. Supported inputs
+(plain or .gz):
+
+- Crossref: JSON lines of work records (bare, or wrapped as {"message": ...}),
+  or the public data file's {"items": [...]} JSON files
+- OpenAlex: the works snapshot's JSON lines
+
+Usage:
+    python scripts/build_famous_papers.py crossref/*.json.gz --top 10000
+    python scripts/build_famous_papers.py openalex/works/*/part_*.gz -o /tmp/famous_papers.tsv
+
+Created: 2026-10-16
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+import heapq
+import argparse
+from typing import Iterator, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import FAMOUS_PAPERS_PATH
+from engines.famous_papers import COLUMNS, AUTHOR_SEPARATOR
+
+
+# Work types worth resolving offline (others are mostly datasets, components...)
+CROSSREF_TYPES = {'journal-article', 'proceedings-article', 'book', 'book-chapter', 'monograph'}
+OPENALEX_TYPES = {'article', 'journal-article', 'proceedings-article', 'book', 'book-chapter', 'review'}
+
+MAX_AUTHORS = 6
+
+
+# =============================================================================
+# READING DUMPS
+# =============================================================================
+
+def _open(path: str):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def iter_records(path: str) -> Iterator[dict]:
+    """Yield raw work records from a JSON-lines or {"items": [...]} file."""
+    with _open(path) as f:
+        first_line = f.readline()
+        try:
+            json.loads(first_line)
+            json_lines = True
+        except json.JSONDecodeError:
+            json_lines = False
+        f.seek(0)
+        
+        if not json_lines:
+            # One (possibly pretty-printed) JSON document
+            document = json.load(f)
+            yield from document.get('items') or document.get('message', {}).get('items') or []
+            return
+        
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                print(f"[BuildFamous] {path}:{line_number}: skipping malformed line")
+                continue
+            if isinstance(record.get('items'), list):
+                yield from record['items']
+            else:
+                yield record.get('message', record)
+
+
+# =============================================================================
+# NORMALIZING RECORDS
+# =============================================================================
+
+def _clean(value) -> str:
+    """Single-line text safe for a TSV field."""
+    if isinstance(value, list):
+        value = value[0] if value else ''
+    return re.sub(r'\s+', ' ', str(value or '')).strip()
+
+
+def _bare_doi(doi: str) -> str:
+    return re.sub(r'^https?://(dx\.)?doi\.org/', '', _clean(doi), flags=re.IGNORECASE)
+
+
+def from_crossref(item: dict) -> Optional[Tuple[int, List[str]]]:
+    """(citation count, row) for a Crossref work, or None to skip it."""
+    if item.get('type') not in CROSSREF_TYPES:
+        return None
+    
+    authors = []
+    for author in item.get('author', [])[:MAX_AUTHORS]:
+        name = ' '.join(p for p in (author.get('given'), author.get('family')) if p) or author.get('name')
+        if name:
+            authors.append(_clean(name))
+    
+    date_parts = (item.get('issued') or item.get('published') or {}).get('date-parts') or [[None]]
+    year = date_parts[0][0] if date_parts and date_parts[0] else None
+    
+    row = {
+        'doi': _bare_doi(item.get('DOI')),
+        'year': str(year or ''),
+        'title': _clean(item.get('title')),
+        'authors': AUTHOR_SEPARATOR.join(authors),
+        'journal': _clean(item.get('container-title')),
+        'volume': _clean(item.get('volume')),
+        'issue': _clean(item.get('issue')),
+        'pages': _clean(item.get('page')),
+    }
+    return int(item.get('is-referenced-by-count') or 0), [row[c] for c in COLUMNS]
+
+
+def from_openalex(work: dict) -> Optional[Tuple[int, List[str]]]:
+    """(citation count, row) for an OpenAlex work, or None to skip it."""
+    if work.get('type') not in OPENALEX_TYPES:
+        return None
+    
+    authors = [
+        _clean((authorship.get('author') or {}).get('display_name'))
+        for authorship in work.get('authorships', [])[:MAX_AUTHORS]
+    ]
+    
+    source = ((work.get('primary_location') or {}).get('source') or work.get('host_venue') or {})
+    biblio = work.get('biblio') or {}
+    pages = '-'.join(p for p in (biblio.get('first_page'), biblio.get('last_page')) if p)
+    
+    row = {
+        'doi': _bare_doi(work.get('doi')),
+        'year': str(work.get('publication_year') or ''),
+        'title': _clean(work.get('title') or work.get('display_name')),
+        'authors': AUTHOR_SEPARATOR.join(a for a in authors if a),
+        'journal': _clean(source.get('display_name')),
+        'volume': _clean(biblio.get('volume')),
+        'issue': _clean(biblio.get('issue')),
+        'pages': pages,
+    }
+    return int(work.get('cited_by_count') or 0), [row[c] for c in COLUMNS]
+
+
+def normalize(record: dict) -> Optional[Tuple[int, List[str]]]:
+    """Dispatch on the record's shape (OpenAlex works have an 'authorships' list)."""
+    if 'authorships' in record or 'cited_by_count' in record:
+        result = from_openalex(record)
+    else:
+        result = from_crossref(record)
+    
+    if result is None:
+        return None
+    count, row = result
+    doi, title = row[0], row[2]
+    if not doi or not title:
+        return None
+    return count, [field.replace('\t', ' ') for field in row]
+
+
+# =============================================================================
+# MAIN
+# =============================================================================
+
+def build(paths: List[str], top: int, min_citations: int) -> List[Tuple[int, List[str]]]:
+    """Stream the dumps and keep the `top` most-cited works (one row per DOI)."""
+    heap: List[Tuple[int, str, List[str]]] = []
+    scanned = 0
+    
+    for path in paths:
+        for record in iter_records(path):
+            scanned += 1
+            result = normalize(record)
+            if result is None:
+                continue
+            count, row = result
+            if count < min_citations:
+                continue
+            
+            # Ties broken by DOI so the output is reproducible
+            entry = (count, row[0].lower(), row)
+            if len(heap) < top:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+        
+        print(f"[BuildFamous] {path}: {scanned} records scanned, {len(heap)} kept")
+    
+    # A DOI seen twice (e.g. overlapping dumps) keeps only its best entry
+    best = {}
+    for count, doi, row in heap:
+        if doi not in best or count > best[doi][0]:
+            best[doi] = (count, row)
+    return sorted(best.values(), key=lambda entry: (-entry[0], entry[1][0]))
+
+
+def write_table(rows: List[Tuple[int, List[str]]], output: str) -> None:
+    """Write the table atomically (the running app may have it mapped)."""
+    tmp_path = output + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write("# CiteFlex famous papers table (built by scripts/build_famous_papers.py)\n")
+        f.write("# " + "\t".join(COLUMNS) + "\n")
+        for _, row in rows:
+            f.write("\t".join(row) + "\n")
+    os.replace(tmp_path, output)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('inputs', nargs='+', help='Crossref or OpenAlex dump files (.json, .jsonl, .gz)')
+    parser.add_argument('--top', type=int, default=10000, help='Number of most-cited works to keep (default: 10000)')
+    parser.add_argument('--min-citations', type=int, default=0, help='Skip works cited fewer times than this')
+    parser.add_argument('-o', '--output', default=FAMOUS_PAPERS_PATH, help='Output table path')
+    args = parser.parse_args()
+    
+    rows = build(args.inputs, args.top, args.min_citations)
+    if not rows:
+        print("[BuildFamous] No qualifying works found; table not written")
+        return 1
+    
+    write_table(rows, args.output)
+    print(f"[BuildFamous] Wrote {len(rows)} papers to {args.output} "
+          f"(citations {rows[-1][0]}..{rows[0][0]})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+citeflex/scripts/check_note_clustering.py
+
+Regression checks for note clustering in document_processor.py
+(split_pincite, cluster_notes, with_pincite).
+
+Clustering merges notes that cite the same work so each work is looked up
+once; a wrong merge gives every member the same (wrong) metadata, so the
+cases below are mostly ones that must NOT merge: statute sections, public
+law numbers, numbered works, parties in a different order.
+
+Usage:
+    python scripts/check_note_clustering.py
+
+Created: 2026-10-16
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import CitationMetadata, CitationType
+from document_processor import split_pincite, note_cluster_key, cluster_notes, with_pincite
+
+
+# (note, expected page or None)
+SPLITS = [
+    ("Smith, Wealth of Nations, 45.", "45"),
+    ("Smith, Wealth of Nations, pp. 112-14", "112-14"),
+    ("Smith, Wealth of Nations at 45", "45"),
+    ("Roe v. Wade, 410 U.S. 113, 120", "120"),
+    ("Doe v. Roe, 123 F.3d 45, 50", "50"),
+    ("Smith, Wealth of Nations, 1776.", None),
+    ("Adam Smith, Wealth of Nations, vol. 3", None),
+    ("Hamilton, Federalist 10", None),
+    ("42 U.S.C. 12101", None),
+    ("42 U.S.C. § 12101, 3", None),
+    ("40 C.F.R. 1.5, 2", None),
+    ("Pub. L. 111-148", None),
+    ("Brown v. Board, 347 U.S. 483", None),
+    ("Jones, Journal of Things 12 (2001): 45–67.", None),
+]
+
+# Pairs of notes that cite different works
+DISTINCT = [
+    ("42 U.S.C. 12101", "42 U.S.C. 12112"),
+    ("Pub. L. 111-148", "Pub. L. 115-97"),
+    ("Hamilton, Federalist 10", "Hamilton, Federalist 51"),
+    ("Jones v. Smith, 45", "Smith v. Jones, 45"),
+]
+
+# Pairs of notes that cite the same work
+SAME = [
+    ("Smith, Wealth of Nations, 45.", "Smith, The Wealth of Nations, p. 112."),
+    ("Roe v. Wade, 410 U.S. 113, 120", "Roe v. Wade, 410 U.S. 113, 153"),
+]
+
+
+def check() -> list:
+    failures = []
+    
+    for note, page in SPLITS:
+        got = split_pincite(note)[1]
+        if got != page:
+            failures.append(f"split_pincite({note!r}): page {got!r}, expected {page!r}")
+    
+    for a, b in DISTINCT:
+        mapping = cluster_notes([a, b])
+        if mapping[a][0] == mapping[b][0]:
+            failures.append(f"cluster_notes merged {a!r} and {b!r}")
+    
+    for a, b in SAME:
+        if note_cluster_key(a) is None or note_cluster_key(a) != note_cluster_key(b):
+            failures.append(f"cluster_notes kept {a!r} and {b!r} apart")
+    
+    article = CitationMetadata(citation_type=CitationType.JOURNAL, title='T', volume='3', pages='1–20')
+    formatted = 'A, "T," Journal 3 (2001): 1-20.'
+    if with_pincite(formatted, '3', article) == formatted:
+        failures.append("with_pincite dropped page 3 because the volume is 3")
+    if with_pincite(formatted, '1', article) != formatted:
+        failures.append("with_pincite repeated the first page")
+    if with_pincite(formatted, '1-20', article) != formatted:
+        failures.append("with_pincite repeated the page range (en dash vs hyphen)")
+    
+    case = CitationMetadata(citation_type=CitationType.LEGAL, case_name='Roe v. Wade', citation='410 U.S. 113')
+    if with_pincite('Roe v. Wade, 410 U.S. 113 (1973).', '113', case) != 'Roe v. Wade, 410 U.S. 113 (1973).':
+        failures.append("with_pincite repeated the reporter page")
+    
+    return failures
+
+
+def main() -> int:
+    failures = check()
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print(f"{'FAILED' if failures else 'OK'}: {len(failures)} failure(s)")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,978 @@
+"""
+citeflex/session_store.py
+
+Persistent store for Workbench sessions.
+
+The previous SessionManager (in app.py) pickled the whole session dict -
+including the original and processed .docx bytes - and fsync'd it on every
+set(), while holding one global lock. /api/process made five set() calls in
+a row, so each upload rewrote both documents five times and blocked every
+other request while it did.
+
+Storage is split in two:
+    
+    blobs/<sha256>.bin     Binary values (documents), content-addressed and
+                           written once. Re-setting an unchanged document, or
+                           uploading the same file twice, writes nothing.
+    session records        Timestamps plus every field, with binary fields
+                           replaced by {"__blob__": digest}. A few KB each.
+
+Values that aren't bytes or JSON-serializable are pickled into a blob
+({"__pickle__": digest}).
+
+Session records live in a SessionBackend (SESSION_BACKEND):
+- SQLiteBackend ('sqlite', default): one WAL-mode database in SESSIONS_DIR
+  shared by every gunicorn worker on the host. Each update is a short
+  transaction that merges the changed fields into the row, so any worker
+  sees the latest state of any session.
+- FileBackend ('files'): one JSON file per session plus an index log. Only
+  safe with a single worker.
+
+Concurrency:
+- Each session has its own lock; the manager-wide lock is only held for
+  dictionary bookkeeping, never for disk I/O.
+- update() sets several fields with a single write - use it instead of a
+  run of set() calls.
+
+Memory:
+- Nothing is loaded at startup; a session's record and blobs are read on
+  first access.
+- Resident sessions are kept in an LRU bounded by SESSION_MEMORY_BYTES.
+  A resident copy is checked against the backend's row version on each
+  access and refreshed (only the changed fields) if another worker wrote it.
+- Expiry is indexed (expires_at column / heap), so cleanup touches only
+  sessions that are due.
+
+Blobs no longer referenced by any session are removed by the periodic
+cleanup.
+
+Created: 2026-10-16
+
+Version History:
+    2026-10-16: Lazy loading from a session index, size-bounded LRU residency,
+                heap-based expiry; per-session locks are weakly held
+    2026-10-16: SessionBackend interface (ABC); SQLite (WAL) backend shared by all
+                workers replaces per-worker session state
+"""
+
+import os
+import json
+import uuid
+import time
+import pickle
+import heapq
+import sqlite3
+import hashlib
+import weakref
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from config import SESSIONS_DIR, SESSION_MEMORY_BYTES, SESSION_BACKEND
+
+
+# A stored session: {'created_at': epoch, 'expires_at': epoch,
+#                    'fields': {key: encoded value}, 'size': bytes, 'version': int}
+SessionRecord = Dict[str, Any]
+
+
+def _blob_refs(fields: dict) -> Set[str]:
+    """Digests of the blobs a record's fields point to."""
+    refs = set()
+    for encoded in fields.values():
+        if isinstance(encoded, dict) and len(encoded) == 1:
+            digest = encoded.get('__blob__') or encoded.get('__pickle__')
+            if digest:
+                refs.add(digest)
+    return refs
+
+
+# =============================================================================
+# BLOB STORE
+# =============================================================================
+
+class BlobStore:
+    """Write-once, content-addressed storage for large binary values."""
+    
+    # Unreferenced blobs younger than this are kept: a session record
+    # pointing at them may be about to be written
+    GC_GRACE_SECONDS = 10 * 60
+    
+    def __init__(self, directory: Path):
+        self.directory = directory
+    
+    def _path(self, digest: str) -> Path:
+        return self.directory / f"{digest}.bin"
+    
+    def put(self, data: bytes) -> str:
+        """Store bytes (if not already present) and return their digest."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if path.exists():
+            # Refresh so a concurrent collect() treats it as recently used
+            os.utime(path)
+        else:
+            temp_file = path.with_name(f"{digest}.{uuid.uuid4().hex}.tmp")
+            temp_file.write_bytes(data)
+            os.replace(temp_file, path)
+        return digest
+    
+    def get(self, digest: str) -> bytes:
+        return self._path(digest).read_bytes()
+    
+    def collect(self, live: Set[str]) -> int:
+        """
+        Delete blobs not in `live` (past the grace period).
+        
+        Returns:
+            Number of blobs removed
+        """
+        cutoff = time.time() - self.GC_GRACE_SECONDS
+        removed = 0
+        for path in self.directory.glob("*.bin"):
+            try:
+                if path.stem not in live and path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+
+# =============================================================================
+# SESSION INDEX
+# =============================================================================
+
+class SessionIndex:
+    """
+    Append-only log of session id -> (expiry, size) for FileBackend.
+    
+    Startup reads this instead of every session record, so no document is
+    touched until a session is actually used. Later lines for the same id
+    win; an expiry of 0 marks a deleted session. compact() rewrites the
+    log with only the live entries.
+    """
+    
+    FILENAME = 'index.log'
+    
+    def __init__(self, directory: Path):
+        self.path = directory / self.FILENAME
+        self._lock = threading.Lock()
+    
+    def exists(self) -> bool:
+        return self.path.exists()
+    
+    def read(self) -> Dict[str, Tuple[float, int]]:
+        entries: Dict[str, Tuple[float, int]] = {}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    session_id, expires_at, size = line.rstrip('\n').split('\t')
+                    entries[session_id] = (float(expires_at), int(size))
+                except ValueError:
+                    continue  # Torn write from a crash
+        return {sid: entry for sid, entry in entries.items() if entry[0] > 0}
+    
+    def append(self, session_id: str, expires_at: float, size: int) -> None:
+        # One small O_APPEND write per entry, so workers sharing the
+        # directory don't interleave lines
+        line = f"{session_id}\t{expires_at:.0f}\t{size}\n".encode('utf-8')
+        with self._lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+    
+    def compact(self, entries: Dict[str, Tuple[float, int]]) -> None:
+        temp_file = self.path.with_name(f"{self.FILENAME}.{uuid.uuid4().hex}.tmp")
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            for session_id, (expires_at, size) in entries.items():
+                f.write(f"{session_id}\t{expires_at:.0f}\t{size}\n")
+        with self._lock:
+            os.replace(temp_file, self.path)
+
+
+# =============================================================================
+# SESSION BACKENDS
+# =============================================================================
+
+class SessionBackend(ABC):
+    """
+    Storage for session records.
+    
+    Field values arrive already encoded (JSON-ready, blobs stored). Every
+    write bumps the record's version so other workers can tell their
+    resident copy is stale.
+    """
+    
+    name = 'base'
+    
+    @abstractmethod
+    def create(self, session_id: str, record: SessionRecord) -> int:
+        """Store a new record. Returns its version."""
+        pass
+    
+    @abstractmethod
+    def load(self, session_id: str) -> Optional[SessionRecord]:
+        """Return the record, or None if it doesn't exist."""
+        pass
+    
+    @abstractmethod
+    def version(self, session_id: str) -> Optional[int]:
+        """Cheap check of a record's current version (None if gone)."""
+        pass
+    
+    @abstractmethod
+    def update(self, session_id: str, changes: dict, size: int) -> Optional[SessionRecord]:
+        """
+        Merge changed fields into a record atomically.
+        
+        Returns:
+            The merged record (with its new version), or None if the
+            session no longer exists
+        """
+        pass
+    
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        """Delete a record. Returns whether it existed."""
+        pass
+    
+    @abstractmethod
+    def expire(self, now: float) -> List[str]:
+        """Delete records that expired before `now`; return their ids."""
+        pass
+    
+    @abstractmethod
+    def count(self) -> int:
+        """Number of live sessions."""
+        pass
+    
+    @abstractmethod
+    def blob_refs(self) -> Optional[Set[str]]:
+        """Every blob digest referenced by a stored record (None if unknown)."""
+        pass
+
+
+class FileBackend(SessionBackend):
+    """
+    One JSON file per session plus an index log (SessionIndex).
+    
+    Updates are read-merge-write without a cross-process lock, so this
+    backend is only safe when a single worker uses the directory.
+    The record file's mtime serves as its version.
+    """
+    
+    name = 'files'
+    
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._index_log = SessionIndex(directory)
+        self._lock = threading.Lock()
+        
+        # session_id -> (expires_at, size), plus an expiry heap over it
+        self._entries: Dict[str, Tuple[float, int]] = {}
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._load_index()
+    
+    def _path(self, session_id: str) -> Path:
+        return self.directory / f"{session_id}.json"
+    
+    @staticmethod
+    def read_record(path: Path) -> SessionRecord:
+        record = json.loads(path.read_text(encoding='utf-8'))
+        return {
+            'created_at': datetime.fromisoformat(record['created_at']).timestamp(),
+            'expires_at': datetime.fromisoformat(record['expires_at']).timestamp(),
+            'fields': record.get('fields', {}),
+            'size': record.get('size', 0),
+            'version': path.stat().st_mtime_ns,
+        }
+    
+    def _write(self, session_id: str, record: SessionRecord) -> int:
+        path = self._path(session_id)
+        text = json.dumps({
+            'created_at': datetime.fromtimestamp(record['created_at']).isoformat(),
+            'expires_at': datetime.fromtimestamp(record['expires_at']).isoformat(),
+            'fields': record['fields'],
+            'size': record['size'],
+        })
+        # Write to temp file first, then rename (atomic on POSIX)
+        temp_file = path.with_name(f"{session_id}.{uuid.uuid4().hex}.tmp")
+        temp_file.write_text(text, encoding='utf-8')
+        os.replace(temp_file, path)
+        return path.stat().st_mtime_ns
+    
+    def _remember(self, session_id: str, expires_at: float, size: int) -> None:
+        with self._lock:
+            if session_id not in self._entries:
+                heapq.heappush(self._expiry_heap, (expires_at, session_id))
+            self._entries[session_id] = (expires_at, size)
+        self._index_log.append(session_id, expires_at, size)
+    
+    def _load_index(self) -> None:
+        """Read the index log (rebuilt from the records if missing)."""
+        if self._index_log.exists():
+            entries = self._index_log.read()
+        else:
+            entries = {}
+            for path in self.directory.glob("*.json"):
+                try:
+                    record = self.read_record(path)
+                    entries[path.stem] = (record['expires_at'], record['size'])
+                except Exception as e:
+                    print(f"[SessionManager] Failed to index {path.name}: {e}")
+                    # Remove corrupted file
+                    try:
+                        path.unlink()
+                    except OSError:
+                        pass
+        
+        self._entries = entries
+        self._expiry_heap = [(expires_at, sid) for sid, (expires_at, _) in entries.items()]
+        heapq.heapify(self._expiry_heap)
+        self._index_log.compact(entries)
+    
+    def create(self, session_id: str, record: SessionRecord) -> int:
+        version = self._write(session_id, record)
+        self._remember(session_id, record['expires_at'], record['size'])
+        return version
+    
+    def load(self, session_id: str) -> Optional[SessionRecord]:
+        path = self._path(session_id)
+        try:
+            record = self.read_record(path)
+        except FileNotFoundError:
+            return None
+        if session_id not in self._entries:
+            self._remember(session_id, record['expires_at'], record['size'])
+        return record
+    
+    def version(self, session_id: str) -> Optional[int]:
+        try:
+            return self._path(session_id).stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+    
+    def update(self, session_id: str, changes: dict, size: int) -> Optional[SessionRecord]:
+        record = self.load(session_id)
+        if record is None:
+            return None
+        record['fields'].update(changes)
+        record['size'] = size
+        record['version'] = self._write(session_id, record)
+        if self._entries.get(session_id, (0, 0))[1] != size:
+            self._remember(session_id, record['expires_at'], size)
+        return record
+    
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            known = self._entries.pop(session_id, None) is not None
+        try:
+            self._path(session_id).unlink()
+            existed = True
+        except FileNotFoundError:
+            existed = known
+        self._index_log.append(session_id, 0, 0)
+        return existed
+    
+    def expire(self, now: float) -> List[str]:
+        expired = []
+        with self._lock:
+            while self._expiry_heap and self._expiry_heap[0][0] < now:
+                expires_at, sid = heapq.heappop(self._expiry_heap)
+                entry = self._entries.get(sid)
+                if entry is not None and entry[0] == expires_at:
+                    expired.append(sid)
+        for sid in expired:
+            self.delete(sid)
+        self._index_log.compact(dict(self._entries))
+        return expired
+    
+    def count(self) -> int:
+        return len(self._entries)
+    
+    def blob_refs(self) -> Optional[Set[str]]:
+        refs: Set[str] = set()
+        for path in self.directory.glob("*.json"):
+            try:
+                refs |= _blob_refs(json.loads(path.read_text(encoding='utf-8')).get('fields', {}))
+            except (OSError, ValueError):
+                # Unreadable right now (e.g. being replaced) - try next round
+                return None
+        return refs
+
+
+class SQLiteBackend(SessionBackend):
+    """
+    Session rows in a WAL-mode SQLite database shared by all workers.
+    
+    Readers never block; a write holds the database lock only for one short
+    transaction on one row. update() merges the changed fields inside that
+    transaction, so concurrent updates of different fields from different
+    workers don't overwrite each other.
+    """
+    
+    name = 'sqlite'
+    FILENAME = 'sessions.sqlite3'
+    
+    def __init__(self, directory: Path):
+        self.path = directory / self.FILENAME
+        self._local = threading.local()
+        
+        conn = self._connect()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS sessions ('
+            ' id TEXT PRIMARY KEY,'
+            ' created_at REAL NOT NULL,'
+            ' expires_at REAL NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' version INTEGER NOT NULL,'
+            ' fields TEXT NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)')
+        self._import_files(directory)
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit; multi-statement writes use explicit BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+    
+    def _import_files(self, directory: Path) -> None:
+        """Move sessions left by FileBackend into the database."""
+        paths = list(directory.glob("*.json"))
+        if not paths:
+            return
+        
+        conn = self._connect()
+        imported = 0
+        for path in paths:
+            try:
+                record = FileBackend.read_record(path)
+                conn.execute(
+                    'INSERT OR IGNORE INTO sessions (id, created_at, expires_at, size, version, fields) '
+                    'VALUES (?, ?, ?, ?, 1, ?)',
+                    (path.stem, record['created_at'], record['expires_at'], record['size'],
+                     json.dumps(record['fields']))
+                )
+                imported += 1
+            except Exception as e:
+                print(f"[SessionManager] Failed to import {path.name}: {e}")
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        
+        (directory / SessionIndex.FILENAME).unlink(missing_ok=True)
+        print(f"[SessionManager] Imported {imported} file-based sessions into SQLite")
+    
+    def create(self, session_id: str, record: SessionRecord) -> int:
+        self._connect().execute(
+            'INSERT INTO sessions (id, created_at, expires_at, size, version, fields) '
+            'VALUES (?, ?, ?, ?, 1, ?)',
+            (session_id, record['created_at'], record['expires_at'], record['size'],
+             json.dumps(record['fields']))
+        )
+        return 1
+    
+    def load(self, session_id: str) -> Optional[SessionRecord]:
+        row = self._connect().execute(
+            'SELECT created_at, expires_at, fields, size, version FROM sessions WHERE id = ?',
+            (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            'created_at': row[0],
+            'expires_at': row[1],
+            'fields': json.loads(row[2]),
+            'size': row[3],
+            'version': row[4],
+        }
+    
+    def version(self, session_id: str) -> Optional[int]:
+        row = self._connect().execute(
+            'SELECT version FROM sessions WHERE id = ?', (session_id,)
+        ).fetchone()
+        return row[0] if row else None
+    
+    def update(self, session_id: str, changes: dict, size: int) -> Optional[SessionRecord]:
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            record = self.load(session_id)
+            if record is None:
+                conn.execute('ROLLBACK')
+                return None
+            
+            record['fields'].update(changes)
+            record['size'] = size
+            record['version'] += 1
+            conn.execute(
+                'UPDATE sessions SET fields = ?, size = ?, version = ? WHERE id = ?',
+                (json.dumps(record['fields']), size, record['version'], session_id)
+            )
+            conn.execute('COMMIT')
+            return record
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+    
+    def delete(self, session_id: str) -> bool:
+        cursor = self._connect().execute('DELETE FROM sessions WHERE id = ?', (session_id,))
+        return cursor.rowcount > 0
+    
+    def expire(self, now: float) -> List[str]:
+        rows = self._connect().execute(
+            'DELETE FROM sessions WHERE expires_at < ? RETURNING id', (now,)
+        ).fetchall()
+        return [row[0] for row in rows]
+    
+    def count(self) -> int:
+        return self._connect().execute(
+            'SELECT COUNT(*) FROM sessions WHERE expires_at >= ?', (time.time(),)
+        ).fetchone()[0]
+    
+    def blob_refs(self) -> Optional[Set[str]]:
+        refs: Set[str] = set()
+        for (fields,) in self._connect().execute('SELECT fields FROM sessions'):
+            refs |= _blob_refs(json.loads(fields))
+        return refs
+
+
+BACKENDS = {
+    SQLiteBackend.name: SQLiteBackend,
+    FileBackend.name: FileBackend,
+}
+
+
+# =============================================================================
+# SESSION MANAGER
+# =============================================================================
+
+class SessionManager:
+    """
+    Thread-safe session manager with persistence shared across workers.
+    
+    Features:
+    1. Per-session locks (requests on different sessions never wait on each other)
+    2. Sessions expire after 4 hours (expiry is indexed - cleanup only looks
+       at sessions that are actually due)
+    3. Persists to disk - survives server restarts/deployments
+    4. Session state lives in a SessionBackend (SQLite by default) that all
+       gunicorn workers share, so any worker can serve any request
+    5. Documents stored once as content-addressed blobs; other fields as JSON
+    6. Lazy loading: a session's data is loaded on first access and kept in
+       a size-bounded LRU (SESSION_MEMORY_BYTES per worker), refreshed when
+       another worker changes it
+    7. Requires Railway Volume mounted at /data for full persistence
+    
+    Setup for Railway:
+    1. Go to your service in Railway
+    2. Add a Volume: Settings -> Volumes -> Add Volume
+    3. Mount path: /data
+    4. Sessions will now survive deployments
+    """
+    
+    SESSION_EXPIRY_HOURS = 4
+    CLEANUP_INTERVAL_MINUTES = 15
+    
+    def __init__(
+        self,
+        storage_dir: Path = Path(SESSIONS_DIR),
+        max_memory_bytes: int = SESSION_MEMORY_BYTES,
+        backend: str = SESSION_BACKEND
+    ):
+        # Resident sessions, least recently used first:
+        # session_id -> {'created_at', 'expires_at', 'data', 'fields', 'size', 'version'}
+        # 'fields' holds the JSON-ready encoding of each data key
+        self._sessions: "OrderedDict[str, dict]" = OrderedDict()
+        self._resident_bytes = 0
+        self._max_memory_bytes = max_memory_bytes
+        
+        # Per-session locks live only while some thread holds or waits on them
+        self._session_locks: "weakref.WeakValueDictionary[str, threading.RLock]" = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+        self._last_cleanup = time.time()
+        self._storage_dir = Path(storage_dir)
+        self._blobs = BlobStore(self._storage_dir / 'blobs')
+        self._backend: Optional[SessionBackend] = None
+        self._persistence_available = False
+        
+        # Try to set up persistent storage
+        self._init_storage(backend)
+    
+    @property
+    def persistence_available(self) -> bool:
+        return self._persistence_available
+    
+    def __len__(self) -> int:
+        if self._backend is not None:
+            try:
+                return self._backend.count()
+            except Exception as e:
+                print(f"[SessionManager] Failed to count sessions: {e}")
+        return len(self._sessions)
+    
+    def stats(self) -> dict:
+        return {
+            'sessions': len(self),
+            'resident': len(self._sessions),
+            'resident_bytes': self._resident_bytes,
+            'backend': self._backend.name if self._backend else 'memory',
+        }
+    
+    def _init_storage(self, backend: str):
+        """Initialize storage directory and session backend if possible."""
+        try:
+            self._blobs.directory.mkdir(parents=True, exist_ok=True)
+            # Test write access
+            test_file = self._storage_dir / '.test'
+            test_file.write_text('test')
+            test_file.unlink()
+            
+            backend_class = BACKENDS.get(backend)
+            if backend_class is None:
+                print(f"[SessionManager] Unknown SESSION_BACKEND '{backend}', using sqlite")
+                backend_class = SQLiteBackend
+            self._backend = backend_class(self._storage_dir)
+            self._persistence_available = True
+            print(f"[SessionManager] Persistent storage enabled at {self._storage_dir} ({self._backend.name})")
+        except Exception as e:
+            self._backend = None
+            self._persistence_available = False
+            print(f"[SessionManager] Persistent storage unavailable ({e}). Using in-memory only.")
+            print("[SessionManager] To enable persistence, add a Railway Volume mounted at /data")
+            return
+        
+        try:
+            migrated = self._migrate_pickles()
+            expired = self._backend.expire(time.time())
+            if migrated or expired:
+                print(f"[SessionManager] Migrated {migrated} sessions, cleaned {len(expired)} expired")
+        except Exception as e:
+            print(f"[SessionManager] Startup cleanup failed: {e}")
+    
+    def _migrate_pickles(self) -> int:
+        """Convert sessions saved by the old pickle-per-session format."""
+        migrated = 0
+        now = datetime.now()
+        for session_file in self._storage_dir.glob("*.pkl"):
+            try:
+                with open(session_file, 'rb') as f:
+                    session = pickle.load(f)
+                if now <= session.get('expires_at', now):
+                    data = session.get('data', {})
+                    fields = {key: self._encode(value) for key, value in data.items()}
+                    self._backend.create(session_file.stem, {
+                        'created_at': session['created_at'].timestamp(),
+                        'expires_at': session['expires_at'].timestamp(),
+                        'fields': fields,
+                        'size': self._measure(data, fields),
+                    })
+                    migrated += 1
+            except Exception as e:
+                print(f"[SessionManager] Failed to migrate {session_file.name}: {e}")
+            try:
+                session_file.unlink()
+            except OSError:
+                pass
+        return migrated
+    
+    def _session_lock(self, session_id: str) -> threading.RLock:
+        with self._lock:
+            lock = self._session_locks.get(session_id)
+            if lock is None:
+                lock = self._session_locks[session_id] = threading.RLock()
+            return lock
+    
+    # -------------------------------------------------------------------------
+    # Encoding
+    # -------------------------------------------------------------------------
+    
+    def _encode(self, value: Any) -> Any:
+        """JSON-ready form of a field value, storing binary data as a blob."""
+        if isinstance(value, (bytes, bytearray)):
+            if not self._persistence_available:
+                return None
+            return {'__blob__': self._blobs.put(bytes(value))}
+        
+        try:
+            json.dumps(value)
+            return value
+        except (TypeError, ValueError):
+            if not self._persistence_available:
+                return None
+            return {'__pickle__': self._blobs.put(pickle.dumps(value))}
+    
+    def _decode(self, encoded: Any) -> Any:
+        if isinstance(encoded, dict) and len(encoded) == 1:
+            if '__blob__' in encoded:
+                return self._blobs.get(encoded['__blob__'])
+            if '__pickle__' in encoded:
+                return pickle.loads(self._blobs.get(encoded['__pickle__']))
+        return encoded
+    
+    @staticmethod
+    def _measure(data: dict, fields: dict) -> int:
+        """Approximate memory held by a session: binary values plus the JSON record."""
+        binary = sum(len(v) for v in data.values() if isinstance(v, (bytes, bytearray)))
+        try:
+            return binary + len(json.dumps(fields))
+        except (TypeError, ValueError):
+            return binary
+    
+    def _refresh(self, session: dict, record: SessionRecord) -> None:
+        """Bring a resident session up to a newer record, decoding only changed fields."""
+        fields = record['fields']
+        data = session['data']
+        for key in list(data):
+            if key not in fields:
+                del data[key]
+        for key, encoded in fields.items():
+            if key not in data or session['fields'].get(key) != encoded:
+                data[key] = self._decode(encoded)
+        session['fields'] = fields
+        session['expires_at'] = record['expires_at']
+        session['version'] = record['version']
+        session['size'] = self._measure(data, fields)
+    
+    # -------------------------------------------------------------------------
+    # Residency (callers hold the session's lock)
+    # -------------------------------------------------------------------------
+    
+    def _track(self, session_id: str, session: dict) -> None:
+        """Make a session resident (or update its size) and enforce the memory budget."""
+        with self._lock:
+            previous = self._sessions.pop(session_id, None)
+            if previous is not None:
+                self._resident_bytes -= previous['size']
+            self._sessions[session_id] = session
+            self._resident_bytes += session['size']
+            self._evict(keep=session_id)
+    
+    def _evict(self, keep: str) -> None:
+        """Drop least recently used sessions over the memory budget (holds self._lock)."""
+        if self._backend is None:
+            return  # Memory is the only copy
+        while self._resident_bytes > self._max_memory_bytes and len(self._sessions) > 1:
+            session_id, session = next(iter(self._sessions.items()))
+            if session_id == keep:
+                self._sessions.move_to_end(session_id)
+                continue
+            del self._sessions[session_id]
+            self._resident_bytes -= session['size']
+    
+    def _forget(self, session_id: str) -> None:
+        """Remove a session from memory."""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self._resident_bytes -= session['size']
+    
+    def _resolve(self, session_id: str) -> Optional[dict]:
+        """
+        Return the current state of a live session.
+        
+        A resident copy is used if the backend still has the same version;
+        otherwise the record is (re)loaded - it may have been created or
+        changed by another worker. Expired sessions are removed and None is
+        returned. Caller holds the session's lock.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+        
+        if self._backend is not None:
+            try:
+                if session is not None:
+                    version = self._backend.version(session_id)
+                    if version is None:
+                        # Deleted or expired by another worker
+                        self._forget(session_id)
+                        return None
+                    if version != session['version']:
+                        record = self._backend.load(session_id)
+                        if record is None:
+                            self._forget(session_id)
+                            return None
+                        self._refresh(session, record)
+                        self._track(session_id, session)
+                else:
+                    record = self._backend.load(session_id)
+                    if record is not None:
+                        data = {key: self._decode(encoded) for key, encoded in record['fields'].items()}
+                        session = {
+                            'created_at': record['created_at'],
+                            'expires_at': record['expires_at'],
+                            'data': data,
+                            'fields': record['fields'],
+                            'size': self._measure(data, record['fields']),
+                            'version': record['version'],
+                        }
+                        self._track(session_id, session)
+            except Exception as e:
+                print(f"[SessionManager] Failed to load session {session_id[:8]}: {e}")
+                if session is None:
+                    return None
+        
+        if not session:
+            return None
+        
+        # Check expiration
+        if time.time() > session['expires_at']:
+            self._forget(session_id)
+            self._delete_record(session_id)
+            return None
+        
+        return session
+    
+    def _delete_record(self, session_id: str) -> bool:
+        """Delete a session's record from the backend (blobs are collected later)."""
+        if self._backend is None:
+            return False
+        try:
+            return self._backend.delete(session_id)
+        except Exception as e:
+            print(f"[SessionManager] Failed to delete session {session_id[:8]}: {e}")
+            return False
+    
+    # -------------------------------------------------------------------------
+    # Public API
+    # -------------------------------------------------------------------------
+    
+    def create(self, data: Optional[dict] = None) -> str:
+        """
+        Create a new session with expiration.
+        
+        Args:
+            data: Optional initial fields (saved with the same single write)
+        """
+        session_id = str(uuid.uuid4())
+        now = time.time()
+        data = dict(data or {})
+        
+        with self._session_lock(session_id):
+            fields = {key: self._encode(value) for key, value in data.items()}
+            session = {
+                'created_at': now,
+                'expires_at': now + self.SESSION_EXPIRY_HOURS * 3600,
+                'data': data,
+                'fields': fields,
+                'size': self._measure(data, fields),
+                'version': 0,
+            }
+            if self._backend is not None:
+                try:
+                    session['version'] = self._backend.create(session_id, session)
+                except Exception as e:
+                    print(f"[SessionManager] Failed to save session {session_id[:8]}: {e}")
+            self._track(session_id, session)
+        
+        self._maybe_cleanup()
+        return session_id
+    
+    def get(self, session_id: str) -> dict:
+        """Get session data (thread-safe). Sees changes made by any worker."""
+        with self._session_lock(session_id):
+            session = self._resolve(session_id)
+            return session['data'] if session else None
+    
+    def set(self, session_id: str, key: str, value) -> bool:
+        """Set one session field (thread-safe)."""
+        return self.update(session_id, {key: value})
+    
+    def update(self, session_id: str, values: dict) -> bool:
+        """
+        Set several session fields with a single write.
+        
+        Only the given fields are written, so concurrent updates of other
+        fields (from any worker) are kept. Binary values are only stored if
+        their content is new.
+        """
+        with self._session_lock(session_id):
+            session = self._resolve(session_id)
+            if not session:
+                return False
+            
+            changes = {key: self._encode(value) for key, value in values.items()}
+            session['data'].update(values)
+            session['fields'].update(changes)
+            session['size'] = self._measure(session['data'], session['fields'])
+            
+            if self._backend is not None:
+                expected_version = session['version']
+                try:
+                    record = self._backend.update(session_id, changes, session['size'])
+                    if record is None:
+                        self._forget(session_id)
+                        return False
+                    if record['fields'] != session['fields']:
+                        # Another worker wrote other fields in between
+                        self._refresh(session, record)
+                    session['version'] = record['version']
+                except Exception as e:
+                    session['version'] = expected_version
+                    print(f"[SessionManager] Failed to save session {session_id[:8]}: {e}")
+            
+            self._track(session_id, session)
+            return True
+    
+    def delete(self, session_id: str) -> bool:
+        """Delete a session (thread-safe)."""
+        with self._session_lock(session_id):
+            with self._lock:
+                resident = session_id in self._sessions
+            self._forget(session_id)
+            existed = self._delete_record(session_id)
+            return existed or resident
+    
+    def _maybe_cleanup(self) -> None:
+        """Expire sessions that are due and remove orphaned blobs, periodically."""
+        now = time.time()
+        with self._lock:
+            if now - self._last_cleanup < self.CLEANUP_INTERVAL_MINUTES * 60:
+                return
+            self._last_cleanup = now
+            expired = {sid for sid, session in self._sessions.items() if session['expires_at'] < now}
+        
+        if self._backend is not None:
+            try:
+                expired.update(self._backend.expire(now))
+            except Exception as e:
+                print(f"[SessionManager] Failed to expire sessions: {e}")
+        
+        for sid in expired:
+            self._forget(sid)
+        
+        if expired:
+            print(f"[SessionManager] Cleaned up {len(expired)} expired sessions")
+        
+        self._collect_blobs()
+    
+    def _collect_blobs(self) -> None:
+        """Remove blobs that no stored session refers to."""
+        if self._backend is None:
+            return
+        
+        try:
+            live = self._backend.blob_refs()
+        except Exception as e:
+            print(f"[SessionManager] Failed to list blob references: {e}")
+            return
+        if live is None:
+            return
+        
+        removed = self._blobs.collect(live)
+        if removed:
+            print(f"[SessionManager] Removed {removed} unreferenced blobs")
@@ -4,6 +4,15 @@ citeflex/unified_router.py
 Unified routing logic combining the best of CiteFlex Pro and Cite Fix Pro.
 
 Version History:
+    2026-10-16: Batch AI pre-pass: get_note_hints() guesses every note of a document
+                in a few Claude calls; get_citation()/route_citation() take the
+                per-note hint and skip their own guess/classification calls
+    2026-10-16: get_citation() reads through the metadata cache (memory LRU + SQLite)
+                (misses are cached only if no lookup timed out, was throttled or failed)
+    2026-10-16: route_citation() speculative mode: legal, URL, Claude-guess and
+                detection-based routes run concurrently; the highest-priority
+                validated result wins within ROUTE_BUDGET seconds (opt-in via
+                CITEFLEX_SPECULATIVE; detection starts after DETECTION_HEAD_START)
     2025-12-06 16:00 V3.6: Added legal citation parser to recognize already-formatted
                            legal citations. Patterns: "Case v. Case, 388 U.S. 1 (1967)"
                            and UK neutral citations "[2024] UKSC 1". Properly formatted
@@ -49,6 +58,7 @@ ARCHITECTURE:
 """
 
 import re
+import asyncio
 from typing import Optional, Tuple, List
 from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
 
@@ -57,6 +67,7 @@ from config import NEWSPAPER_DOMAINS, GOV_AGENCY_MAP
 from detectors import detect_type, DetectionResult, is_url
 from extractors import extract_by_type
 from formatters.base import get_formatter
+from metadata_cache import get_cache, normalize_query
 
 # Import CiteFlex Pro engines
 from engines.academic import CrossrefEngine, OpenAlexEngine, SemanticScholarEngine, PubMedEngine
@@ -71,7 +82,8 @@ from engines import books
 from engines.famous_papers import find_famous_paper
 
 # Import Claude-first guess function
-from claude_router import guess_and_search
+from claude_router import guess_and_search, batch_guess_citations
+from engines.orchestrator import race, run_stage, run_sync, trace_lookups, mark_incomplete, carry_context
 
 # =============================================================================
 # AI ROUTER CONFIGURATION (Claude primary, Gemini fallback)
@@ -128,6 +140,33 @@ else:
 PARALLEL_TIMEOUT = 12  # seconds
 MAX_WORKERS = 6
 
+# Speculative routing: run the route_citation() stages concurrently instead of
+# one after another (set CITEFLEX_SPECULATIVE=on). Off by default: a started
+# stage can't be stopped, so every query whose detection route starts pays for
+# it even when an earlier stage wins - up to twice the upstream calls and API
+# quota of the sequential cascade.
+SPECULATIVE_ROUTING = os.environ.get('CITEFLEX_SPECULATIVE', 'off').lower() in ('1', 'on', 'true', 'yes')
+ROUTE_BUDGET = float(os.environ.get('CITEFLEX_ROUTE_BUDGET', '25'))  # seconds per query
+# In speculative mode the detection route (the expensive one) only starts once the
+# earlier stages have all come back empty or this many seconds have passed
+DETECTION_HEAD_START = float(os.environ.get('CITEFLEX_DETECTION_HEAD_START', '4'))
+
+# Document pre-pass: guess all notes in batched Claude calls and hand each
+# note's guess to route_citation() (set CITEFLEX_BATCH_HINTS=off to disable)
+BATCH_HINTS = os.environ.get('CITEFLEX_BATCH_HINTS', 'on').lower() not in ('0', 'off', 'false', 'no')
+
+# Hint "type" values -> CitationType
+HINT_TYPES = {
+    'legal': CitationType.LEGAL,
+    'book': CitationType.BOOK,
+    'journal': CitationType.JOURNAL,
+    'newspaper': CitationType.NEWSPAPER,
+    'government': CitationType.GOVERNMENT,
+    'medical': CitationType.MEDICAL,
+    'interview': CitationType.INTERVIEW,
+    'url': CitationType.URL,
+}
+
 # Medical domains that should NOT route to government engine
 MEDICAL_DOMAINS = ['pubmed', 'ncbi.nlm.nih.gov', 'nih.gov/health', 'medlineplus']
 
@@ -1232,10 +1271,14 @@ def _validate_journal_match(query: str, result: CitationMetadata) -> bool:
     return word_match and year_match
 
 
-def _route_journal(query: str) -> Optional[CitationMetadata]:
+def _route_journal(query: str, use_claude_guess: bool = True, hint: Optional[dict] = None) -> Optional[CitationMetadata]:
     """
     Route journal/academic queries using parallel API execution.
     
+    use_claude_guess=False skips the Claude-first step (speculative routing
+    already runs guess_and_search() as its own stage). A batch hint is used
+    as the Claude guess.
+    
     Engines tried (in parallel):
     1. Crossref - best for DOIs, formal citations
     2. OpenAlex - good coverage, fast
@@ -1267,25 +1310,27 @@ def _route_journal(query: str) -> Optional[CitationMetadata]:
     
     # Claude-first guess: Use Claude's knowledge to predict citation, then verify via APIs
     # This is especially effective for fragmentary queries like "Eric Caplan trains brains"
-    try:
-        claude_result = guess_and_search(query)
-        if claude_result and claude_result.has_minimum_data():
-            print(f"[UnifiedRouter] Found via Claude-first guess: {claude_result.source_engine}")
-            return claude_result
-    except Exception as e:
-        print(f"[UnifiedRouter] Claude-first guess failed: {e}")
+    if use_claude_guess:
+        try:
+            claude_result = guess_and_search(query, hint)
+            if claude_result and claude_result.has_minimum_data():
+                print(f"[UnifiedRouter] Found via Claude-first guess: {claude_result.source_engine}")
+                return claude_result
+        except Exception as e:
+            print(f"[UnifiedRouter] Claude-first guess failed: {e}")
+            mark_incomplete("Claude-first guess failed")
     
     # Parallel search across academic engines (fallback)
     results = []
     
     with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
         futures = {
-            executor.submit(_crossref.search, query): "Crossref",
-            executor.submit(_openalex.search, query): "OpenAlex",
-            executor.submit(_semantic.search, query): "Semantic Scholar",
-            executor.submit(_pubmed.search, query): "PubMed",
-            executor.submit(_google_scholar.search, query): "Google Scholar",
-            executor.submit(_arxiv.search, query): "arXiv",
+            executor.submit(carry_context(_crossref.search), query): "Crossref",
+            executor.submit(carry_context(_openalex.search), query): "OpenAlex",
+            executor.submit(carry_context(_semantic.search), query): "Semantic Scholar",
+            executor.submit(carry_context(_pubmed.search), query): "PubMed",
+            executor.submit(carry_context(_google_scholar.search), query): "Google Scholar",
+            executor.submit(carry_context(_arxiv.search), query): "arXiv",
         }
         
         for future in as_completed(futures, timeout=PARALLEL_TIMEOUT):
@@ -1298,7 +1343,7 @@ def _route_journal(query: str) -> Optional[CitationMetadata]:
                         result.source_engine = engine_name
                         results.append(result)
             except Exception:
-                pass
+                mark_incomplete(f"{engine_name} failed")
     
     # Enrich Google Scholar results with DOI from Crossref
     for result in results:
@@ -1657,6 +1702,7 @@ After searching, respond with ONLY this JSON (no other text):
         pass
     except Exception as e:
         print(f"[UnifiedRouter] Claude web search error: {e}")
+        mark_incomplete(f"Claude web search {type(e).__name__}")
     
     # =========================================================================
     # OPTION 3: URL Path Extraction (last resort)
@@ -1763,7 +1809,13 @@ def _extract_from_url_path(url: str, citation_type: CitationType) -> Optional[Ci
 # MAIN ROUTING FUNCTION
 # =============================================================================
 
-def route_citation(query: str, style: str = "chicago") -> Tuple[Optional[CitationMetadata], str]:
+def route_citation(
+    query: str,
+    style: str = "chicago",
+    speculative: Optional[bool] = None,
+    budget: Optional[float] = None,
+    hint: Optional[dict] = None
+) -> Tuple[Optional[CitationMetadata], str]:
     """
     Main entry point: route query to appropriate engine and format result.
     
@@ -1773,13 +1825,18 @@ def route_citation(query: str, style: str = "chicago") -> Tuple[Optional[Citatio
     If the citation is complete (has author, title, journal/publisher, year),
     it reformats without searching databases. This preserves authoritative
     content while applying consistent style formatting.
+    
+    Args:
+        speculative: Run the routing stages concurrently (default: SPECULATIVE_ROUTING)
+        budget: Latency budget in seconds for speculative mode (default: ROUTE_BUDGET)
+        hint: This query's entry from get_note_hints() - used instead of the
+              per-query Claude guess and AI classification
     """
     query = query.strip()
     if not query:
         return None, ""
     
     formatter = get_formatter(style)
-    metadata = None
     
     # 0. TRY PARSING FIRST: If citation is already complete, just reformat
     # This preserves user's authoritative content while applying style
@@ -1788,28 +1845,64 @@ def route_citation(query: str, style: str = "chicago") -> Tuple[Optional[Citatio
         print(f"[UnifiedRouter] Parsed complete citation: {parsed.citation_type.name}")
         return parsed, formatter.format(parsed)
     
+    if speculative is None:
+        speculative = SPECULATIVE_ROUTING
+    
+    if speculative:
+        metadata = _route_speculative(query, ROUTE_BUDGET if budget is None else budget, hint)
+    else:
+        metadata = _route_sequential(query, hint)
+    
+    # Format and return
+    if metadata:
+        return metadata, formatter.format(metadata)
+    
+    return None, ""
+
+
+def _route_sequential(query: str, hint: Optional[dict] = None) -> Optional[CitationMetadata]:
+    """Try each routing stage in turn (the original cascade)."""
     # 1. Check for legal citation FIRST (superlegal.py handles famous cases)
     if superlegal.is_legal_citation(query):
         metadata = _route_legal(query)
         if metadata:
-            return metadata, formatter.format(metadata)
+            return metadata
     
     # 2. Check for URL
     if is_url(query):
         metadata = _route_url(query)
         if metadata:
-            return metadata, formatter.format(metadata)
+            return metadata
     
     # 2.5. Claude-first guess: Use Claude's knowledge for ambiguous queries
     # This catches fragmentary queries like "Eric Caplan trains brains" that
     # detectors might misroute to books instead of journals
     try:
-        claude_result = guess_and_search(query)
+        claude_result = guess_and_search(query, hint)
         if claude_result and claude_result.has_minimum_data():
             print(f"[UnifiedRouter] Found via Claude-first guess: {claude_result.source_engine}")
-            return claude_result, formatter.format(claude_result)
+            return claude_result
     except Exception as e:
         print(f"[UnifiedRouter] Claude-first guess failed: {e}")
+        mark_incomplete("Claude-first guess failed")
+    
+    # 3-4. Detect type and route
+    return _route_by_detection(query, hint=hint)
+
+
+def _route_by_detection(
+    query: str,
+    use_claude_guess: bool = True,
+    hint: Optional[dict] = None
+) -> Optional[CitationMetadata]:
+    """
+    Detect the citation type and run the type-specific route (with the
+    book -> journal and AI-classification fallbacks).
+    
+    use_claude_guess and hint are passed to _route_journal(); the hint's
+    type replaces the AI classification of UNKNOWN queries.
+    """
+    metadata = None
     
     # 3. Detect type using standard detectors
     detection = detect_type(query)
@@ -1825,7 +1918,7 @@ def route_citation(query: str, style: str = "chicago") -> Tuple[Optional[Citatio
         # might be journal articles misdetected as books.
         if not metadata:
             print(f"[UnifiedRouter] Book search failed, trying journal engines...")
-            metadata = _route_journal(query)
+            metadata = _route_journal(query, use_claude_guess, hint)
     
     elif detection.citation_type in [CitationType.JOURNAL, CitationType.MEDICAL]:
         # Check famous papers cache first
@@ -1838,7 +1931,7 @@ def route_citation(query: str, style: str = "chicago") -> Tuple[Optional[Citatio
                 **famous
             )
         else:
-            metadata = _route_journal(query)
+            metadata = _route_journal(query, use_claude_guess, hint)
     
     elif detection.citation_type == CitationType.NEWSPAPER:
         metadata = extract_by_type(query, CitationType.NEWSPAPER)
@@ -1850,34 +1943,113 @@ def route_citation(query: str, style: str = "chicago") -> Tuple[Optional[Citatio
         metadata = extract_by_type(query, CitationType.INTERVIEW)
     
     else:
-        # UNKNOWN: Try AI classification first
-        if AI_AVAILABLE:
+        # UNKNOWN: Try AI classification first (the batch hint, if any, is
+        # that classification already)
+        if hint and hint.get('type') in HINT_TYPES:
+            ai_type = HINT_TYPES[hint['type']]
+        elif AI_AVAILABLE:
             ai_type, ai_meta = classify_with_ai(query)
-            if ai_type != CitationType.UNKNOWN:
-                print(f"[UnifiedRouter] AI classified as: {ai_type.name}")
-                
-                if ai_type == CitationType.BOOK:
-                    metadata = _route_book(query)
-                elif ai_type == CitationType.LEGAL:
-                    metadata = _route_legal(query)
-                elif ai_type in [CitationType.JOURNAL, CitationType.MEDICAL]:
-                    metadata = _route_journal(query)
-                elif ai_type == CitationType.NEWSPAPER:
-                    metadata = extract_by_type(query, CitationType.NEWSPAPER)
-                elif ai_type == CitationType.GOVERNMENT:
-                    metadata = extract_by_type(query, CitationType.GOVERNMENT)
+        else:
+            ai_type = CitationType.UNKNOWN
+        
+        if ai_type != CitationType.UNKNOWN:
+            print(f"[UnifiedRouter] AI classified as: {ai_type.name}")
+            
+            if ai_type == CitationType.BOOK:
+                metadata = _route_book(query)
+            elif ai_type == CitationType.LEGAL:
+                metadata = _route_legal(query)
+            elif ai_type in [CitationType.JOURNAL, CitationType.MEDICAL]:
+                metadata = _route_journal(query, use_claude_guess, hint)
+            elif ai_type == CitationType.NEWSPAPER:
+                metadata = extract_by_type(query, CitationType.NEWSPAPER)
+            elif ai_type == CitationType.GOVERNMENT:
+                metadata = extract_by_type(query, CitationType.GOVERNMENT)
         
         # Fallback: try books first, then journals
         if not metadata:
             metadata = _route_book(query)
         if not metadata:
-            metadata = _route_journal(query)
+            metadata = _route_journal(query, use_claude_guess, hint)
     
-    # Format and return
-    if metadata:
-        return metadata, formatter.format(metadata)
+    return metadata
+
+
+def _claude_guess_is_valid(query: str, result: Optional[CitationMetadata]) -> bool:
+    """Accept a Claude-first guess only if it passes the book/journal validators."""
+    if not result or not result.has_minimum_data():
+        return False
+    if result.citation_type == CitationType.BOOK:
+        return _validate_book_match(query, result.to_dict())
+    return _validate_journal_match(query, result)
+
+
+def _route_speculative(query: str, budget: float, hint: Optional[dict] = None) -> Optional[CitationMetadata]:
+    """
+    Run the routing stages concurrently and keep the highest-priority
+    acceptable result.
+    
+    Stages, in the same priority order as _route_sequential():
+    1. Legal route (only if the query looks legal)
+    2. URL route (only if the query is a URL)
+    3. Claude-first guess, accepted only if _validate_book_match /
+       _validate_journal_match agree it matches the query
+    4. Detection-based route (its own validators apply inside)
+    
+    A lower-priority result is used only once every higher-priority stage
+    has come back empty, so the answer matches the sequential cascade;
+    stages still running when it's decided are cancelled. If the budget
+    runs out, the best acceptable result so far (if any) is returned.
+    
+    The detection route waits until stages 1-3 have all come back or
+    DETECTION_HEAD_START seconds have passed, so a query an earlier stage
+    answers quickly never starts the engine cascade.
+    """
+    async def run_stages():
+        stages = []
+        
+        if superlegal.is_legal_citation(query):
+            stages.append(("legal", asyncio.ensure_future(run_stage(_route_legal, query))))
+        
+        if is_url(query):
+            stages.append(("url", asyncio.ensure_future(run_stage(_route_url, query))))
+        
+        stages.append(("claude_guess", asyncio.ensure_future(_validated(
+            run_stage(guess_and_search, query, hint),
+            lambda result: _claude_guess_is_valid(query, result)
+        ))))
+        
+        earlier = [task for _, task in stages]
+        stages.append(("detected", _after_head_start(
+            earlier, lambda: run_stage(_route_by_detection, query, False, hint)
+        )))
+        
+        return await race(stages, timeout=budget, ordered=True)
     
-    return None, ""
+    try:
+        winner = run_sync(run_stages())
+    except Exception as e:
+        print(f"[UnifiedRouter] Speculative routing failed: {e}")
+        return None
+    
+    if not winner:
+        print(f"[UnifiedRouter] No routing stage produced a result")
+        return None
+    
+    print(f"[UnifiedRouter] Speculative route won by '{winner.label}': {winner.value.source_engine}")
+    return winner.value
+
+
+async def _after_head_start(earlier: List[asyncio.Task], start) -> Optional[CitationMetadata]:
+    """Run start() once the earlier stages have finished or DETECTION_HEAD_START has passed."""
+    await asyncio.wait(earlier, timeout=DETECTION_HEAD_START)
+    return await start()
+
+
+async def _validated(awaitable, check) -> Optional[CitationMetadata]:
+    """Await a stage and drop its result unless it passes check()."""
+    result = await awaitable
+    return result if result and check(result) else None
 
 
 # =============================================================================
@@ -2236,14 +2408,90 @@ def get_citation_options_formatted(query: str, style: str = "chicago", limit: in
     ]
 
 
+# =============================================================================
+# DOCUMENT PRE-PASS
+# =============================================================================
+
+def get_note_hints(queries: List[str], timeout: Optional[float] = None) -> dict:
+    """
+    Guess every note of a document in a few batched Claude calls.
+    
+    Notes that won't reach a model anyway - cached lookups and citations
+    that parse as complete - are left out. The returned hints are passed
+    to get_citation(query, style, hint) so routing skips the per-note
+    guess_citation() and classify_with_ai() calls; notes without a hint
+    (e.g. a failed batch) are routed as before.
+    
+    Args:
+        queries: Note texts
+        timeout: Deadline in seconds for the batched calls
+        
+    Returns:
+        Dict mapping note text -> hint (guess dict with 'type')
+    """
+    if not BATCH_HINTS or not CLAUDE_AVAILABLE:
+        return {}
+    
+    cache = get_cache()
+    pending = []
+    for query in dict.fromkeys(q.strip() for q in queries):
+        key = normalize_query(query)
+        if not key or cache.get('citation', key)[0]:
+            continue
+        parsed = parse_existing_citation(query)
+        if parsed and _is_citation_complete(parsed):
+            continue
+        pending.append(query)
+    
+    if not pending:
+        return {}
+    
+    try:
+        return batch_guess_citations(pending, timeout=timeout)
+    except Exception as e:
+        print(f"[UnifiedRouter] Batch hints failed: {e}")
+        return {}
+
+
 # =============================================================================
 # BACKWARD COMPATIBILITY
 # =============================================================================
 
 # Alias for app.py compatibility
-def get_citation(query: str, style: str = "chicago") -> Tuple[Optional[CitationMetadata], str]:
-    """Alias for route_citation() - backward compatibility."""
-    return route_citation(query, style)
+def get_citation(
+    query: str,
+    style: str = "chicago",
+    hint: Optional[dict] = None
+) -> Tuple[Optional[CitationMetadata], str]:
+    """
+    Cached route_citation() - backward compatibility entry point.
+    
+    Metadata is cached per normalized query (style-independent) and
+    formatted on every call, so a repeat lookup in any style skips the
+    engine cascade. Misses are cached briefly as well, but only when every
+    lookup behind them completed (no timeout, open circuit, rate limit or
+    request error), so a transient outage isn't remembered as "not found".
+    
+    hint is the query's entry from get_note_hints(), if any.
+    """
+    key = normalize_query(query)
+    if not key:
+        return None, ""
+    
+    cache = get_cache()
+    hit, metadata = cache.get('citation', key)
+    if hit:
+        if metadata is None:
+            return None, ""
+        return metadata, get_formatter(style).format(metadata)
+    
+    with trace_lookups() as trace:
+        metadata, formatted = route_citation(query, style, hint=hint)
+    if metadata is not None or not trace.incomplete:
+        cache.set('citation', key, metadata)
+    else:
+        print(f"[UnifiedRouter] Not caching miss ({trace.reason})")
+    return metadata, formatted
 
 
 def search_citation(query: str) -> List[dict]: